@@ -0,0 +1,94 @@
+# Bounded LRU/TTL cache for rendered advice
+"""
+Rendered advice is a pure function of the routed intent and a few request
+fields, so repeated questions can be answered from memory. Entries expire
+after their own TTL and the least recently used entry is evicted when the
+cache is full. Entries may carry the knowledge records they were built from,
+so a knowledge reload only drops the advice that actually changed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class AdviceCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, max_entries=1024, default_ttl=3600):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, deps)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None, deps=()):
+        """Store value for ttl seconds, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value, frozenset(deps))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key matches predicate, returning how many were removed"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_dependents(self, is_stale):
+        """Drop every entry whose recorded deps satisfy is_stale(deps), returning how many were removed"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if is_stale(entry[2])]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'default_ttl': self.default_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
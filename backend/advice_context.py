@@ -0,0 +1,42 @@
+# Per-request lookup memo for the advice builders
+"""
+One request can render several advice sections that all need the same
+weather and soil data. AdviceContext makes each lookup happen at most once
+per location per request, so every section (and the JSON payload) is built
+from the same snapshot. Locations are compared the way the weather service
+and advice cache compare them (case and spacing ignored), so a batch that
+mentions "Pune" and "pune " still looks it up once.
+"""
+from knowledge_base import record_dependencies, track_dependencies
+
+
+def _location_key(location):
+    return ' '.join(location.lower().split())
+
+
+class AdviceContext:
+    """Memoizes weather and soil lookups for the lifetime of one request"""
+
+    def __init__(self, expert):
+        self.expert = expert
+        self._weather = {}
+        self._soil = {}
+
+    def weather(self, location):
+        """Weather snapshot for location, fetched on first use"""
+        key = _location_key(location)
+        if key not in self._weather:
+            self._weather[key] = self.expert.get_weather_data(location)
+        return self._weather[key]
+
+    def soil(self, location):
+        """Soil recommendations for location, looked up on first use"""
+        key = _location_key(location)
+        if key not in self._soil:
+            with track_dependencies() as deps:
+                data = self.expert.get_location_soil_recommendations(location)
+            self._soil[key] = (data, frozenset(deps))
+        data, deps = self._soil[key]
+        # Memo hits still count as knowledge reads for whoever renders with them
+        record_dependencies(deps)
+        return data
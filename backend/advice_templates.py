@@ -0,0 +1,398 @@
+# Advice text templates
+"""
+The advice handlers used to build their answers with dozens of
+`advice += f"..."` statements and a `.replace('_', ' ').title()` on every
+knowledge key, per request.
+
+Each piece of advice text is now either a plain pre-rendered string (the
+fixed tip blocks) or a Template, which is split into literal and field
+segments once at import and compiled into a render function (a generated
+f-string) that formats its fields and joins the segments in one step.
+Handlers collect the pieces in a list and join that once.
+
+choose_variant() replaces random.choice for alternative headings, so the
+same request gets the same text and stays cacheable. display_name() and
+title_case() memoize the formatting of knowledge keys (crop, soil, climate
+zone and growth stage names) so each distinct key is formatted once per
+process.
+"""
+import string
+import zlib
+from functools import lru_cache
+
+
+class Template:
+    """str.format-style template compiled once into a keyword-only render function"""
+
+    def __init__(self, source):
+        self.source = source
+        self.segments = []   # literal strings and (field, conversion, format_spec) tuples
+        self.fields = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if literal:
+                if self.segments and isinstance(self.segments[-1], str):
+                    self.segments[-1] += literal
+                else:
+                    self.segments.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier() or field.startswith('_') or '{' in spec:
+                raise ValueError(f"Template field '{field}' must be a plain name with a literal format spec")
+            self.segments.append((field, conversion, spec))
+            if field not in self.fields:
+                self.fields.append(field)
+        self.render = self._compile()
+
+    def _compile(self):
+        # Generated as an f-string so rendering runs the same bytecode as hand-written f"..." code
+        pieces = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                pieces.append(segment.replace('{', '{{').replace('}', '}}'))
+            else:
+                field, conversion, spec = segment
+                pieces.append('{' + field + (f"!{conversion}" if conversion else '') + (f":{spec}" if spec else '') + '}')
+
+        signature = f"*, {', '.join(self.fields)}" if self.fields else ''
+        namespace = {}
+        exec(f"def render({signature}):\n    return f{''.join(pieces)!r}\n", namespace)
+        return namespace['render']
+
+    def __repr__(self):
+        return f"Template({self.source!r})"
+
+
+def choose_variant(variants, *key):
+    """Pick one of several phrasings, the same one every time for the same key"""
+    return variants[zlib.crc32('|'.join(map(str, key)).encode('utf-8')) % len(variants)]
+
+
+@lru_cache(maxsize=4096)
+def display_name(key):
+    """'black_cotton' -> 'Black Cotton'"""
+    return key.replace('_', ' ').title()
+
+
+@lru_cache(maxsize=4096)
+def title_case(word):
+    """str.title(), memoized for crop and season names"""
+    return word.title()
+
+
+# Handlers render this in place of the location's name. Cached advice is shared by every spelling
+# of a location, and fill_location() puts each requester's own spelling in
+LOCATION_SLOT = '\ue000'
+
+
+def fill_location(text, location):
+    """Advice text with the requester's spelling of the location in every LOCATION_SLOT"""
+    return text.replace(LOCATION_SLOT, location) if location else text
+
+
+# Shared pieces
+BOLD_BULLET = Template("• **{label}:** {text}\n")
+SOIL_CROPS_HEADING = "\n**Soil-Specific Crop Recommendations:**\n"
+SEASON_AND_HARVEST = Template("**Planting Season:** {seasons}\n**Harvest Time:** {harvest_time}\n\n")
+
+# _get_weather_advice_for_location
+WEATHER_CURRENT = Template(
+    "🌤️ **Weather & Farming Advice for {location}**\n\n"
+    "**Current Weather Conditions:**\n"
+    "• Temperature: {temperature}°C\n"
+    "• Humidity: {humidity}%\n"
+    "• Rainfall: {rainfall}mm\n"
+    "• Wind Speed: {wind_speed:.1f} km/h\n"
+    "• Condition: {condition}\n\n"
+    "**Weather-Based Farming Recommendations:**\n"
+)
+HIGH_TEMPERATURE_ALERT = Template(
+    "🔥 **High Temperature Alert ({temperature}°C):**\n"
+    "   • Increase irrigation frequency\n"
+    "   • Provide shade protection for sensitive crops\n"
+    "   • Avoid field work during peak hours (11 AM - 3 PM)\n"
+    "   • Consider heat-tolerant crop varieties\n\n"
+)
+LOW_TEMPERATURE_ALERT = Template(
+    "❄️ **Low Temperature Alert ({temperature}°C):**\n"
+    "   • Protect crops from frost damage\n"
+    "   • Use mulching to retain soil warmth\n"
+    "   • Delay planting of warm-season crops\n\n"
+)
+HIGH_HUMIDITY_ALERT = Template(
+    "💧 **High Humidity ({humidity}%):**\n"
+    "   • Monitor for fungal diseases\n"
+    "   • Ensure proper air circulation\n"
+    "   • Apply preventive fungicides if needed\n\n"
+)
+LOW_HUMIDITY_ALERT = Template(
+    "🌵 **Low Humidity ({humidity}%):**\n"
+    "   • Increase irrigation frequency\n"
+    "   • Use drip irrigation to maintain moisture\n"
+    "   • Apply mulch to reduce evaporation\n\n"
+)
+HEAVY_RAINFALL_ALERT = Template(
+    "🌧️ **Heavy Rainfall ({rainfall}mm):**\n"
+    "   • Ensure proper field drainage\n"
+    "   • Delay fertilizer application\n"
+    "   • Monitor for waterlogging\n\n"
+)
+DRY_CONDITIONS_ALERT = Template(
+    "☀️ **Dry Conditions ({rainfall}mm):**\n"
+    "   • Plan irrigation schedule\n"
+    "   • Consider drought-resistant varieties\n"
+    "   • Implement water conservation techniques\n\n"
+)
+WEATHER_SOIL_SUMMARY = Template(
+    "**Soil & Crop Recommendations for {location}:**\n"
+    "• Climate Zone: {climate_zone}\n"
+)
+DOMINANT_SOIL = Template("• Dominant Soil: {soil}\n")
+RECOMMENDED_CROPS = Template("• Recommended Crops: {crops}\n")
+FORECAST_HEADING = "\n**3-Day Weather Forecast:**\n"
+FORECAST_DAY = Template("• **{day}:** {temp}°C, {humidity}% humidity, {rain}mm rain\n")
+
+# _get_location_soil_advice
+LOCATION_SOIL_TITLE = Template("🌱 **Soil Analysis & Recommendations for {location}**\n\n")
+LOCATION_INFORMATION = Template("**Location Information:**\n• Climate Zone: {climate_zone}\n")
+DOMINANT_SOIL_TYPE = Template("• Dominant Soil Type: {soil}\n")
+AVAILABLE_SOIL_TYPES = Template("• Available Soil Types: {soils}\n")
+RAINFALL_INFORMATION = Template("• Average Rainfall: {average}mm\n• Monsoon Period: {monsoon}\n")
+MAJOR_CROPS_IN_LOCATION = Template("\n**Major Crops in {location}:** {crops}\n")
+SOIL_MANAGEMENT_TIPS = (
+    "\n**General Soil Management Tips:**\n"
+    "• Conduct soil pH testing annually\n"
+    "• Add organic matter to improve soil structure\n"
+    "• Practice crop rotation for soil health\n"
+    "• Use appropriate fertilizers based on soil test results\n"
+    "• Implement proper drainage systems\n"
+)
+
+# _get_planting_advice
+PLANTING_GREETINGS = (
+    Template("🌱 **{crop} Planting Guide**\n\n"),
+    Template("🚜 **Complete {crop} Planting Manual**\n\n"),
+    Template("🌾 **Expert {crop} Cultivation Guide**\n\n"),
+    Template("🌾 **Professional {crop} Planting Instructions**\n\n")
+)
+GENERATED_ON = Template("*Generated on {date}*\n\n")
+LOCATION_CONDITIONS = Template(
+    "**Location-Specific Information for {location}:**\n"
+    "• Current Temperature: {temperature}°C\n"
+    "• Current Humidity: {humidity}%\n"
+    "• Recent Rainfall: {rainfall}mm\n"
+)
+CLIMATE_ZONE = Template("• Climate Zone: {climate_zone}\n")
+RECOMMENDED_SOIL = Template("• Recommended Soil: {soil}\n")
+OPTIMAL_CONDITIONS = Template(
+    "**Optimal Growing Conditions:**\n"
+    "• Temperature: {temperature}°C (range: {temperature_min}-{temperature_max}°C)\n"
+    "• Soil pH: {ph} (range: {ph_min}-{ph_max})\n"
+    "• Soil types: {soil_types}\n"
+    "• Rainfall requirement: {rainfall}mm during growing season\n\n"
+)
+TEMPERATURE_SUITABLE = Template(
+    "**Location Suitability Check:**\n"
+    "✅ Current temperature ({temperature}°C) is suitable for {crop}\n\n"
+)
+TEMPERATURE_UNSUITABLE = Template(
+    "**Location Suitability Check:**\n"
+    "⚠️ Current temperature ({temperature}°C) may need adjustment for optimal {crop} growth\n\n"
+)
+SEASON_TIPS_HEADING = Template("**{season} Season Specific Tips:**\n")
+SEASON_TIPS = {
+    'kharif': "• Plant after monsoon onset\n• Ensure good drainage during heavy rains\n",
+    'rabi': "• Plant in winter months\n• Protect from frost damage\n"
+}
+FIELD_PREPARATION = (
+    "**Field Preparation Steps:**\n"
+    "• Deep plowing (20-25 cm) during summer\n"
+    "• Add farmyard manure (10-15 tons/hectare)\n"
+    "• Level the field using land leveler\n"
+    "• Prepare seedbed with fine tilth\n"
+    "• Ensure proper drainage channels\n\n"
+)
+
+# _get_fertilizer_advice
+FERTILIZER_GREETINGS = (
+    Template("🌿 **{crop} Fertilizer Management**\n\n"),
+    Template("🧪 **Nutrient Management for {crop}**\n\n"),
+    Template("💚 **Complete {crop} Nutrition Guide**\n\n"),
+    Template("🔬 **Scientific {crop} Fertilization Plan**\n\n")
+)
+UPDATED_AS_OF = Template("*Updated recommendations as of {month}*\n\n**Recommended Fertilizer Schedule:**\n")
+NUTRIENT_LINES = (
+    ('nitrogen', Template("• **Nitrogen (N):** {dose}\n")),
+    ('phosphorus', Template("• **Phosphorus (P):** {dose}\n")),
+    ('potassium', Template("• **Potassium (K):** {dose}\n\n"))
+)
+FERTILIZER_GUIDELINES = (
+    "**Application Guidelines:**\n"
+    "• Apply basal dose 2-3 days before sowing\n"
+    "• Split nitrogen application for better efficiency\n"
+    "• Apply phosphorus as single basal dose\n"
+    "• Monitor plant response and adjust accordingly\n"
+    "• Conduct soil test before application\n\n"
+    "**Organic Alternatives:**\n"
+    "• Compost: 5-10 tons/hectare\n"
+    "• Vermicompost: 2-3 tons/hectare\n"
+    "• Biofertilizers: As per manufacturer's recommendation\n"
+    "• Green manure: Incorporate before flowering\n\n"
+)
+
+# _get_irrigation_advice
+IRRIGATION_TITLE = Template("💧 **{crop} Water Management**\n\n**Irrigation Schedule:**\n")
+WATER_MANAGEMENT_TIPS = (
+    "\n**General Water Management:**\n"
+    "• Monitor soil moisture regularly\n"
+    "• Avoid over-irrigation to prevent diseases\n"
+    "• Use mulching to conserve moisture\n"
+    "• Consider drip irrigation for water efficiency\n\n"
+)
+
+# _get_pest_advice
+PEST_ADVICE = Template(
+    "🐛 **{crop} Pest & Disease Management**\n\n"
+    "**Common Diseases:** {diseases}\n"
+    "**Common Pests:** {pests}\n\n"
+    "**Integrated Pest Management:**\n"
+    "• Regular field monitoring\n"
+    "• Use resistant varieties when available\n"
+    "• Practice crop rotation\n"
+    "• Biological control methods\n"
+    "• Targeted chemical control when necessary\n\n"
+)
+
+# _get_harvest_advice
+HARVEST_ADVICE = Template(
+    "🌾 **{crop} Harvesting Guide**\n\n"
+    "**Harvest Time:** {harvest_time}\n"
+    "**Expected Yield:** {average}-{high} {unit}\n\n"
+    "**Harvesting Tips:**\n"
+    "• Harvest at proper maturity\n"
+    "• Choose appropriate weather conditions\n"
+    "• Use proper harvesting equipment\n"
+    "• Handle produce carefully to avoid damage\n"
+    "• Plan for immediate processing/storage\n\n"
+)
+
+# _get_timing_advice
+TIMING_TITLE = Template("⏰ **{crop} Timing Guide**\n\n")
+CRITICAL_TIMING_HEADING = "**Critical Timing Points:**\n"
+TIMING_TIPS = (
+    "\n**Growth Duration:** Typically 90-120 days depending on variety\n"
+    "**Best Planting Window:** Early in the season for optimal yield\n\n"
+)
+
+# _get_general_crop_advice
+CROP_OVERVIEW = Template(
+    "🌾 **{crop} Cultivation Overview**\n\n"
+    "**Scientific Name:** {scientific_name}\n"
+    "**Growth Stages:** {growth_stages}\n\n"
+    "**Optimal Growing Conditions:**\n"
+    "• Temperature: {temperature}°C\n"
+    "• Soil pH: {ph}\n"
+    "• Rainfall: {rainfall}mm\n\n"
+    "**Expected Yield:** {average}-{high} {unit}\n\n"
+)
+
+# _get_seasonal_advice
+SEASONAL_TITLE = "📅 **Seasonal Farming Calendar**\n\n"
+SEASON_CALENDAR = Template("**{season} Season ({period})**\n\n**Monthly Activities:**\n")
+SEASON_MAJOR_CROPS = Template("\n**Major Crops:** {crops}\n\n")
+SEASONAL_GUIDELINES = (
+    "**General Seasonal Guidelines:**\n"
+    "• Plan activities according to monsoon\n"
+    "• Select appropriate crops for season\n"
+    "• Prepare for weather challenges\n"
+    "• Monitor market prices\n\n"
+)
+
+# Handlers with no knowledge-dependent text
+SOIL_ADVICE = (
+    "🌱 **Soil Management Guide**\n\n"
+    "**Soil Testing Importance:**\n"
+    "• Test soil pH and nutrient levels\n"
+    "• Adjust pH using lime or sulfur\n"
+    "• Add organic matter regularly\n"
+    "• Monitor salinity levels\n\n"
+    "**Soil Health Improvement:**\n"
+    "• Use cover crops\n"
+    "• Practice crop rotation\n"
+    "• Minimize tillage\n"
+    "• Add compost and organic matter\n\n"
+)
+MARKET_ADVICE = (
+    "📈 **Market Intelligence & Economics**\n\n"
+    "**Price Factors:**\n"
+    "• Supply and demand dynamics\n"
+    "• Weather conditions\n"
+    "• Government policies\n"
+    "• Global market trends\n\n"
+    "**Value Addition Strategies:**\n"
+    "• Direct marketing to consumers\n"
+    "• Processing and packaging\n"
+    "• Contract farming\n"
+    "• Organic certification\n\n"
+)
+GENERAL_ADVICE = (
+    "🌾 **General Farming Best Practices**\n\n"
+    "**Sustainable Farming:**\n"
+    "• Practice crop rotation\n"
+    "• Use integrated pest management\n"
+    "• Conserve water resources\n"
+    "• Maintain soil health\n\n"
+    "**Technology Adoption:**\n"
+    "• Use weather forecasting\n"
+    "• Adopt precision agriculture\n"
+    "• Leverage mobile apps\n"
+    "• Access market information\n\n"
+)
+WEATHER_GENERAL_ADVICE = (
+    "🌤️ **Weather-Smart Farming**\n\n"
+    "**Weather Monitoring:**\n"
+    "• Check daily weather forecasts\n"
+    "• Monitor rainfall patterns\n"
+    "• Track temperature extremes\n"
+    "• Watch for storm warnings\n\n"
+    "**Weather-Based Actions:**\n"
+    "• **Hot Weather:** Increase irrigation frequency\n"
+    "• **Cold Weather:** Protect sensitive crops\n"
+    "• **Rainy Season:** Ensure proper drainage\n"
+    "• **Dry Spell:** Implement water conservation\n\n"
+)
+SUSTAINABLE_ADVICE = (
+    "🌱 **Sustainable Farming Practices**\n\n"
+    "**Organic Methods:**\n"
+    "• Use compost and organic fertilizers\n"
+    "• Practice crop rotation\n"
+    "• Encourage beneficial insects\n"
+    "• Avoid synthetic pesticides\n\n"
+    "**Soil Conservation:**\n"
+    "• Minimize tillage\n"
+    "• Use cover crops\n"
+    "• Implement contour farming\n"
+    "• Maintain soil organic matter\n\n"
+    "**Water Conservation:**\n"
+    "• Use drip irrigation\n"
+    "• Practice mulching\n"
+    "• Harvest rainwater\n"
+    "• Choose drought-resistant varieties\n\n"
+)
+TECHNOLOGY_ADVICE = (
+    "🚀 **Modern Agricultural Technology**\n\n"
+    "**Precision Agriculture:**\n"
+    "• Use GPS-guided machinery\n"
+    "• Implement variable rate application\n"
+    "• Monitor with drones and satellites\n"
+    "• Use soil sensors for real-time data\n\n"
+    "**Digital Tools:**\n"
+    "• Weather forecasting apps\n"
+    "• Crop management software\n"
+    "• Market price tracking\n"
+    "• Pest identification apps\n\n"
+    "**Automation:**\n"
+    "• Automated irrigation systems\n"
+    "• Greenhouse climate control\n"
+    "• Robotic harvesting\n"
+    "• Smart farm monitoring\n\n"
+)
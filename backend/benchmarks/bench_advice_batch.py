@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Batch advice benchmark
+Sends the same advisory workload (a nightly-push style mix where many farmers
+share a crop, location and question) as one /api/expert-advice POST per item
+and as /api/expert-advice/batch requests, through Flask's test client. Both
+start from an empty advice cache; network time is not included, so this
+measures the per-request Flask/JSON overhead the batch endpoint removes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+from farming_expert_app import app, farming_expert
+
+CROPS = ['rice', 'wheat', 'cotton', 'maize']
+LOCATIONS = ['Pune, Maharashtra', 'Punjab', 'Kerala', 'Jaipur', 'Kolkata', 'Chennai', 'Iowa', 'Lucknow']
+SEASONS = ['kharif', 'rabi', None]
+QUESTIONS = [
+    'How to plant {crop} this season?',
+    'What fertilizer for {crop}?',
+    'Irrigation schedule for {crop}',
+    '{crop} pest management',
+    'Weather update for my farm',
+    'Soil advice for my field',
+    'When to harvest {crop}?'
+]
+
+
+def workload(size, seed=0):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(size):
+        crop = rng.choice(CROPS)
+        items.append({
+            'query': rng.choice(QUESTIONS).format(crop=crop),
+            'crop': crop,
+            'location': rng.choice(LOCATIONS),
+            'season': rng.choice(SEASONS)
+        })
+    return items
+
+
+def run_single(client, items):
+    advice = []
+    for item in items:
+        advice.append(client.post('/api/expert-advice', json=item).get_json()['advice'])
+    return advice
+
+
+def run_batch(client, items, batch_size):
+    advice = []
+    for start in range(0, len(items), batch_size):
+        response = client.post('/api/expert-advice/batch', json={'items': items[start:start + batch_size]})
+        advice += [result['advice'] for result in response.get_json()['results']]
+    return advice
+
+
+def timed(fn, *args):
+    farming_expert.advice_cache.invalidate(lambda key: True)
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch advice benchmark')
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Batch Advice Benchmark")
+    print("=" * 50)
+    client = app.test_client()
+    items = workload(args.items)
+    run_batch(client, items[:50], args.batch_size)   # warm imports and weather snapshots
+
+    single_time, single_advice = timed(run_single, client, items)
+    batch_time, batch_advice = timed(run_batch, client, items, args.batch_size)
+
+    unique = len({tuple(item.values()) for item in items})
+    print(f"{args.items} items, {unique} distinct, {len(LOCATIONS)} locations")
+    print(f"One POST per item:       {single_time:6.2f} s  ({args.items / single_time:8.0f} items/s)")
+    print(f"Batches of {args.batch_size:<5}        {batch_time:6.2f} s  ({args.items / batch_time:8.0f} items/s)")
+    print(f"Speedup: {single_time / batch_time:.1f}x, identical advice: {single_advice == batch_advice}")
+
+
+if __name__ == "__main__":
+    main()
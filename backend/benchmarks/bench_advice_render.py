@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Advice rendering benchmark
+Renders every golden-test case (see test_advice_templates.py) with canned
+weather and reports renders/sec per handler. Save a run with --save and pass
+it to --baseline later to compare two versions of the handlers.
+
+Usage:
+    python benchmarks/bench_advice_render.py --save before.json
+    python benchmarks/bench_advice_render.py --baseline before.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+from farming_expert_app import farming_expert
+from test_advice_templates import CASES, FixedWeatherContext
+
+
+def renders_per_second(cases, duration):
+    """Round-robin over cases for about duration seconds"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        for _, intent, query, crop, location, season in cases:
+            # Fresh context per render, as per request
+            farming_expert._render_advice(intent, query, crop, location, season, FixedWeatherContext(farming_expert))
+        count += len(cases)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Advice rendering benchmark')
+    parser.add_argument('--duration', type=float, default=1.0, help='seconds per handler')
+    parser.add_argument('--save', help='write renders/sec per handler to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --save to compare against')
+    args = parser.parse_args()
+
+    by_intent = {}
+    for case in CASES:
+        by_intent.setdefault(case[1], []).append(case)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print("🌾 AgriGuru Advice Rendering Benchmark")
+    print("=" * 50)
+    header = f"{'handler':18} {'renders/s':>11}"
+    print(header + (f" {'baseline':>11} {'speedup':>8}" if baseline else ''))
+
+    results = {}
+    for intent, cases in by_intent.items():
+        renders_per_second(cases, 0.1)   # warm caches
+        results[intent] = rate = renders_per_second(cases, args.duration)
+        line = f"{intent:18} {rate:11.0f}"
+        if intent in baseline:
+            line += f" {baseline[intent]:11.0f} {rate / baseline[intent]:7.2f}x"
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Streaming advice benchmark
+Requests weather-dependent advice against the local stub weather server
+(with a configurable upstream latency) through the JSON endpoints and their
+/stream variants, and reports time to first byte and time to the full
+answer. Every request uses a city not seen before, so each one waits on a
+cold weather lookup; the streaming endpoints should get their first event
+out before that lookup finishes.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+from stub_weather_server import start_stub_server
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed_request(client, path, body):
+    """(seconds to the first non-empty chunk, seconds to the last chunk) for one POST"""
+    start = time.perf_counter()
+    response = client.post(path, json=body, buffered=False)
+    first = None
+    for chunk in response.response:
+        if chunk and first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    response.close()
+    return first, total
+
+
+def run(client, path, bodies):
+    firsts, totals = [], []
+    for body in bodies:
+        first, total = timed_request(client, path, body)
+        firsts.append(first)
+        totals.append(total)
+    return firsts, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming advice benchmark')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=300, help='stub weather latency in ms')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Streaming Advice Benchmark")
+    print("=" * 50)
+
+    server = start_stub_server(latency=args.latency / 1000)
+    os.environ['WEATHER_PROVIDER'] = 'openweathermap'
+    os.environ['WEATHER_API_URL'] = server.url
+    os.environ['WEATHER_API_KEY'] = 'stub'
+
+    from farming_expert_app import app
+    client = app.test_client()
+    client.post('/api/expert-advice', json={'query': 'how to plant rice', 'crop': 'rice', 'location': 'Warmup'})
+
+    workloads = [
+        ('expert-advice (planting)', '/api/expert-advice',
+         lambda city: {'query': 'how to plant rice', 'crop': 'rice', 'location': city, 'season': 'kharif'}),
+        ('weather-advice', '/api/weather-advice', lambda city: {'location': city, 'crop': 'wheat'})
+    ]
+    print(f"Upstream weather latency {args.latency:.0f} ms, {args.requests} cold lookups per run")
+    print(f"{'endpoint':<34} {'TTFB p50':>10} {'total p50':>10}")
+    for round_index, (name, path, make_body) in enumerate(workloads):
+        for suffix in ('', '/stream'):
+            tag = f"{round_index}{suffix.replace('/', '-')}"
+            bodies = [make_body(f"Town {tag} {i}") for i in range(args.requests)]
+            firsts, totals = run(client, path + suffix, bodies)
+            label = f"{name}{' stream' if suffix else ''}"
+            print(f"{label:<34} {percentile(firsts, 50) * 1000:8.1f} ms {percentile(totals, 50) * 1000:8.1f} ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+CPU training throughput benchmark
+Trains AgriEfficientNet from scratch on synthetic leaf-coloured images with
+the notebook's loop (batch 8, float32 eager, loss.item() and per-class
+metrics every step) and with throughput mode (cpu_training.py: batch 32,
+channels_last, optionally bf16 autocast and torch.compile). For each it
+reports steady-state images/sec/core and the wall time until validation
+accuracy reaches --target-acc.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+
+from cpu_training import (cpu_supports_bf16, optimize_for_cpu, prepare_model, train_epoch_throughput,
+                          validate_epoch_throughput)
+from inference_engine import AgriEfficientNet
+from training_data import synthetic_dataset
+
+NUM_CLASSES = 10
+
+
+def notebook_metrics_update(state, predictions, targets):
+    """AgriculturalMetrics.update from the notebook: a Python loop over classes with .item() calls"""
+    _, predicted = torch.max(predictions, 1)
+    state['total'] += targets.size(0)
+    state['correct'] += (predicted == targets).sum().item()
+    for i in range(NUM_CLASSES):
+        mask = targets == i
+        if mask.sum() > 0:
+            state['per_class_total'][i] += mask.sum().item()
+            state['per_class_correct'][i] += (predicted[mask] == targets[mask]).sum().item()
+
+
+def notebook_train_epoch(model, loader, criterion, optimizer):
+    """The notebook's train_epoch without the tqdm bar"""
+    model.train()
+    running_loss = 0.0
+    state = {'total': 0, 'correct': 0, 'per_class_total': [0] * NUM_CLASSES,
+             'per_class_correct': [0] * NUM_CLASSES}
+    for data, targets in loader:
+        optimizer.zero_grad()
+        outputs = model(data)
+        loss = criterion(outputs, targets)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+        optimizer.step()
+        running_loss += loss.item()
+        notebook_metrics_update(state, outputs, targets)
+        # What set_postfix formats every step
+        postfix = {'Loss': f'{loss.item():.4f}', 'Acc': f"{state['correct'] / state['total']:.4f}"}
+    return running_loss / len(loader), state['correct'] / state['total']
+
+
+def modes(args):
+    throughput = dict(batch_size=args.batch_size, throughput=True, bf16=False, compile=False)
+    found = [('notebook', dict(batch_size=8, throughput=False)),
+             ('throughput fp32', throughput),
+             ('throughput bf16', dict(throughput, bf16=True))]
+    if args.compile:
+        found.append(('throughput compiled', dict(throughput, compile=True)))
+    return found
+
+
+def run_mode(mode, train_set, val_set, args, threads):
+    torch.manual_seed(0)
+    model = AgriEfficientNet(NUM_CLASSES)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=1e-4)
+    criterion = nn.CrossEntropyLoss()
+    train_loader = DataLoader(train_set, batch_size=mode['batch_size'], shuffle=True)
+    val_loader = DataLoader(val_set, batch_size=64)
+
+    if mode['throughput']:
+        step_model = prepare_model(model, channels_last=True, compile=mode['compile'],
+                                   batch_size=mode['batch_size'])
+
+        def train_epoch():
+            return train_epoch_throughput(step_model, train_loader, criterion, optimizer,
+                                          accumulation_steps=args.accumulation, bf16=mode['bf16'])
+
+        def validate():
+            return validate_epoch_throughput(step_model, val_loader, criterion, bf16=mode['bf16'])[1]
+    else:
+        def train_epoch():
+            return notebook_train_epoch(model, train_loader, criterion, optimizer)
+
+        def validate():
+            model.eval()
+            correct = 0
+            with torch.no_grad():
+                for data, targets in val_loader:
+                    correct += (model(data).argmax(1) == targets).sum().item()
+            return correct / len(val_set)
+
+    start = time.perf_counter()
+    epoch_rates = []
+    reached = None
+    accuracy = 0.0
+    for epoch in range(1, args.max_epochs + 1):
+        epoch_start = time.perf_counter()
+        train_epoch()
+        epoch_rates.append(len(train_set) / (time.perf_counter() - epoch_start))
+        accuracy = validate()
+        if accuracy >= args.target_acc:
+            reached = (time.perf_counter() - start, epoch)
+            break
+    # The first epoch carries one-off costs (oneDNN primitive creation, compilation)
+    steady = epoch_rates[1:] or epoch_rates
+    return sum(steady) / len(steady) / threads, epoch_rates[0] / threads, reached, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU training throughput benchmark')
+    parser.add_argument('--image-size', type=int, default=64, help='training resolution (the notebook uses 224)')
+    parser.add_argument('--train', type=int, default=800)
+    parser.add_argument('--val', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=32, help='throughput mode micro-batch')
+    parser.add_argument('--accumulation', type=int, default=1, help='throughput mode micro-batches per step')
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--target-acc', type=float, default=0.9)
+    parser.add_argument('--max-epochs', type=int, default=8)
+    parser.add_argument('--threads', type=int, help='intra-op threads (default: optimize_for_cpu)')
+    parser.add_argument('--compile', action='store_true', help='also time torch.compile (slow first step)')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru CPU Training Benchmark")
+    print("=" * 50)
+    threads = optimize_for_cpu(args.threads)
+    print(f"{threads} threads, native bf16: {'yes' if cpu_supports_bf16() else 'no'}, "
+          f"{args.image_size}px, {args.train} train / {args.val} val images")
+    train_set = synthetic_dataset(args.train, args.image_size, NUM_CLASSES, seed=0)
+    val_set = synthetic_dataset(args.val, args.image_size, NUM_CLASSES, seed=1)
+
+    print(f"\n  {'mode':<20} {'img/s/core':>10} {'1st epoch':>10} {'time to ' + format(args.target_acc, '.0%'):>14}")
+    for name, mode in modes(args):
+        rate, first_rate, reached, accuracy = run_mode(mode, train_set, val_set, args, threads)
+        target = f"{reached[0]:.0f}s ({reached[1]} ep)" if reached else f"not reached ({accuracy:.0%})"
+        print(f"  {name:<20} {rate:>10.1f} {first_rate:>10.1f} {target:>14}")
+
+
+if __name__ == "__main__":
+    main()
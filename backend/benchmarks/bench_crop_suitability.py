@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Crop suitability benchmark
+Scores synthetic crops against synthetic district profiles with the
+vectorized SuitabilityEngine and with a per-pair Python loop applying the
+same rules, checks they agree, and reports the time to build a full
+districts x crops matrix (500 x 10k by default) and to rank every crop for
+one location.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from crop_suitability import (DOMINANT_SOIL_SCORE, FACTOR_WEIGHTS, OTHER_SOIL_SCORE, RAINFALL_BAND,
+                              UNSUITED_SOIL_SCORE, LocationProfile, SuitabilityEngine)
+
+SOILS = ['clay', 'loam', 'sandy', 'alluvial', 'black_cotton', 'red_loam', 'laterite', 'clay_loam',
+         'sandy_loam', 'saline', 'prairie', 'coastal_sandy']
+
+
+def synthetic_crops(count, rng):
+    crops = {}
+    for i in range(count):
+        temperature = rng.uniform(12, 32)
+        humidity = rng.uniform(40, 80)
+        ph = rng.uniform(5.5, 7.5)
+        crops[f"crop_{i}"] = {'optimal_conditions': {
+            'temperature': {'min': temperature - rng.uniform(4, 10), 'max': temperature + rng.uniform(4, 10),
+                            'optimal': temperature},
+            'humidity': {'min': humidity - 15, 'max': humidity + 15, 'optimal': humidity},
+            'rainfall': {'annual': rng.uniform(300, 2000)},
+            'soil_ph': {'min': ph - 1, 'max': ph + 1, 'optimal': ph},
+            'soil_type': rng.sample(SOILS, rng.randint(1, 4))
+        }}
+    return crops
+
+
+def synthetic_districts(count, rng):
+    profiles = []
+    for _ in range(count):
+        soils = rng.sample(SOILS, 3)
+        profiles.append(LocationProfile(
+            temperature=rng.uniform(5, 42), humidity=rng.uniform(20, 95), rainfall=rng.uniform(100, 3500),
+            # Soil pH is often unknown
+            soil_ph=rng.uniform(4.5, 8.5) if rng.random() < 0.5 else None,
+            soil_types=soils, dominant_soil=soils[0]
+        ))
+    return profiles
+
+
+def loop_score(crop, profile):
+    """The engine's rules for one crop and one location, one value at a time"""
+    def range_score(value, low, optimal, high):
+        span = (optimal - low) if value < optimal else (high - optimal)
+        return min(1.0, max(0.0, 1.0 - 0.5 * abs(value - optimal) / max(span, 1e-6)))
+
+    conditions = crop['optimal_conditions']
+    annual = conditions['rainfall']['annual']
+    ranges = {
+        'temperature': conditions['temperature'], 'humidity': conditions['humidity'], 'soil_ph': conditions['soil_ph'],
+        'rainfall': {'min': annual * RAINFALL_BAND[0], 'optimal': annual, 'max': annual * RAINFALL_BAND[1]}
+    }
+    total = weights = 0.0
+    for factor, spec in ranges.items():
+        value = getattr(profile, factor)
+        if value is not None:
+            total += FACTOR_WEIGHTS[factor] * range_score(value, spec['min'], spec['optimal'], spec['max'])
+            weights += FACTOR_WEIGHTS[factor]
+    if profile.dominant_soil in conditions['soil_type']:
+        soil = DOMINANT_SOIL_SCORE
+    elif set(profile.soil_types) & set(conditions['soil_type']):
+        soil = OTHER_SOIL_SCORE
+    else:
+        soil = UNSUITED_SOIL_SCORE
+    total += FACTOR_WEIGHTS['soil_type'] * soil
+    weights += FACTOR_WEIGHTS['soil_type']
+    return total / weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crop suitability benchmark')
+    parser.add_argument('--crops', type=int, default=500)
+    parser.add_argument('--districts', type=int, default=10000)
+    parser.add_argument('--loop-districts', type=int, default=200, help='districts scored by the Python loop')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Crop Suitability Benchmark")
+    print("=" * 50)
+    rng = random.Random(0)
+    crops = synthetic_crops(args.crops, rng)
+    districts = synthetic_districts(args.districts, rng)
+
+    start = time.perf_counter()
+    engine = SuitabilityEngine(crops)
+    pack_s = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix = engine.score_matrix(districts)
+    vector_s = time.perf_counter() - start
+
+    sample = districts[:args.loop_districts]
+    start = time.perf_counter()
+    looped = np.array([[loop_score(crop, profile) for crop in crops.values()] for profile in sample])
+    loop_s = (time.perf_counter() - start) * len(districts) / len(sample)
+    difference = float(np.abs(looped - matrix[:len(sample)]).max())
+
+    start = time.perf_counter()
+    for profile in districts[:200]:
+        engine.rank(profile, top=10)
+    rank_ms = (time.perf_counter() - start) / 200 * 1000
+
+    pairs = args.crops * args.districts
+    print(f"{args.crops} crops x {args.districts:,} districts = {pairs / 1e6:.1f}M scores "
+          f"({matrix.nbytes / 1e6:.0f} MB float32)")
+    print(f"  pack crops:          {pack_s * 1000:8.1f} ms")
+    print(f"  vectorized matrix:   {vector_s:8.2f} s")
+    print(f"  Python loop (est.):  {loop_s:8.1f} s  ({loop_s / vector_s:.0f}x slower)")
+    print(f"  max difference:      {difference:.2e}")
+    print(f"  rank one location:   {rank_ms:8.2f} ms")
+    return 0 if difference < 1e-4 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
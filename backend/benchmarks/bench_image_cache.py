@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Image result cache benchmark
+Measures how far pHash and dHash move when a photo is recompressed,
+resized, trimmed or brightened, against the distance between unrelated
+photos, to pick IMAGE_CACHE_MAX_DISTANCE. It then times /api/analyze-crop
+for a first upload, a byte-identical retry and a recompressed re-send.
+Without --model a randomly initialised checkpoint with the exported layout
+is used.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from image_cache import HASHERS
+
+
+def leaf_photo(rng, size=(1024, 768)):
+    """Smooth random colour field, so hashes see structure rather than pixel noise"""
+    coarse = rng.integers(0, 255, (12, 16, 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize(size, Image.BICUBIC)
+
+
+def jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def reopen(data):
+    return Image.open(io.BytesIO(data)).convert('RGB')
+
+
+# How a resent photo typically differs from the original
+VARIANTS = {
+    'jpeg q60': lambda image: reopen(jpeg(image, 60)),
+    'resize 50%': lambda image: image.resize((image.width // 2, image.height // 2), Image.BILINEAR),
+    'trim 3%': lambda image: image.crop((image.width * 3 // 100, image.height * 3 // 100,
+                                         image.width * 97 // 100, image.height * 97 // 100)),
+    'trim 10%': lambda image: image.crop((image.width // 10, image.height // 10,
+                                          image.width * 9 // 10, image.height * 9 // 10)),
+    'brighter 10%': lambda image: ImageEnhance.Brightness(image).enhance(1.1)
+}
+
+
+def hash_distances(photos):
+    print(f"Hamming distances over {len(photos)} photos (max for the same photo, min between different ones):")
+    for name, hasher in HASHERS.items():
+        start = time.perf_counter()
+        hashes = [hasher(photo) for photo in photos]
+        per_hash = (time.perf_counter() - start) / len(photos) * 1000
+        same = {variant: max((hasher(change(photo)) ^ h).bit_count() for photo, h in zip(photos, hashes))
+                for variant, change in VARIANTS.items()}
+        different = min((a ^ b).bit_count() for i, a in enumerate(hashes) for b in hashes[i + 1:])
+        same_text = ', '.join(f"{variant} {distance}" for variant, distance in same.items())
+        print(f"  {name}  {per_hash:5.2f} ms/hash  same: {same_text}  different: >= {different}")
+
+
+def endpoint_latency(model, rounds):
+    os.environ.update(DISEASE_MODEL_PATH=model, INFERENCE_WORKERS='0', KNOWLEDGE_WATCH_INTERVAL='0')
+    from farming_expert_app import app, image_cache
+
+    client = app.test_client()
+    rng = np.random.default_rng(1)
+
+    def upload(data):
+        start = time.perf_counter()
+        response = client.post('/api/analyze-crop', data={'image': (io.BytesIO(data), 'leaf.jpg'), 'crop_type': 'tomato'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return time.perf_counter() - start, response.get_json()['image_cache']
+
+    # Load the model outside the timings
+    upload(jpeg(leaf_photo(rng), 90))
+    timings = {}
+    for _ in range(rounds):
+        photo = leaf_photo(rng)
+        original = jpeg(photo, 90)
+        for data in (original, original, jpeg(photo, 60)):
+            elapsed, outcome = upload(data)
+            timings.setdefault(outcome, []).append(elapsed)
+
+    print(f"\n/api/analyze-crop over {rounds} photos, each sent as original, exact retry and recompressed copy:")
+    for outcome in ('miss', 'exact', 'similar'):
+        values = timings.get(outcome, [])
+        if values:
+            print(f"  {outcome:<8} {len(values):4d} requests  mean {sum(values) / len(values) * 1000:7.1f} ms")
+    stats = image_cache.stats()
+    print(f"  hit rate {stats['hit_rate']:.0%} (exact {stats['exact_hit_rate']:.0%}), "
+          f"{stats['size']} entries, {stats['bytes'] / 1024:.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Image result cache benchmark')
+    parser.add_argument('--model', help='exported agri_efficientnet_model.pth (default: random weights)')
+    parser.add_argument('--photos', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Image Cache Benchmark")
+    print("=" * 50)
+    rng = np.random.default_rng(0)
+    hash_distances([leaf_photo(rng) for _ in range(args.photos)])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if model is None:
+            from bench_inference import write_random_checkpoint
+            model = os.path.join(tmp, 'agri_efficientnet_model.pth')
+            write_random_checkpoint(model)
+        endpoint_latency(model, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Disease inference benchmark
+Fires concurrent predictions at InferenceEngine with different micro-batch
+windows and reports images/sec and p50/p99 latency. Without --model a
+randomly initialised checkpoint with the exported layout is used, which has
+the same cost per image as the trained one.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from PIL import Image
+
+from inference_engine import AgriEfficientNet, InferenceEngine
+
+LABELS = [
+    'healthy', 'bacterial_spot', 'early_blight', 'late_blight',
+    'leaf_mold', 'septoria_leaf_spot', 'spider_mites',
+    'target_spot', 'mosaic_virus', 'yellow_leaf_curl_virus'
+]
+
+# (max_batch, max_wait_ms); batch 1 is a plain per-image forward pass
+WINDOWS = [(1, 0), (4, 5), (8, 10), (16, 20)]
+
+
+def write_random_checkpoint(path):
+    """Checkpoint with the notebook's export layout and untrained weights"""
+    torch.manual_seed(0)
+    model = AgriEfficientNet(len(LABELS))
+    torch.save({
+        'model_state_dict': model.state_dict(),
+        'model_config': {'model_name': 'efficientnet-b0', 'num_classes': len(LABELS)},
+        'labels': LABELS
+    }, path)
+
+
+def sample_images(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [Image.fromarray(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(engine, images, concurrency):
+    latencies = []
+    lock = threading.Lock()
+
+    def client(image):
+        start = time.perf_counter()
+        engine.predict(image)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, images))
+    return len(images) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Disease inference benchmark')
+    parser.add_argument('--model', help='exported agri_efficientnet_model.pth (default: random weights)')
+    parser.add_argument('--requests', type=int, default=48)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--threads', type=int, default=0, help='torch threads (0 = torch default)')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Disease Inference Benchmark")
+    print("=" * 50)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"CPU threads: {torch.get_num_threads()} | {args.requests} requests, {args.concurrency} concurrent clients")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = args.model
+        if not model_path:
+            model_path = os.path.join(workdir, 'agri_efficientnet_model.pth')
+            write_random_checkpoint(model_path)
+
+        images = sample_images(args.requests)
+        for max_batch, max_wait_ms in WINDOWS:
+            engine = InferenceEngine(model_path, labels=LABELS, max_batch=max_batch, max_wait_ms=max_wait_ms).load()
+            run(engine, images[:max(2, max_batch)], args.concurrency)   # warm-up
+            throughput, latencies = run(engine, images, args.concurrency)
+            stats = engine.batcher.stats()
+            print(f"batch ≤{max_batch:2} / {max_wait_ms:4.0f} ms window: {throughput:6.1f} img/s | "
+                  f"p50 {percentile(latencies, 50) * 1000:7.1f} ms | p99 {percentile(latencies, 99) * 1000:7.1f} ms | "
+                  f"mean batch {stats['mean_batch']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Inference pool benchmark
+Keeps /api/analyze-crop saturated with concurrent uploads while timing
+/api/expert-advice requests sent alongside them, once with forward passes on
+the request threads (INFERENCE_WORKERS=0) and once with the process pool.
+Advice latency shows how much image analysis holds up text requests; images/s
+and 429 counts show the pool's throughput and backpressure. Without --model a
+randomly initialised checkpoint with the exported layout is used.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(args):
+    """Run in a child interpreter configured through the environment; prints one JSON line"""
+    from PIL import Image
+
+    from farming_expert_app import app, disease_engine
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (1280, 960), (92, 140, 64)).save(buffer, 'JPEG')
+    photo = buffer.getvalue()
+    client = app.test_client()
+    assert client.post('/api/analyze-crop', data={'image': (io.BytesIO(photo), 'leaf.jpg')}).status_code == 200
+
+    stop = threading.Event()
+    image_codes = []
+    image_latencies = []
+    advice_latencies = []
+    lock = threading.Lock()
+
+    def uploader():
+        upload_client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = upload_client.post('/api/analyze-crop', data={'image': (io.BytesIO(photo), 'leaf.jpg')})
+            with lock:
+                image_codes.append(response.status_code)
+                if response.status_code == 200:
+                    image_latencies.append(time.perf_counter() - start)
+            if response.status_code == 429:
+                # Well-behaved clients back off as told
+                stop.wait(float(response.headers['Retry-After']))
+
+    def advisor():
+        advice_client = app.test_client()
+        i = 0
+        while not stop.is_set():
+            # A new location each time, so every request renders instead of hitting the advice cache
+            body = {'query': 'How to plant rice?', 'crop': 'rice', 'location': f"Village {os.getpid()}-{i}"}
+            start = time.perf_counter()
+            assert advice_client.post('/api/expert-advice', json=body).status_code == 200
+            with lock:
+                advice_latencies.append(time.perf_counter() - start)
+            i += 1
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=uploader) for _ in range(args.uploaders)] + [threading.Thread(target=advisor)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with open('/proc/self/status') as f:
+        web_rss = int(dict(line.split(':', 1) for line in f)['VmRSS'].split()[0]) / 1024
+    stats = disease_engine.stats()
+    disease_engine.close()
+    print(json.dumps({
+        'images_per_s': image_codes.count(200) / args.duration,
+        'rejected': image_codes.count(429),
+        'image_p99_ms': percentile(image_latencies, 99) * 1000,
+        'web_rss_mb': web_rss,
+        'advice_count': len(advice_latencies),
+        'advice_p50_ms': percentile(advice_latencies, 50) * 1000,
+        'advice_p99_ms': percentile(advice_latencies, 99) * 1000,
+        'pool': stats.get('pool')
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inference pool benchmark')
+    parser.add_argument('--model', help='exported agri_efficientnet_model.pth (default: random weights)')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--uploaders', type=int, default=8, help='concurrent upload loops')
+    parser.add_argument('--workers', type=int, default=1, help='inference processes for the pool run')
+    parser.add_argument('--queue-size', type=int, default=8)
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args)
+        return
+
+    print("🌾 AgriGuru Inference Pool Benchmark")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if model is None:
+            from bench_inference import write_random_checkpoint
+            model = os.path.join(tmp, 'agri_efficientnet_model.pth')
+            write_random_checkpoint(model)
+
+        print(f"{args.uploaders} upload loops + 1 advice loop for {args.duration:.0f}s, {os.cpu_count()} CPUs")
+        for name, workers in (('in-process', 0), (f"pool of {args.workers}", args.workers)):
+            # Every upload is the same photo; without IMAGE_CACHE_MB=0 the cache would answer them all
+            env = dict(os.environ, DISEASE_MODEL_PATH=model, INFERENCE_WORKERS=str(workers),
+                       INFERENCE_QUEUE_SIZE=str(args.queue_size), KNOWLEDGE_WATCH_INTERVAL='0', IMAGE_CACHE_MB='0')
+            command = [sys.executable, os.path.abspath(__file__), '--measure', '--duration', str(args.duration),
+                       '--uploaders', str(args.uploaders)]
+            output = subprocess.run(command, cwd=BACKEND, env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{name:<12} {result['images_per_s']:6.1f} images/s (p99 {result['image_p99_ms']:6.0f} ms)  "
+                  f"429s {result['rejected']:4d}  advice p50 {result['advice_p50_ms']:5.1f} ms "
+                  f"p99 {result['advice_p99_ms']:5.1f} ms  web RSS {result['web_rss_mb']:4.0f} MB")
+            if result['pool']:
+                pool = result['pool']
+                print(f"{'':<12} mean batch {pool['mean_batch']}, restarts {pool['restarts']}, "
+                      f"mean latency {pool['mean_latency_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
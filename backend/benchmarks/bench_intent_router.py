@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for query intent routing
+Compares the compiled IntentRouter against the old chained substring checks
+on a corpus of synthetic farmer queries, and lists the queries they route
+differently (test_intent_router.py pins the intended differences)
+"""
+import os
+import random
+from collections import Counter
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import IntentRouter
+
+CORPUS_SIZE = 100000
+
+CROPS = ['rice', 'wheat', 'cotton', 'maize', 'sugarcane', None]
+LOCATIONS = ['Pune, Maharashtra', 'Punjab', 'Kerala', None]
+TEMPLATES = [
+    'How to plant {crop}?',
+    'What fertilizers for {crop}?',
+    'Irrigation schedule for {crop} in summer',
+    '{crop} pest management strategies',
+    'When should I harvest {crop} and what yield to expect?',
+    'Best time to sow {crop}',
+    'What is the weather like for {crop} cultivation this week?',
+    'Soil ph and nutrient testing for {crop}',
+    'Market prices for {crop} in my mandi',
+    'Kharif season activities for {crop}',
+    'Organic and sustainable farming practices',
+    'Modern technology and equipment for small farms',
+    'My {crop} leaves have brown spots, is it a disease?',
+    'Tell me something useful about {crop}',
+]
+
+
+def legacy_route(query, crop=None, location=None, crop_database=('rice', 'wheat', 'cotton', 'maize')):
+    """The if/elif ladder get_expert_advice used before the router existed"""
+    query_lower = query.lower()
+    if 'weather' in query_lower or 'temperature' in query_lower or 'rain' in query_lower or 'climate' in query_lower:
+        return 'weather_location' if location else 'weather_general'
+    if 'soil' in query_lower and location:
+        return 'location_soil'
+    if crop and crop in crop_database:
+        if 'plant' in query_lower or 'sow' in query_lower or 'grow' in query_lower:
+            return 'planting'
+        elif 'fertilizer' in query_lower or 'nutrition' in query_lower or 'nutrient' in query_lower:
+            return 'fertilizer'
+        elif 'irrigation' in query_lower or 'water' in query_lower:
+            return 'irrigation'
+        elif 'pest' in query_lower or 'disease' in query_lower or 'insect' in query_lower:
+            return 'pest'
+        elif 'harvest' in query_lower or 'yield' in query_lower:
+            return 'harvest'
+        elif 'time' in query_lower or 'when' in query_lower:
+            return 'timing'
+        else:
+            return 'crop_overview'
+    if 'soil' in query_lower or 'ph' in query_lower or 'nutrient' in query_lower:
+        return 'soil'
+    elif 'market' in query_lower or 'price' in query_lower or 'sell' in query_lower:
+        return 'market'
+    elif 'season' in query_lower or 'calendar' in query_lower or 'kharif' in query_lower or 'rabi' in query_lower:
+        return 'seasonal'
+    elif 'organic' in query_lower or 'sustainable' in query_lower:
+        return 'sustainable'
+    elif 'technology' in query_lower or 'modern' in query_lower or 'equipment' in query_lower:
+        return 'technology'
+    return 'general'
+
+
+def build_corpus(size, seed=42):
+    """Deterministic synthetic query corpus"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        crop = rng.choice(CROPS)
+        query = rng.choice(TEMPLATES).format(crop=crop or 'crops')
+        corpus.append((query, crop, rng.choice(LOCATIONS)))
+    return corpus
+
+
+def pad_router(router, extra_keywords, seed=7):
+    """Register extra synthetic keywords to show routing cost does not grow with them"""
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+    keywords = {}
+    while len(keywords) < extra_keywords:
+        keywords[''.join(rng.choice(alphabet) for _ in range(rng.randint(5, 10)))] = 1
+    router.add_intent('synthetic_padding', keywords)
+    return router.compile()
+
+
+def time_per_query(route, corpus):
+    """Average routing cost in microseconds"""
+    start = time.perf_counter()
+    for query, crop, location in corpus:
+        route(query, crop, location)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+
+def main():
+    print("🌾 AgriGuru Intent Routing Benchmark")
+    print("=" * 50)
+
+    # Importing the app pulls in torch/flask; construct only what routing needs
+    from farming_expert_app import FarmingExpertAI
+    expert = FarmingExpertAI()
+
+    corpus = build_corpus(CORPUS_SIZE)
+    avg_length = sum(len(q) for q, _, _ in corpus) / len(corpus)
+    keyword_count = len(expert.intent_router.keyword_weights)
+    print(f"Corpus: {len(corpus):,} queries, average length {avg_length:.1f} chars")
+    print(f"Router: {len(expert.intent_router.intents)} intents, {keyword_count} keywords")
+    print()
+
+    legacy_us = time_per_query(legacy_route, corpus)
+    router_us = time_per_query(lambda q, c, l: expert.route_query(q, c, l, retrieval=False), corpus)
+    retrieval_us = time_per_query(expert.route_query, corpus)
+    print(f"Legacy if/elif ladder:    {legacy_us:8.2f} µs/query")
+    print(f"Compiled IntentRouter:    {router_us:8.2f} µs/query")
+    print(f"  + retrieval fallback:   {retrieval_us:8.2f} µs/query")
+
+    # Retrieval only changes queries the keywords left on the default intent
+    agreements = sum(
+        legacy_route(q, c, l) == expert.route_query(q, c, l, retrieval=False).intent for q, c, l in corpus
+    )
+    rerouted = sum(expert.route_query(q, c, l).retrieval is not None for q, c, l in corpus)
+    print(f"Agreement with legacy routing: {agreements / len(corpus):.1%}")
+    # Where they differ, the router picks the strongest topic rather than the first rung that matched
+    changes = Counter(
+        (legacy_route(q, c, l), expert.route_query(q, c, l, retrieval=False).intent) for q, c, l in corpus
+    )
+    for (legacy, routed), count in sorted(changes.items(), key=lambda item: -item[1]):
+        if legacy != routed:
+            print(f"  {legacy:>14} -> {routed:<12} {count / len(corpus):6.1%}")
+    print(f"Routed by retrieval instead of the default: {rerouted / len(corpus):.1%}")
+    print()
+
+    # Routing cost should stay flat as the keyword table grows
+    print("Keyword table scaling (router only):")
+    sample = corpus[:20000]
+    for extra in (0, 1000, 10000):
+        router = IntentRouter()
+        for name, requires in expert.intent_router.intents:
+            keywords = {
+                kw: weight
+                for kw, entries in expert.intent_router.keyword_weights.items()
+                for index, weight in entries
+                if expert.intent_router.intents[index][0] == name
+            }
+            router.add_intent(name, keywords, requires)
+        pad_router(router, extra)
+        cost = time_per_query(lambda q, c, l: router.route(q, ('crop', 'location')), sample)
+        print(f"  {keyword_count + extra:6,} keywords: {cost:8.2f} µs/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Knowledge base cold-start benchmark
+Scales the built-in knowledge to 1x/10x/100x its size and, each in a fresh
+interpreter, compares importing it as a Python dict-literal module (how the
+knowledge shipped before) against constructing FarmingExpertAI() over the
+compiled bundle, reporting wall time, resident memory and records decoded.
+The first location query, which builds the location index, is timed after.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from knowledge_base import SECTION_DEPTHS, _split_records, compile_bundle
+
+SCALES = (1, 10, 100)
+
+# Runs in a child interpreter: argv = mode, path
+PROBE = r'''
+import os, sys, time
+sys.path.insert(0, {backend!r})
+os.environ['KNOWLEDGE_WATCH_INTERVAL'] = '0'
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+mode, path = sys.argv[1], sys.argv[2]
+if mode == 'module':
+    base = rss_kb()
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.dirname(path))
+    module = __import__(os.path.basename(path)[:-3])
+    print((time.perf_counter() - start) * 1000, rss_kb() - base)
+    sys.exit()
+
+# Importing the app builds its own instance over the real bundle; that is common to every scale
+import farming_expert_app
+from knowledge_base import KnowledgeBundle
+
+decoded = [0]
+load_record = KnowledgeBundle.load_record
+def counting_load_record(self, section, record_path):
+    decoded[0] += 1
+    return load_record(self, section, record_path)
+KnowledgeBundle.load_record = counting_load_record
+
+os.environ['KNOWLEDGE_BUNDLE'] = path
+base = rss_kb()
+start = time.perf_counter()
+expert = farming_expert_app.FarmingExpertAI()
+ready = time.perf_counter()
+startup = (ready - start) * 1000, rss_kb() - base, decoded[0]
+expert.get_location_soil_recommendations('Pune, Maharashtra')
+first_ms = (time.perf_counter() - ready) * 1000
+print(*startup, first_ms, decoded[0], rss_kb() - base)
+'''
+
+
+def scale_sections(sections, factor):
+    """Copy every record factor times under suffixed keys ('rice', 'rice_1', ...)"""
+    scaled = {}
+    for name, value in sections.items():
+        depth = SECTION_DEPTHS.get(name, 1)
+        result = {}
+        for path, record in _split_records(value, depth):
+            if not path:
+                result = record
+                continue
+            for copy in range(factor):
+                leaf = path[-1] if copy == 0 else f"{path[-1]}_{copy}"
+                node = result
+                for part in path[:-1]:
+                    node = node.setdefault(part, {})
+                node[leaf] = record
+        scaled[name] = result
+    return scaled
+
+
+def probe(mode, path, clear_pyc=False):
+    if clear_pyc:
+        cache = os.path.join(os.path.dirname(path), '__pycache__')
+        for name in os.listdir(cache) if os.path.isdir(cache) else ():
+            os.remove(os.path.join(cache, name))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(backend=BACKEND_DIR), mode, path],
+        capture_output=True, text=True, check=True
+    ).stdout.split('\n')[-2].split()
+    return [float(value) for value in output]
+
+
+def main():
+    print("🌾 AgriGuru Knowledge Base Cold-Start Benchmark")
+    print("=" * 50)
+
+    from farming_expert_app import farming_expert
+    sections = farming_expert.build_inline_knowledge()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'scale':>6} {'records':>8} | {'dict module (first / cached import)':>36} | "
+              f"{'FarmingExpertAI()':>27} | {'first location query':>29}")
+        for factor in SCALES:
+            scaled = scale_sections(sections, factor)
+
+            module_path = os.path.join(workdir, f"knowledge_x{factor}.py")
+            with open(module_path, 'w', encoding='utf-8') as f:
+                f.write(f"KNOWLEDGE = {scaled!r}\n")
+            bundle_path = os.path.join(workdir, f"knowledge_x{factor}.db")
+            meta = compile_bundle(scaled, bundle_path, source=f"x{factor}")
+
+            first_ms, first_rss = probe('module', module_path, clear_pyc=True)
+            cached_ms, cached_rss = probe('module', module_path)
+            init_ms, init_rss, init_records, query_ms, query_records, query_rss = probe('app', bundle_path)
+
+            print(f"{factor:>5}x {meta['records']:>8} | "
+                  f"{first_ms:7.1f} / {cached_ms:6.1f} ms, {first_rss / 1024:5.1f} / {cached_rss / 1024:5.1f} MB | "
+                  f"{init_ms:6.1f} ms, {init_rss / 1024:5.1f} MB, {init_records:4.0f} rec | "
+                  f"{query_ms:6.1f} ms, {query_rss / 1024:5.1f} MB, {query_records:5.0f} rec")
+
+        print()
+        print("Startup opens the bundle and reads the record index only; the first location query")
+        print("builds the location index, decoding the location records (MB is the total since startup).")
+
+
+if __name__ == "__main__":
+    main()
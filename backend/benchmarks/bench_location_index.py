@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Location resolution benchmark
+Compares LocationIndex.resolve against the old linear substring scan over
+states, with the real location data and with thousands of synthetic districts
+"""
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from location_index import LocationIndex
+
+QUERIES = ['Pune, Maharashtra', 'pune', 'MH', 'maharastra', 'Kerala', 'Kolkata, WB',
+           'rice farming in west bengal', 'Bengal', 'Punjabi Bagh, Delhi', 'Iowa', 'Delhi', 'a']
+
+
+def legacy_resolve(location_data, location):
+    """The linear scan get_location_soil_recommendations used before the index"""
+    location_lower = location.lower()
+    for country in location_data.values():
+        for state, data in country['states'].items():
+            if state in location_lower or location_lower in state:
+                return state
+            for district in data.get('districts', ()):
+                if district in location_lower or location_lower in district:
+                    return state
+    return None
+
+
+def add_districts(location_data, count, seed=11):
+    """Spread synthetic district names across the existing regions"""
+    rng = random.Random(seed)
+    data = copy.deepcopy(location_data)
+    regions = [data[c]['states'][r] for c in data for r in data[c]['states']]
+    names = set()
+    syllables = ['ka', 'ra', 'pur', 'nag', 'bad', 'gar', 'han', 'sin', 'dhi', 'tal', 'mer', 'vel', 'kot', 'ur']
+    while len(names) < count:
+        names.add(''.join(rng.choice(syllables) for _ in range(rng.randint(3, 5))))
+    for i, name in enumerate(sorted(names)):
+        regions[i % len(regions)].setdefault('districts', []).append(name)
+    return data, sorted(names)
+
+
+def time_calls(fn, inputs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in inputs:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6
+
+
+def main():
+    print("🌾 AgriGuru Location Resolver Benchmark")
+    print("=" * 50)
+
+    from farming_expert_app import FarmingExpertAI
+    expert = FarmingExpertAI()
+    aliases = expert._initialize_location_aliases()
+    # Plain dicts: expert.location_data is a lazy view over the knowledge bundle
+    location_data = expert.build_inline_knowledge()['location_data']
+
+    print("Resolution of sample inputs:")
+    for text in QUERIES:
+        match = expert.location_index.resolve(text)
+        legacy = legacy_resolve(location_data, text)
+        print(f"  {text!r:32} index={match.key if match else None!s:22} legacy={legacy}")
+    print()
+
+    for districts in (0, 1000, 5000):
+        data, names = add_districts(location_data, districts)
+        start = time.perf_counter()
+        index = LocationIndex.build(data, aliases)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        inputs = QUERIES + names[:50]
+        repeat = 200 if districts == 0 else 5
+        legacy_us = time_calls(lambda t: legacy_resolve(data, t), inputs, repeat)
+        index_us = time_calls(index.resolve, inputs, repeat * 4)
+        print(f"{districts:5} districts: build {build_ms:7.1f} ms | "
+              f"legacy scan {legacy_us:9.1f} µs/call | index {index_us:6.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Image preprocessing benchmark
+Compares the old path (full-resolution decode, Resize, ToTensor, Normalize in
+separate passes) with image_preprocessing (header checks, reduced-scale JPEG
+decode, uint8 resize, table-lookup normalize into a reused batch buffer) on
+phone-sized JPEGs. Each path runs in its own interpreter so peak RSS is
+comparable (Linux: measured from /proc/self/status).
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+from PIL import Image
+
+# (label, width, height)
+PHOTOS = [('12 MP', 4000, 3000), ('3 MP', 2048, 1536), ('0.3 MP', 640, 480)]
+
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+# Runs in a child interpreter: argv = path, image file, repeat
+PROBE = r'''
+import io, sys, time
+sys.path.insert(0, {backend!r})
+import numpy as np
+import torch
+from PIL import Image
+
+MEAN, STD, SIZE = {mean!r}, {std!r}, 224
+mode, image_path, repeat = sys.argv[1], sys.argv[2], int(sys.argv[3])
+data = open(image_path, 'rb').read()
+
+def legacy(data):
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    image = image.resize((SIZE, SIZE), Image.BILINEAR)
+    tensor = torch.from_numpy(np.asarray(image, dtype=np.float32).transpose(2, 0, 1) / 255.0)
+    mean = torch.tensor(MEAN).view(3, 1, 1)
+    std = torch.tensor(STD).view(3, 1, 1)
+    return ((tensor - mean) / std).unsqueeze(0)
+
+from image_preprocessing import Normalizer, decode_upload, resize_for_model
+normalizer = Normalizer(MEAN, STD)
+buffer = np.empty((8, 3, SIZE, SIZE), dtype=np.float32)
+
+def fast(data):
+    image = decode_upload(data, SIZE, 50_000_000)
+    return torch.from_numpy(normalizer.batch([resize_for_model(image, SIZE)], out=buffer))
+
+def rss_kb(field):
+    for line in open('/proc/self/status'):
+        if line.startswith(field):
+            return int(line.split()[1])
+
+run = legacy if mode == 'legacy' else fast
+run(data)
+out = None
+# Reset the kernel's high-water mark so import-time peaks do not hide the per-image one
+with open('/proc/self/clear_refs', 'w') as f:
+    f.write('5')
+base = rss_kb('VmRSS:')
+start = time.perf_counter()
+for _ in range(repeat):
+    out = run(data)
+elapsed = (time.perf_counter() - start) / repeat * 1000
+peak = rss_kb('VmHWM:') - base
+np.save(sys.stdout.buffer, out.numpy())
+sys.stderr.write(f"{{elapsed}} {{peak}}\n")
+'''
+
+
+def phone_photo(width, height, seed=0):
+    """Leaf-like synthetic photo: smooth colour field plus sensor noise, as a quality-90 JPEG"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    green = 110 + 60 * np.sin(x / 97.0) * np.cos(y / 53.0)
+    pixels = np.stack([green * 0.55, green, green * 0.35], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def probe(mode, image_path, repeat):
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(backend=BACKEND_DIR, mean=MEAN, std=STD), mode, image_path, str(repeat)],
+        capture_output=True, check=True
+    )
+    elapsed, peak_kb = result.stderr.decode().split()[-2:]
+    return float(elapsed), int(peak_kb), np.load(io.BytesIO(result.stdout))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Image preprocessing benchmark')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Image Preprocessing Benchmark")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, width, height in PHOTOS:
+            path = os.path.join(workdir, f"{width}x{height}.jpg")
+            with open(path, 'wb') as f:
+                f.write(phone_photo(width, height))
+
+            legacy_ms, legacy_kb, legacy_out = probe('legacy', path, args.repeat)
+            fast_ms, fast_kb, fast_out = probe('fast', path, args.repeat)
+            drift = np.abs(legacy_out - fast_out).mean()
+            print(f"{label:>6} ({os.path.getsize(path) / 1e6:4.1f} MB JPEG): "
+                  f"legacy {legacy_ms:7.1f} ms, peak +{legacy_kb / 1024:6.1f} MB | "
+                  f"fast {fast_ms:6.1f} ms, peak +{fast_kb / 1024:5.1f} MB | "
+                  f"{legacy_ms / fast_ms:4.1f}x, mean |Δ| {drift:.3f}")
+
+
+if __name__ == "__main__":
+    main()
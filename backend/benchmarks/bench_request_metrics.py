@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Request metrics benchmark
+Measures what request_metrics costs:
+- nanoseconds per counter increment and histogram observation, with the
+  values in memory and in an mmap'd METRICS_DIR file
+- the microseconds the metrics add to a cached advice request, calling the
+  app the way a gunicorn worker does with the metrics' request hooks and
+  with gunicorn's default ones (the WSGI middleware against the bare app
+  when gunicorn is not installed)
+- worker CPU per cached advice request under serve.py with REQUEST_METRICS
+  on and off, read from /proc; the metrics' cost is gated against it
+
+The serve.py run also scrapes /metrics and checks that the request count
+summed over the workers' files equals the requests sent. Then --processes
+forked writers share one METRICS_DIR, and a scrape must sum their counters
+and histograms and drop the gauges of the processes that have exited.
+Exits non-zero when the overhead is above --max-overhead-pct of a request
+or a total is wrong.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+os.environ.setdefault('WEATHER_PROVIDER', 'mock')
+
+from request_metrics import GunicornRequestMetrics, MetricsRegistry, clear_directory
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADVICE_REQUEST = {'query': 'Fertilizer for rice', 'crop': 'rice', 'location': 'Pune'}
+ADVICE_COUNT = re.compile(r'agriguru_http_request_duration_seconds_count'
+                          r'\{method="POST",route="/api/expert-advice",status="200"\} (\S+)')
+WARMUP_REQUESTS = 100
+
+
+def per_call_ns(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def recording_costs(count, directory=None):
+    """(ns per counter inc, ns per histogram observe) in a scratch registry"""
+    registry = MetricsRegistry()
+    counter = registry.counter('bench_total', 'bench', ('route',))
+    histogram = registry.histogram('bench_seconds', 'bench', ('route',))
+    registry.use_directory(directory)
+    try:
+        inc = per_call_ns(lambda: counter.labels('/api/expert-advice').inc(), count)
+        observe = per_call_ns(lambda: histogram.labels('/api/expert-advice').observe(0.0042), count)
+    finally:
+        registry.use_directory(None)
+    return inc, observe
+
+
+def wsgi_request_us(wsgi_app, requests):
+    """Mean microseconds per cached advice request, calling wsgi_app directly"""
+    from werkzeug.test import EnvironBuilder
+
+    body = json.dumps(ADVICE_REQUEST).encode()
+    environ = EnvironBuilder(path='/api/expert-advice', method='POST', data=body,
+                             content_type='application/json').get_environ()
+
+    def serve():
+        response = wsgi_app(dict(environ, **{'wsgi.input': io.BytesIO(body)}),
+                            lambda status, headers, exc_info=None: None)
+        for _ in response:
+            pass
+        if hasattr(response, 'close'):
+            response.close()
+
+    return per_call_ns(serve, requests) / 1000
+
+
+def gunicorn_app(wsgi_app, pre_request, post_request):
+    """wsgi_app called with gunicorn's request hooks around it, as a gthread worker calls it"""
+    from types import SimpleNamespace
+
+    from gunicorn.config import Config
+    from gunicorn.glogging import Logger
+
+    worker = SimpleNamespace(log=Logger(Config()))
+
+    def serve(environ, start_response):
+        request = SimpleNamespace(method='POST', path='/api/expert-advice')
+        response = SimpleNamespace(status=None, sent=0)
+
+        def gunicorn_start_response(status, headers, exc_info=None):
+            response.status = status
+
+        pre_request(worker, request)
+        body = wsgi_app(environ, gunicorn_start_response)
+        for chunk in body:
+            response.sent += len(chunk)
+        body.close()
+        post_request(worker, request, environ, response)
+        return []
+
+    return serve
+
+
+def metrics_us(requests, rounds, served):
+    """Median us per cached advice request (metrics on, off); rounds alternate so drift hits both"""
+    import farming_expert_app
+
+    middleware = farming_expert_app.app.wsgi_app
+    bare = middleware.wsgi_app
+    if served:
+        from gunicorn.config import Config
+
+        recorder, defaults = GunicornRequestMetrics(), Config()
+        on = gunicorn_app(bare, recorder.pre_request, recorder.post_request)
+        off = gunicorn_app(bare, defaults.pre_request, defaults.post_request)
+    else:
+        on, off = middleware, bare
+    wsgi_request_us(on, WARMUP_REQUESTS)
+    with_metrics, without = [], []
+    for _ in range(rounds):
+        with_metrics.append(wsgi_request_us(on, requests))
+        without.append(wsgi_request_us(off, requests))
+    return statistics.median(with_metrics), statistics.median(without)
+
+
+def children_cpu_seconds(parent):
+    """{pid: user + system CPU seconds} of parent's child processes"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    usage = {}
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            usage[int(pid)] = (int(fields[11]) + int(fields[12])) / ticks
+    return usage
+
+
+def served_request_us(workers, metrics, count, port):
+    """(worker CPU us per cached advice request, requests counted by /metrics) under serve.py"""
+    import requests
+
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        env = dict(os.environ, REQUEST_METRICS='1' if metrics else '0', METRICS_DIR=metrics_dir)
+        server = subprocess.Popen([sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port),
+                                   '--workers', str(workers)],
+                                  cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + 180
+            while True:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError('serve.py did not start')
+                try:
+                    requests.get(url + '/', timeout=1)
+                    break
+                except requests.RequestException:
+                    time.sleep(0.2)
+
+            for _ in range(WARMUP_REQUESTS):
+                requests.post(url + '/api/expert-advice', json=ADVICE_REQUEST, timeout=30)
+            before = children_cpu_seconds(server.pid)
+            for i in range(count):
+                if i % 50 == 0:
+                    # Fresh connections spread the requests over the workers
+                    session = requests.Session()
+                session.post(url + '/api/expert-advice', json=ADVICE_REQUEST, timeout=30)
+            after = children_cpu_seconds(server.pid)
+
+            counted = None
+            if metrics:
+                match = ADVICE_COUNT.search(requests.get(url + '/metrics', timeout=10).text)
+                counted = float(match.group(1)) - WARMUP_REQUESTS if match else 0.0
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+    cpu = sum(seconds - before.get(pid, 0.0) for pid, seconds in after.items())
+    return cpu / count * 1e6, counted
+
+
+def writer(directory, observations, ready):
+    """A forked worker: records into its own file, then exits"""
+    registry = build_registry()
+    registry.use_directory(directory)
+    counter, histogram, gauge = (registry.metrics[name] for name in ('jobs_total', 'job_seconds', 'busy'))
+    gauge.inc()
+    for i in range(observations):
+        counter.labels('advice').inc()
+        histogram.observe(0.001 * (i % 10))
+    ready.put(os.getpid())
+
+
+def build_registry():
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'jobs', ('kind',))
+    registry.histogram('job_seconds', 'job time')
+    registry.gauge('busy', 'busy workers')
+    return registry
+
+
+def check_aggregation(processes, observations):
+    """Problems found when processes forked writers share one directory"""
+    problems = []
+    directory = tempfile.mkdtemp(prefix='agriguru-metrics-bench-')
+    context = multiprocessing.get_context('fork')
+    ready = context.Queue()
+    children = [context.Process(target=writer, args=(directory, observations, ready)) for _ in range(processes)]
+    for child in children:
+        child.start()
+    for child in children:
+        ready.get(timeout=60)
+        child.join()
+
+    # This process scrapes, and is busy itself
+    registry = build_registry()
+    registry.use_directory(directory)
+    registry.metrics['busy'].inc()
+    text = registry.exposition()
+    samples = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+    expected = processes * observations
+    jobs = samples.get('jobs_total{kind="advice"}', '0')
+    if float(jobs) != expected:
+        problems.append(f"jobs_total is {jobs}, expected {expected}")
+    if float(samples.get('job_seconds_count', 0)) != expected:
+        problems.append(f"job_seconds_count is {samples.get('job_seconds_count')}, expected {expected}")
+    if float(samples.get('job_seconds_bucket{le="0.005"}', 0)) != processes * sum(
+            1 for i in range(observations) if 0.001 * (i % 10) <= 0.005):
+        problems.append("job_seconds buckets are not cumulative over the processes")
+    if float(samples.get('busy', 0)) != 1:
+        problems.append(f"busy gauge is {samples.get('busy')}, expected 1 (exited writers dropped)")
+    registry.use_directory(None)
+    clear_directory(directory)
+    os.rmdir(directory)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Request metrics benchmark')
+    parser.add_argument('--calls', type=int, default=200_000, help='recording calls per micro-benchmark')
+    parser.add_argument('--requests', type=int, default=2000, help='advice requests per in-process round')
+    parser.add_argument('--rounds', type=int, default=9)
+    parser.add_argument('--served', type=int, default=3000, help='advice requests sent to serve.py (0: skip)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5093)
+    parser.add_argument('--processes', type=int, default=4, help='forked writers in the aggregation check')
+    parser.add_argument('--max-overhead-pct', type=float, default=1.0)
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Request Metrics Benchmark")
+    print("=" * 50)
+    problems = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, target in (('in memory', None), ('METRICS_DIR file', directory)):
+            inc, observe = recording_costs(args.calls, target)
+            print(f"  {name:<18} counter inc {inc:6.0f} ns   histogram observe {observe:6.0f} ns")
+
+    try:
+        import gunicorn  # noqa: F401
+        import requests  # noqa: F401
+    except ImportError:
+        print("  gunicorn or requests not installed: timing the middleware against the in-process request")
+        args.served = 0
+
+    with_metrics, without = metrics_us(args.requests, args.rounds, args.served)
+    overhead = with_metrics - without
+    recorder = 'gunicorn request hooks' if args.served else 'WSGI middleware'
+    print(f"\n  cached advice request, {recorder}: {with_metrics:.1f} us with metrics, "
+          f"{without:.1f} us without ({overhead:+.1f} us)")
+    request_us = without
+    if args.served:
+        served_with, counted = served_request_us(args.workers, True, args.served, args.port)
+        served_without, _ = served_request_us(args.workers, False, args.served, args.port + 1)
+        request_us = served_without
+        print(f"  serve.py, {args.workers} workers, CPU per request: {served_with:.1f} us with REQUEST_METRICS, "
+              f"{served_without:.1f} us without")
+        print(f"  /metrics counted {counted:.0f} of {args.served} requests across the workers")
+        if counted != args.served:
+            problems.append(f"/metrics counted {counted:.0f} requests, {args.served} were sent")
+
+    share = max(overhead, 0.0) / request_us * 100
+    print(f"  metrics overhead {overhead:.1f} us = {share:.2f}% of a request")
+    if share > args.max_overhead_pct:
+        problems.append(f"metrics cost {share:.2f}% of a request (limit {args.max_overhead_pct}%)")
+
+    aggregation = check_aggregation(args.processes, 10_000)
+    print(f"\n  {args.processes} forked writers x 10,000 observations into one METRICS_DIR: "
+          f"{'totals match' if not aggregation else 'totals wrong'}")
+    problems += aggregation
+
+    print()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print(f"✅ Metrics under {args.max_overhead_pct}% of request time; multi-process totals add up")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
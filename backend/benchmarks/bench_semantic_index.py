@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Semantic retrieval benchmark
+Scores SemanticIndex on a hand-labelled set of paraphrased farmer queries
+(recall@1/@5 of the record that answers each one) and compares routing
+accuracy with and without the retrieval fallback. Off-topic queries must
+still fall through to general advice. Then pads the index with synthetic
+records up to 10k and reports search latency, which should stay under 2 ms
+at p99. Exits non-zero if recall or latency miss their targets.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+from farming_expert_app import FarmingExpertAI
+from semantic_index import KnowledgeRecord, SemanticIndex, knowledge_records
+
+# (query, request crop, record that answers it as section/path, expected intent, expected inferred fields)
+EVAL_SET = [
+    ("my paddy leaves have brown spots", None, 'crop_database/rice/common_diseases', 'pest', {'crop': 'rice'}),
+    ("brown spots on the leaves", 'rice', 'crop_database/rice/common_diseases', 'pest', {}),
+    ("worms eating my corn", None, 'crop_database/maize/common_pests', 'pest', {'crop': 'maize'}),
+    ("bugs all over the kapas plants", None, 'crop_database/cotton/common_pests', 'pest', {'crop': 'cotton'}),
+    ("wheat looks sick, orange powder on leaves", None, 'crop_database/wheat/common_diseases', 'pest', {'crop': 'wheat'}),
+    ("how much urea for gehun", None, 'crop_database/wheat/fertilizer_schedule', 'fertilizer', {'crop': 'wheat'}),
+    ("dose of npk for maize", None, 'crop_database/maize/fertilizer_schedule', 'fertilizer', {'crop': 'maize'}),
+    ("how much manure per hectare", 'cotton', 'crop_database/cotton/fertilizer_schedule', 'fertilizer', {}),
+    ("when do I cut the paddy", None, 'crop_database/rice/harvest_time', 'harvest', {'crop': 'rice'}),
+    ("when is cotton ready to pick", None, 'crop_database/cotton/harvest_time', 'harvest', {'crop': 'cotton'}),
+    ("how many tons per hectare can corn give", None, 'crop_database/maize/yield_potential', 'harvest', {'crop': 'maize'}),
+    ("how deep should standing water be in paddy", None, 'crop_database/rice/water_management', 'irrigation', {'crop': 'rice'}),
+    ("watering schedule for gehun", None, 'crop_database/wheat/water_management', 'irrigation', {'crop': 'wheat'}),
+    ("which month to put paddy nursery", None, 'crop_database/rice/planting_season', 'planting', {'crop': 'rice'}),
+    ("ideal conditions for cotton", None, 'crop_database/cotton/optimal_conditions', 'crop_overview', {'crop': 'cotton'}),
+    ("stages of the maize crop cycle", None, 'crop_database/maize/growth_stages', 'crop_overview', {'crop': 'maize'}),
+    ("what grows well in punjab", None, 'location_data/india/states/punjab', 'location_soil', {'location': 'punjab'}),
+    ("what can I farm in west bengal", None, 'location_data/india/states/west_bengal', 'location_soil', {'location': 'west_bengal'}),
+    ("crops for rajasthan sandy land", None, 'location_data/india/states/rajasthan', 'location_soil', {'location': 'rajasthan'}),
+    ("what to do in the monsoon months", None, 'seasonal_calendar/kharif_season', 'seasonal', {'season': 'kharif'}),
+    ("winter crop activities by month", None, 'seasonal_calendar/rabi_season', 'seasonal', {'season': 'rabi'}),
+    ("where can I get good rates for my produce", None, 'market_insights/market_channels', 'market', {}),
+    ("what decides mandi rates", None, 'market_insights/price_factors', 'market', {}),
+    ("how to deal with broadleaf weeds", 'maize', 'pest_management/pest_categories/weeds', 'pest', {}),
+    ("is drip better than sprinkler for my vegetables", 'maize', 'irrigation_systems/irrigation_methods/drip', 'irrigation', {}),
+    ("my clay land drains badly", None, 'soil_knowledge/soil_types/clay', 'soil', {}),
+]
+
+# Off-topic queries must not be routed to a specific handler
+NEGATIVES = ["hello", "tell me a joke", "what is your name", "thank you very much", "who won the cricket match"]
+
+
+def record_key(record):
+    return f"{record.section}/{record.path}"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def evaluate(expert):
+    index = expert.semantic_index
+    found_at = []
+    keyword_correct = 0
+    retrieval_correct = 0
+    misses = []
+    for query, crop, expected, intent, inferred in EVAL_SET:
+        ranked = [record_key(hit.record) for hit in index.search(query, k=5)]
+        found_at.append(ranked.index(expected) + 1 if expected in ranked else None)
+        keyword_correct += expert.route_query(query, crop, retrieval=False).intent == intent
+        route = expert.route_query(query, crop)
+        if route.intent == intent and (route.inferred or {}) == inferred:
+            retrieval_correct += 1
+        else:
+            misses.append((query, route.intent, route.inferred, ranked[:1]))
+    false_routes = [query for query in NEGATIVES if expert.route_query(query).intent != 'general']
+
+    total = len(EVAL_SET)
+    recall_1 = sum(rank == 1 for rank in found_at) / total
+    recall_5 = sum(rank is not None for rank in found_at) / total
+    print(f"Evaluation set: {total} paraphrased queries, {len(NEGATIVES)} off-topic")
+    print(f"  recall@1 {recall_1:.0%}   recall@5 {recall_5:.0%}")
+    print(f"  routing accuracy: keywords only {keyword_correct / total:.0%}, "
+          f"with retrieval {retrieval_correct / total:.0%}")
+    print(f"  off-topic queries routed to a handler: {len(false_routes)}")
+    for query, intent, inferred, top in misses:
+        print(f"    miss: {query!r} -> {intent} {inferred or ''} (top record {top[0] if top else None})")
+    for query in false_routes:
+        print(f"    false route: {query!r}")
+    return recall_5, false_routes
+
+
+def synthetic_records(real, count, seed=0):
+    """Real records reworded with made-up crop and place names, as a stand-in for a larger knowledge base"""
+    rng = random.Random(seed)
+    vocabulary = ' '.join(record.text for record in real).split()
+    records = []
+    for i in range(count):
+        base = rng.choice(real)
+        words = base.text.split()
+        rng.shuffle(words)
+        words = words[:rng.randint(10, 40)] + rng.sample(vocabulary, 10) + [f"crop{i}", f"district{i % 500}"]
+        records.append(KnowledgeRecord(base.section, f"synthetic/{i}", ' '.join(words), base.intent,
+                                       base.crop, base.location, base.season))
+    return records
+
+
+def latency(expert, size, repeats):
+    real = knowledge_records(expert.knowledge.sections)
+    start = time.perf_counter()
+    index = SemanticIndex(real + synthetic_records(real, size - len(real)))
+    build_s = time.perf_counter() - start
+    queries = [query for query, *_ in EVAL_SET] + NEGATIVES
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k=5)
+            timings.append(time.perf_counter() - start)
+    p50, p99 = percentile(timings, 50) * 1000, percentile(timings, 99) * 1000
+    print(f"\n{len(index.records):,} records ({index.stats()['bytes'] / 1e6:.0f} MB, built in {build_s:.1f}s): "
+          f"top-5 search p50 {p50:.3f} ms, p99 {p99:.3f} ms over {len(timings):,} queries")
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Semantic retrieval benchmark')
+    parser.add_argument('--records', type=int, default=10000, help='index size for the latency run')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--min-recall', type=float, default=0.9, help='fail below this recall@5')
+    parser.add_argument('--max-p99-ms', type=float, default=2.0, help='fail above this search p99')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Semantic Retrieval Benchmark")
+    print("=" * 50)
+    expert = FarmingExpertAI()
+    recall_5, false_routes = evaluate(expert)
+    p99 = latency(expert, args.records, args.repeats)
+
+    problems = []
+    if recall_5 < args.min_recall:
+        problems.append(f"recall@5 {recall_5:.0%} below {args.min_recall:.0%}")
+    if false_routes:
+        problems.append(f"{len(false_routes)} off-topic queries routed to a handler")
+    if p99 > args.max_p99_ms:
+        problems.append(f"search p99 {p99:.2f} ms above {args.max_p99_ms} ms")
+    print()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Retrieval within recall and latency targets")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
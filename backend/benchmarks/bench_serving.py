@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Serving-mode throughput benchmark
+Starts the API as the entry points used to run it (Flask dev server,
+debug=True) and under serve.py's pre-fork server, then drives each with the
+same concurrent HTTP load for a fixed time and reports requests/s and
+latency percentiles. The load mixes advice, weather and soil requests over
+a spread of crops and locations; the mock weather provider keeps it offline.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEV_SERVER = ("import farming_expert_app; "
+              "farming_expert_app.app.run(debug=True, use_reloader=False, host='127.0.0.1', port={port})")
+
+CROPS = ['rice', 'wheat', 'cotton', 'maize']
+LOCATIONS = ['Pune', 'Punjab', 'Kerala', 'Jaipur', 'Kolkata', 'Chennai', 'Lucknow', 'Delhi']
+QUESTIONS = ['How to plant {crop}?', 'Fertilizer for {crop}', 'Irrigation for {crop}', 'Weather update for my farm']
+
+
+def make_request(rng):
+    crop, location = rng.choice(CROPS), rng.choice(LOCATIONS)
+    kind = rng.random()
+    if kind < 0.7:
+        body = {'query': rng.choice(QUESTIONS).format(crop=crop), 'crop': crop, 'location': location}
+        return 'POST', '/api/expert-advice', body
+    if kind < 0.9:
+        return 'POST', '/api/weather-advice', {'location': location, 'crop': crop}
+    return 'GET', f"/api/soil-recommendations?location={location}", None
+
+
+def wait_ready(url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            if requests.get(url + '/', timeout=1).ok:
+                return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+def drive(url, concurrency, duration):
+    """Closed-loop load: each client thread sends its next request when the last one returns"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        mine = []
+        while time.monotonic() < stop_at:
+            method, path, body = make_request(rng)
+            start = time.perf_counter()
+            response = session.request(method, url + path, json=body, timeout=30)
+            mine.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(name, command, port, args):
+    env = dict(os.environ, KNOWLEDGE_WATCH_INTERVAL='0', WEATHER_PROVIDER='mock')
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url, process)
+        drive(url, args.concurrency, 1.0)   # fill per-worker caches and connection pools
+        latencies, errors = drive(url, args.concurrency, args.duration)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    print(f"{name:<28} {len(latencies) / args.duration:8.0f} req/s   p50 {percentile(latencies, 50) * 1000:6.1f} ms"
+          f"   p99 {percentile(latencies, 99) * 1000:6.1f} ms   errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serving-mode throughput benchmark')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of measured load per server')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5091)
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Serving Benchmark")
+    print("=" * 50)
+    print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per server, {os.cpu_count()} CPUs")
+    run('Flask dev server (debug)', [sys.executable, '-c', DEV_SERVER.format(port=args.port)], args.port, args)
+    run(f"serve.py {args.workers}w x {args.threads}t",
+        [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(args.port + 1),
+         '--workers', str(args.workers), '--threads', str(args.threads)], args.port + 1, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Backend cold-start benchmark
+Imports farming_expert_app in fresh interpreters and reports import time,
+resident memory, and the time and memory after the first advice request,
+with the vision stack lazy (default) and preloaded (PRELOAD_VISION=1). A
+`python -X importtime` run lists the slowest imports. Exits non-zero when
+importing the app pulls in torch or PIL, or takes longer than --max-import-ms,
+so it can guard against regressions in CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VISION_MODULES = ('torch', 'PIL')
+
+PROBE = """
+import json, sys, time
+def rss_mb():
+    with open('/proc/self/status') as f:
+        fields = dict(line.split(':', 1) for line in f)
+    return int(fields['VmRSS'].split()[0]) / 1024
+start = time.perf_counter()
+import farming_expert_app
+imported = time.perf_counter() - start
+after_import = rss_mb()
+loaded = [name for name in {vision} if name in sys.modules]
+response = farming_expert_app.app.test_client().post(
+    '/api/expert-advice', json={{'query': 'How to plant rice?', 'crop': 'rice', 'location': 'Pune'}})
+assert response.status_code == 200, response.get_data(as_text=True)
+first_request = time.perf_counter() - start
+print(json.dumps({{'import_s': imported, 'import_rss_mb': after_import, 'vision_modules': loaded,
+                  'first_request_s': first_request, 'first_request_rss_mb': rss_mb()}}))
+"""
+
+
+def probe(preload, runs):
+    """Best-of-`runs` measurements in fresh interpreters"""
+    env = dict(os.environ, KNOWLEDGE_WATCH_INTERVAL='0', PRELOAD_VISION='1' if preload else '0')
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(vision=VISION_MODULES)], cwd=BACKEND, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r['import_s'])
+
+
+def slowest_imports(count):
+    """(cumulative ms, module) for the slowest top-level imports under farming_expert_app"""
+    env = dict(os.environ, KNOWLEDGE_WATCH_INTERVAL='0')
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import farming_expert_app'], cwd=BACKEND,
+                            env=env, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Direct imports of the app module are indented by one level
+        if name.startswith('   ') and not name.startswith('    '):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backend cold-start benchmark')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8, help='slowest imports to list')
+    parser.add_argument('--max-import-ms', type=float, default=1500.0, help='fail above this import time')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Startup Benchmark")
+    print("=" * 50)
+    lazy = probe(False, args.runs)
+    eager = probe(True, args.runs)
+    print(f"{'':<22} {'import':>9} {'RSS':>8} {'1st advice':>11} {'RSS':>8}")
+    for name, result in (('lazy vision', lazy), ('PRELOAD_VISION=1', eager)):
+        print(f"{name:<22} {result['import_s'] * 1000:7.0f}ms {result['import_rss_mb']:6.0f}MB "
+              f"{result['first_request_s'] * 1000:9.0f}ms {result['first_request_rss_mb']:6.0f}MB")
+
+    print("\nSlowest imports (python -X importtime):")
+    for cumulative, name in slowest_imports(args.top):
+        print(f"  {cumulative:8.1f} ms  {name}")
+
+    problems = []
+    if lazy['vision_modules']:
+        problems.append(f"importing the app loaded {', '.join(lazy['vision_modules'])}")
+    if lazy['import_s'] * 1000 > args.max_import_ms:
+        problems.append(f"import took {lazy['import_s'] * 1000:.0f} ms (budget {args.max_import_ms:.0f} ms)")
+    print()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ App imports without the vision stack, within budget")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
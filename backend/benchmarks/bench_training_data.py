@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Training data loading benchmark
+Writes a synthetic dataset in the notebook's <split>/<label>/*.jpg layout,
+builds the pre-decoded image cache from it, and reads one epoch through a
+DataLoader from the raw files (full decode + resize per sample, like the
+notebook's PlantDiseaseDataset) and from the memmap (random crop + flip)
+with 0, 2 and 8 workers. Also times counting classes by iterating the
+dataset against a bincount over the cached labels.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader
+
+from bench_inference import LABELS
+from training_data import CachedPlantDiseaseDataset, PlantDiseaseDataset, build_image_cache
+
+
+def write_dataset(root, per_class, width, height, seed=0):
+    """Smooth random colour fields as quality-90 JPEGs, per_class of them per label"""
+    rng = np.random.default_rng(seed)
+    for label in LABELS:
+        label_dir = os.path.join(root, 'train', label)
+        os.makedirs(label_dir, exist_ok=True)
+        for i in range(per_class):
+            coarse = rng.integers(0, 255, (12, 16, 3), dtype=np.uint8)
+            noise = rng.normal(0, 8, (height, width, 3))
+            photo = np.asarray(Image.fromarray(coarse).resize((width, height), Image.BICUBIC)) + noise
+            Image.fromarray(np.clip(photo, 0, 255).astype(np.uint8)).save(
+                os.path.join(label_dir, f"{i:04d}.jpg"), quality=90)
+
+
+def epoch_rate(dataset, workers, batch_size):
+    """Samples/sec of one shuffled epoch, counting worker start-up"""
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=workers)
+    start = time.perf_counter()
+    seen = 0
+    for images, _ in loader:
+        seen += images.shape[0]
+    return seen / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Training data loading benchmark')
+    parser.add_argument('--per-class', type=int, default=50, help='images per class')
+    parser.add_argument('--width', type=int, default=1024)
+    parser.add_argument('--height', type=int, default=768)
+    parser.add_argument('--cache-size', type=int, default=256, help='side of the cached images')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 8])
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Training Data Benchmark")
+    print("=" * 50)
+    torch.set_num_threads(1)
+    # More workers than CPUs is part of what is being measured
+    warnings.filterwarnings('ignore', message='This DataLoader will create')
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'dataset')
+        cache_dir = os.path.join(tmp, 'cache')
+        write_dataset(data_dir, args.per_class, args.width, args.height)
+
+        start = time.perf_counter()
+        manifest = build_image_cache(data_dir, cache_dir, LABELS, size=args.cache_size)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        build_image_cache(data_dir, cache_dir, LABELS, size=args.cache_size)
+        reuse_ms = (time.perf_counter() - start) * 1000
+        shard_mb = os.path.getsize(os.path.join(cache_dir, 'images.u8')) / 1e6
+        print(f"{manifest['count']} JPEGs of {args.width}x{args.height}: cache built in {build_s:.1f}s "
+              f"({shard_mb:.0f} MB shard), reused in {reuse_ms:.1f} ms")
+
+        raw = PlantDiseaseDataset(data_dir, LABELS, reduced_decode=False)
+        cached = CachedPlantDiseaseDataset(cache_dir)
+
+        start = time.perf_counter()
+        iterated = np.zeros(len(LABELS), dtype=np.int64)
+        for _, label in raw:
+            iterated[label] += 1
+        iterate_s = time.perf_counter() - start
+        start = time.perf_counter()
+        counts = cached.class_counts()
+        bincount_ms = (time.perf_counter() - start) * 1000
+        assert (counts == iterated).all()
+        print(f"Class counts: iterating the dataset {iterate_s:.2f}s, bincount over labels {bincount_ms:.3f} ms")
+
+        print(f"\nSamples/sec over one epoch (batch {args.batch_size}, {os.cpu_count()} CPUs):")
+        print(f"  {'workers':>7}  {'raw files':>10}  {'memmap':>10}  speed-up")
+        for workers in args.workers:
+            raw_rate = epoch_rate(raw, workers, args.batch_size)
+            cached_rate = epoch_rate(cached, workers, args.batch_size)
+            print(f"  {workers:>7}  {raw_rate:>10.0f}  {cached_rate:>10.0f}  {cached_rate / raw_rate:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Training metrics benchmark
+Feeds 1M synthetic predictions (batches of --batch-size logits) with 10 and
+100 classes through the notebook's AgriculturalMetrics.update (a Python loop
+over classes per batch), the notebook's evaluation path (predictions and
+probabilities extended into Python lists, then metrics over the arrays;
+sklearn when installed) and ConfusionMatrixMetrics, and checks that the
+confusion matrix, per-class F1 and top-k accuracy match a NumPy reference.
+Exits non-zero on a mismatch.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+
+from training_metrics import ConfusionMatrixMetrics
+
+
+class NotebookMetrics:
+    """AgriculturalMetrics from the notebook"""
+
+    def __init__(self, num_classes):
+        self.num_classes = num_classes
+        self.correct = 0
+        self.total = 0
+        self.per_class_correct = [0] * num_classes
+        self.per_class_total = [0] * num_classes
+
+    def update(self, predictions, targets):
+        _, predicted = torch.max(predictions, 1)
+        self.total += targets.size(0)
+        self.correct += (predicted == targets).sum().item()
+        for i in range(self.num_classes):
+            mask = targets == i
+            if mask.sum() > 0:
+                self.per_class_total[i] += mask.sum().item()
+                self.per_class_correct[i] += (predicted[mask] == targets[mask]).sum().item()
+
+
+def batches(count, num_classes, batch_size, seed=0):
+    """Logits that favour the true class about 70% of the time"""
+    generator = torch.Generator().manual_seed(seed)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        targets = torch.randint(0, num_classes, (size,), generator=generator)
+        logits = torch.randn(size, num_classes, generator=generator)
+        logits[torch.arange(size), targets] += 1.5 + 0.5 * torch.log(torch.tensor(float(num_classes)))
+        yield logits, targets
+
+
+def reference(data, num_classes, topk):
+    """Confusion matrix, F1 and top-k with NumPy over all predictions at once"""
+    logits = torch.cat([logits for logits, _ in data]).numpy()
+    targets = torch.cat([targets for _, targets in data]).numpy()
+    predicted = logits.argmax(1)
+    cm = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(cm, (targets, predicted), 1)
+    tp = np.diag(cm).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precision = np.nan_to_num(tp / cm.sum(0))
+        recall = np.nan_to_num(tp / cm.sum(1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    order = np.argsort(-logits, axis=1)
+    top = {k: float((order[:, :k] == targets[:, None]).any(1).mean()) for k in topk}
+    return cm, f1, top
+
+
+def time_notebook_eval(data):
+    """evaluate_model's list building, then the metrics it prints"""
+    start = time.perf_counter()
+    all_predictions, all_targets, all_probabilities = [], [], []
+    for logits, targets in data:
+        probabilities = torch.softmax(logits, dim=1)
+        _, predicted = torch.max(logits, 1)
+        all_predictions.extend(predicted.numpy())
+        all_targets.extend(targets.numpy())
+        all_probabilities.extend(probabilities.numpy())
+    predictions, targets = np.array(all_predictions), np.array(all_targets)
+    np.array(all_probabilities)
+    try:
+        from sklearn.metrics import classification_report, confusion_matrix
+
+        classification_report(targets, predictions, output_dict=True, zero_division=0)
+        confusion_matrix(targets, predictions)
+    except ImportError:
+        (predictions == targets).mean()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Training metrics benchmark')
+    parser.add_argument('--predictions', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--classes', type=int, nargs='+', default=[10, 100])
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Training Metrics Benchmark")
+    print("=" * 50)
+    print(f"{args.predictions:,} predictions in batches of {args.batch_size}\n")
+    print(f"  {'classes':>7}  {'notebook update':>15}  {'notebook eval':>13}  {'confusion matrix':>16}  speed-up")
+    problems = []
+    for num_classes in args.classes:
+        data = list(batches(args.predictions, num_classes, args.batch_size))
+
+        notebook = NotebookMetrics(num_classes)
+        start = time.perf_counter()
+        for logits, targets in data:
+            notebook.update(logits, targets)
+        notebook_s = time.perf_counter() - start
+
+        eval_s = time_notebook_eval(data)
+
+        metrics = ConfusionMatrixMetrics(num_classes, topk=(1, 3, 5))
+        start = time.perf_counter()
+        for logits, targets in data:
+            metrics.update(logits, targets)
+        result = metrics.compute()
+        matrix_s = time.perf_counter() - start
+
+        print(f"  {num_classes:>7}  {notebook_s:>14.2f}s  {eval_s:>12.2f}s  {matrix_s:>15.2f}s  "
+              f"{notebook_s / matrix_s:>7.0f}x")
+
+        cm, f1, top = reference(data, num_classes, metrics.topk)
+        if not np.array_equal(np.array(result['confusion_matrix']), cm):
+            problems.append(f"{num_classes} classes: confusion matrix differs from NumPy")
+        if not np.allclose(result['f1'], f1):
+            problems.append(f"{num_classes} classes: per-class F1 differs from NumPy")
+        if any(abs(result['top_k'][k] - top[k]) > 1e-9 for k in metrics.topk):
+            problems.append(f"{num_classes} classes: top-k accuracy differs from NumPy")
+        if abs(result['accuracy'] - notebook.correct / notebook.total) > 1e-12:
+            problems.append(f"{num_classes} classes: accuracy differs from AgriculturalMetrics")
+        print(f"           accuracy {result['accuracy']:.4f}, macro F1 {result['macro_f1']:.4f}, "
+              + ', '.join(f"top-{k} {value:.4f}" for k, value in result['top_k'].items()))
+
+    print()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Metrics match the NumPy reference")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
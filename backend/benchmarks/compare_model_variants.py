@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Model variant accuracy vs latency comparison
+Exports every deployment variant of a float32 checkpoint, evaluates each on
+the validation split (same layout as the notebook's PlantDiseaseDataset:
+<data-dir>/<split>/<label>/*.jpg) and recommends the fastest variant whose
+accuracy is within --max-drop points of float32. Accuracy and macro F1
+come from a ConfusionMatrixMetrics per variant.
+
+Usage:
+    python benchmarks/compare_model_variants.py --model models/agri_efficientnet_model.pth --data-dir dataset
+    python benchmarks/compare_model_variants.py --synthetic 64     # no dataset: agreement with float32 only
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from PIL import Image
+
+from bench_inference import LABELS, sample_images, write_random_checkpoint
+from inference_engine import InferenceEngine
+from model_variants import VARIANTS, export_variants
+from training_metrics import ConfusionMatrixMetrics
+
+
+def load_split(data_dir, split, labels, limit=None):
+    """(images, label indices) for one split, like PlantDiseaseDataset"""
+    images, targets = [], []
+    for index, label in enumerate(labels):
+        label_dir = os.path.join(data_dir, split, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                images.append(Image.open(os.path.join(label_dir, name)).convert('RGB'))
+                targets.append(index)
+    if limit:
+        order = np.random.default_rng(0).permutation(len(images))[:limit]
+        images, targets = [images[i] for i in order], [targets[i] for i in order]
+    return images, targets
+
+
+def predict_all(engine, pixels, batch_size=8):
+    predictions = []
+    for start in range(0, len(pixels), batch_size):
+        results = engine._run_batch(pixels[start:start + batch_size])
+        predictions += [engine.labels.index(result['disease']) for result in results]
+    return predictions
+
+
+def time_variant(engine, pixels, repeat=10, batch_size=8):
+    """(p50 single-image latency in ms, batched images/sec)"""
+    singles = []
+    for image in pixels[:repeat]:
+        start = time.perf_counter()
+        engine._run_batch([image])
+        singles.append(time.perf_counter() - start)
+    batch = (pixels * batch_size)[:batch_size]
+    start = time.perf_counter()
+    for _ in range(max(1, repeat // 4)):
+        engine._run_batch(batch)
+    throughput = batch_size * max(1, repeat // 4) / (time.perf_counter() - start)
+    return sorted(singles)[len(singles) // 2] * 1000, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare exported model variants')
+    parser.add_argument('--model', help='float32 agri_efficientnet_model.pth (default: random weights)')
+    parser.add_argument('--data-dir', help='dataset root containing train/ and val/')
+    parser.add_argument('--split', default='val')
+    parser.add_argument('--calibration-split', default='train')
+    parser.add_argument('--limit', type=int, default=200, help='evaluation images (0 = all)')
+    parser.add_argument('--synthetic', type=int, default=32, help='random images when no --data-dir')
+    parser.add_argument('--max-drop', type=float, default=1.0, help='tolerated accuracy drop, percentage points')
+    parser.add_argument('--quantized-engine', default='onednn', help='onednn, x86, fbgemm or qnnpack')
+    parser.add_argument('--variants', default=','.join(VARIANTS))
+    parser.add_argument('--output-dir', help='keep exported variants here')
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Model Variant Comparison")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = args.model
+        if not model_path:
+            model_path = os.path.join(workdir, 'agri_efficientnet_model.pth')
+            write_random_checkpoint(model_path)
+            print("⚠️ No --model given: random weights, so accuracy is meaningless; compare agreement")
+
+        reference = InferenceEngine(model_path, labels=LABELS).load()
+        labels = reference.labels
+
+        if args.data_dir:
+            images, targets = load_split(args.data_dir, args.split, labels, args.limit)
+            calibration, _ = load_split(args.data_dir, args.calibration_split, labels, 64)
+            if not calibration:
+                print(f"⚠️ No {args.calibration_split} split; calibrating on the first {args.split} images")
+                calibration = images[:64]
+        else:
+            images, targets = sample_images(args.synthetic), None
+            calibration = sample_images(16, seed=1)
+        print(f"Evaluating on {len(images)} images" + (f" from {args.split}" if args.data_dir else " (synthetic)"))
+
+        pixels = [reference.preprocess(image) for image in images]
+        calibration_batches = [
+            torch.from_numpy(reference.normalizer.batch([reference.preprocess(image) for image in calibration[i:i + 8]]))
+            for i in range(0, len(calibration), 8)
+        ]
+
+        export_dir = args.output_dir or os.path.join(workdir, 'deployment')
+        manifest = export_variants(
+            reference.model, export_dir, labels, reference.transform,
+            calibration_batches=calibration_batches,
+            variants=args.variants.split(','), quantized_engine=args.quantized_engine
+        )
+        variant_model_path = os.path.join(export_dir, 'agri_efficientnet_model.pth')
+
+        baseline = predict_all(reference, pixels)
+        rows = []
+        for variant, entry in manifest['variants'].items():
+            try:
+                engine = InferenceEngine(variant_model_path, labels=labels, variant=variant).load()
+            except Exception as e:
+                print(f"⚠️ {variant}: {e}")
+                continue
+            predictions = predict_all(engine, pixels)
+            agreement = np.mean(np.asarray(predictions) == np.asarray(baseline)) * 100
+            accuracy = macro_f1 = None
+            if targets:
+                metrics = ConfusionMatrixMetrics(len(labels), topk=())
+                metrics.update(torch.tensor(predictions), torch.tensor(targets))
+                report = metrics.compute()
+                accuracy, macro_f1 = report['accuracy'] * 100, report['macro_f1'] * 100
+            latency, throughput = time_variant(engine, pixels)
+            rows.append((variant, entry['size_bytes'] / 1e6, accuracy, agreement, latency, throughput, macro_f1))
+
+    print()
+    print(f"{'variant':14} {'size MB':>8} {'accuracy':>9} {'macro F1':>9} {'agree':>7} {'p50 1-img':>10} "
+          f"{'img/s @8':>9}")
+    for variant, size, accuracy, agreement, latency, throughput, macro_f1 in rows:
+        acc = f"{accuracy:8.2f}%" if accuracy is not None else f"{'-':>9}"
+        f1 = f"{macro_f1:8.2f}%" if macro_f1 is not None else f"{'-':>9}"
+        print(f"{variant:14} {size:8.1f} {acc} {f1} {agreement:6.1f}% {latency:8.1f}ms {throughput:9.1f}")
+
+    # Accuracy when labelled data is available, otherwise agreement with float32
+    quality = {row[0]: (row[2] if row[2] is not None else row[3]) for row in rows}
+    if 'float32' in quality:
+        floor = quality['float32'] - args.max_drop
+        eligible = [row for row in rows if quality[row[0]] >= floor]
+        best = min(eligible, key=lambda row: row[4])
+        print()
+        print(f"✅ Fastest within {args.max_drop} points of float32: {best[0]} "
+              f"(set INFERENCE_VARIANT={best[0]})")
+
+
+if __name__ == "__main__":
+    main()
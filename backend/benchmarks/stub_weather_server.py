@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Local stub of the OpenWeatherMap forecast API
+Serves deterministic per-city forecasts with configurable latency so the
+weather provider can be load tested without network access
+
+Usage:
+    python benchmarks/stub_weather_server.py --port 8081 --latency 50
+    WEATHER_PROVIDER=openweathermap WEATHER_API_URL=http://127.0.0.1:8081 python farming_expert_app.py
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def city_forecast(city, samples):
+    """Deterministic 3-hourly forecast samples for a city"""
+    seed = int(hashlib.sha1(city.lower().encode('utf-8')).hexdigest()[:8], 16)
+    base_temp = 18 + seed % 20
+    base_humidity = 40 + seed % 50
+    entries = []
+    for i in range(samples):
+        rain = ((seed >> (i % 16)) & 7) * 0.5 if (seed + i) % 3 == 0 else 0.0
+        entries.append({
+            'dt': 1700000000 + i * 10800,
+            'main': {
+                'temp': base_temp + (i % 8) - 4,
+                'humidity': min(100, base_humidity + (i % 5)),
+                'pressure': 1008 + seed % 12
+            },
+            'wind': {'speed': 1.5 + (seed % 7)},
+            'weather': [{'main': 'Rain' if rain else ('Clouds' if i % 2 else 'Clear')}],
+            'rain': {'3h': rain}
+        })
+    return {'cod': '200', 'cnt': samples, 'list': entries, 'city': {'name': city}}
+
+
+class StubWeatherServer(ThreadingHTTPServer):
+    """Threaded stub server that counts upstream calls per city"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail=False):
+        super().__init__(address, StubWeatherHandler)
+        self.latency = latency
+        self.fail = fail
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def total_calls(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == '/stats':
+            with self.server.lock:
+                return self._send(200, {'calls': dict(self.server.calls)})
+
+        if url.path != '/forecast' or 'q' not in params:
+            return self._send(404, {'cod': '404', 'message': 'not found'})
+
+        city = params['q'][0]
+        with self.server.lock:
+            self.server.calls[city] = self.server.calls.get(city, 0) + 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.fail:
+            return self._send(503, {'cod': '503', 'message': 'stub failure'})
+
+        samples = int(params.get('cnt', ['24'])[0])
+        self._send(200, city_forecast(city, samples))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, latency=0.0, fail=False):
+    """Start the stub in a background thread; port 0 picks a free port"""
+    server = StubWeatherServer(('127.0.0.1', port), latency=latency, fail=fail)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OpenWeatherMap stub')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=50, help='response delay in ms')
+    parser.add_argument('--fail', action='store_true', help='answer every forecast with HTTP 503')
+    args = parser.parse_args()
+
+    server = StubWeatherServer(('127.0.0.1', args.port), latency=args.latency / 1000, fail=args.fail)
+    print(f"🌤️ Stub weather API on {server.url} (latency {args.latency:.0f} ms)")
+    print(f"   Upstream call counts: {server.url}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stub server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# Crop Suitability Engine for the Farming Expert AI
+"""
+Scores how well every crop fits a location's climate and soil. Each crop's
+optimal_conditions are packed once into NumPy arrays (min/optimal/max per
+factor, plus a crop x soil-type incidence matrix), and location profiles
+are packed the same way, so scoring L locations against C crops is a
+handful of broadcast array operations and one matrix product instead of
+an L x C Python loop.
+
+Each factor scores 1.0 at the crop's optimum, falls linearly to 0.5 at the
+edge of its range and to 0 one half-range beyond it. Soil scores 1.0 when
+the location's dominant soil suits the crop, 0.7 when another of its soils
+does and 0.2 otherwise. The total is the weighted mean of the factors the
+location profile actually has; a region without humidity or pH data is
+scored on the rest.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# Relative weight of each factor in the total
+FACTOR_WEIGHTS = {
+    'temperature': 0.3,
+    'humidity': 0.15,
+    'rainfall': 0.2,
+    'soil_ph': 0.15,
+    'soil_type': 0.2
+}
+RANGE_FACTORS = ('temperature', 'humidity', 'rainfall', 'soil_ph')
+
+# Crops list only an annual rainfall figure; this band around it still suits them
+RAINFALL_BAND = (0.6, 1.5)
+
+DOMINANT_SOIL_SCORE = 1.0
+OTHER_SOIL_SCORE = 0.7
+UNSUITED_SOIL_SCORE = 0.2
+
+# One location's conditions; None marks a factor with no data
+LocationProfile = namedtuple('LocationProfile', ['temperature', 'humidity', 'rainfall', 'soil_ph',
+                                                 'soil_types', 'dominant_soil'])
+
+
+def region_profile(region_data, weather=None, soil_ph=None):
+    """LocationProfile from a location_data region, with current weather overriding its climate normals"""
+    temperature = region_data.get('temperature', {}).get('optimal_crop_temp')
+    humidity = None
+    if weather:
+        temperature = weather.get('temperature', temperature)
+        humidity = weather.get('humidity')
+    soil_types = list(region_data.get('soil_types') or region_data.get('soil_recommendations') or ())
+    return LocationProfile(
+        temperature=temperature,
+        humidity=humidity,
+        # Weather reports today's rain; crops are rated on annual rainfall
+        rainfall=region_data.get('rainfall', {}).get('average'),
+        soil_ph=soil_ph,
+        soil_types=soil_types,
+        dominant_soil=region_data.get('dominant_soil')
+    )
+
+
+def _range_score(values, ranges):
+    """(L, C) scores of location values (L,) against crop (min, optimal, max) ranges (C, 3)"""
+    low, optimal, high = (ranges[:, i][None, :] for i in range(3))
+    x = values[:, None]
+    # Half-range on the side of the optimum the value falls on
+    span = np.where(x < optimal, optimal - low, high - optimal)
+    span = np.maximum(span, 1e-6)
+    distance = np.abs(x - optimal) / span
+    # 1 at the optimum, 0.5 at the range edge, 0 one half-range beyond it
+    return np.clip(1.0 - 0.5 * distance, 0.0, 1.0).astype(np.float32)
+
+
+class SuitabilityEngine:
+    """Every crop's optimal conditions as arrays, scored against many locations at once"""
+
+    def __init__(self, crop_database):
+        self.crops = list(crop_database)
+        self.regions = []
+        self._region_rows = {}
+        self.region_scores = np.zeros((0, len(self.crops)), dtype=np.float32)
+        soils = sorted({soil for info in crop_database.values()
+                        for soil in info['optimal_conditions'].get('soil_type', ())})
+        self.soil_types = soils
+        self._soil_index = {soil: i for i, soil in enumerate(soils)}
+
+        # (C, 3) min/optimal/max per range factor; NaN where a crop does not say
+        self.ranges = {factor: np.full((len(self.crops), 3), np.nan) for factor in RANGE_FACTORS}
+        self.soil_incidence = np.zeros((len(self.crops), len(soils)), dtype=np.float32)
+        for row, crop in enumerate(self.crops):
+            conditions = crop_database[crop]['optimal_conditions']
+            for factor in ('temperature', 'humidity', 'soil_ph'):
+                if factor in conditions:
+                    spec = conditions[factor]
+                    self.ranges[factor][row] = (spec['min'], spec['optimal'], spec['max'])
+            if 'rainfall' in conditions:
+                annual = conditions['rainfall']['annual']
+                self.ranges['rainfall'][row] = (annual * RAINFALL_BAND[0], annual, annual * RAINFALL_BAND[1])
+            for soil in conditions.get('soil_type', ()):
+                self.soil_incidence[row, self._soil_index[soil]] = 1.0
+
+    @classmethod
+    def build(cls, crop_database, location_data):
+        """Engine plus the precomputed climate-normal scores of every region in location_data"""
+        engine = cls(crop_database)
+        profiles = []
+        for country, country_data in location_data.items():
+            for region, region_data in country_data.get('states', {}).items():
+                engine.regions.append(f"{country}/{region}")
+                profiles.append(region_profile(region_data))
+        engine._region_rows = {key: row for row, key in enumerate(engine.regions)}
+        engine.region_scores = engine.score_matrix(profiles)
+        return engine
+
+    def region_ranking(self, key, top=None):
+        """Precomputed (crop, score) pairs for a region key, best first, or None for unknown regions"""
+        row = self._region_rows.get(key)
+        if row is None:
+            return None
+        scores = self.region_scores[row]
+        order = np.argsort(-scores, kind='stable')[:top]
+        return [{'crop': self.crops[column], 'score': round(float(scores[column]), 3)} for column in order]
+
+    def pack(self, profiles):
+        """Location profiles as ({factor: (L,) values, NaN when missing}, dominant soils, all soils, has soil data)"""
+        values = {factor: np.array([np.nan if getattr(p, factor) is None else getattr(p, factor)
+                                    for p in profiles], dtype=np.float64)
+                  for factor in RANGE_FACTORS}
+        dominant = np.zeros((len(profiles), len(self.soil_types)), dtype=np.float32)
+        other = np.zeros_like(dominant)
+        for row, profile in enumerate(profiles):
+            for soil in profile.soil_types:
+                if soil in self._soil_index:
+                    other[row, self._soil_index[soil]] = 1.0
+            if profile.dominant_soil in self._soil_index:
+                dominant[row, self._soil_index[profile.dominant_soil]] = 1.0
+        has_soil = np.array([bool(p.soil_types or p.dominant_soil) for p in profiles])
+        return values, dominant, other, has_soil
+
+    def score_packed(self, values, dominant, other, has_soil):
+        """(total (L, C), {factor: (L, C) score}) for packed location profiles"""
+        factors = {}
+        weighted = np.zeros((len(has_soil), len(self.crops)), dtype=np.float32)
+        weight_sum = np.zeros_like(weighted)
+        for factor in RANGE_FACTORS:
+            score = _range_score(values[factor], self.ranges[factor])
+            # A factor counts only where both the location and the crop have data for it
+            known = ~np.isnan(values[factor])[:, None] & ~np.isnan(self.ranges[factor][:, 1])[None, :]
+            factors[factor] = np.where(known, score, np.nan)
+            weighted += np.where(known, score * FACTOR_WEIGHTS[factor], 0)
+            weight_sum += known * FACTOR_WEIGHTS[factor]
+
+        # How many of a location's soils each crop is suited to, as one product per soil role
+        soil = np.where(dominant @ self.soil_incidence.T > 0, DOMINANT_SOIL_SCORE,
+                        np.where(other @ self.soil_incidence.T > 0, OTHER_SOIL_SCORE, UNSUITED_SOIL_SCORE))
+        soil = np.where(has_soil[:, None], soil, np.nan).astype(np.float32)
+        factors['soil_type'] = soil
+        weighted += np.where(has_soil[:, None], soil * FACTOR_WEIGHTS['soil_type'], 0)
+        weight_sum += has_soil[:, None] * FACTOR_WEIGHTS['soil_type']
+
+        total = np.divide(weighted, weight_sum, out=np.zeros_like(weighted), where=weight_sum > 0)
+        return total, factors
+
+    def score(self, profiles):
+        """(total (L, C), {factor: (L, C)}) for a list of LocationProfiles"""
+        return self.score_packed(*self.pack(profiles))
+
+    def score_matrix(self, profiles, chunk_size=4096):
+        """(L, C) float32 totals for many locations, scored in chunks to bound the temporaries"""
+        matrix = np.empty((len(profiles), len(self.crops)), dtype=np.float32)
+        for start in range(0, len(profiles), chunk_size):
+            matrix[start:start + chunk_size] = self.score(profiles[start:start + chunk_size])[0]
+        return matrix
+
+    def rank(self, profile, top=None):
+        """Crops best suited to one location first, each with its per-factor scores"""
+        total, factors = self.score([profile])
+        order = np.argsort(-total[0], kind='stable')[:top]
+        ranked = []
+        for column in order:
+            ranked.append({
+                'crop': self.crops[column],
+                'score': round(float(total[0, column]), 3),
+                'factors': {name: None if np.isnan(values[0, column]) else round(float(values[0, column]), 3)
+                            for name, values in factors.items()}
+            })
+        return ranked
@@ -1,33 +1,199 @@
 # Enhanced Flask Backend with Farming Expert AI
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
-import torch
-import numpy as np
-from PIL import Image
-import io
-import base64
-import requests
+from werkzeug.exceptions import RequestEntityTooLarge
+import hmac
 import os
 from datetime import datetime
 import json
-import random
+import threading
+import time
+from intent_router import IntentRouter
+from advice_cache import AdviceCache
+from advice_context import AdviceContext
+from image_cache import ImageResultCache, content_digest
+import advice_templates as templates
+from advice_templates import LOCATION_SLOT, choose_variant, display_name, fill_location, title_case
+from location_index import LocationIndex
+from semantic_index import SemanticIndex
+from crop_suitability import SuitabilityEngine, region_profile
+from knowledge_base import (KnowledgeBundle, KnowledgeBundleError, KnowledgeSnapshot, SnapshotSection,
+                            BundleWatcher, SECTION_DEPTHS, depends_on_changes, record_dependency,
+                            track_dependencies)
+from vision_loader import SHARED_POOL_ENV, LazyInferenceEngine, ModelUnavailableError
+from weather_provider import WeatherService, MockWeatherProvider, OpenWeatherMapProvider, CircuitBreaker
+from synthetic_weather import CITY_CLIMATE, DEFAULT_CLIMATE, SyntheticWeather, weather_condition
+import request_metrics
+from request_metrics import (ADVICE_RENDER, ADVICE_REQUESTS, ERRORS, IMAGE_CACHE, INFERENCE, WEATHER_LOOKUP,
+                             MetricsMiddleware)
 
 app = Flask(__name__)
 CORS(app)
+# Per-route latency, bytes and status counts for /metrics, recorded around the whole WSGI call;
+# REQUEST_METRICS=0 leaves them out (the advice, weather and inference metrics are still recorded)
+if os.getenv('REQUEST_METRICS', '1') != '0':
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+
+# Compiled knowledge bundle (see knowledge_compiler.py); absent -> built-in dicts
+DEFAULT_KNOWLEDGE_BUNDLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge', 'knowledge.db')
+
+# Pseudo-section recorded by location lookups; "changes" when any name resolves differently
+LOCATION_INDEX_DEP = 'location_index'
+
+# Retrieval hits scoring below this fraction of the best hit are not used for routing. Only a
+# fraction of a positive score is a lower bar, so retrieval never routes on a score <= 0
+RETRIEVAL_MARGIN = 0.8
 
 # Enhanced Farming Expert Knowledge Base
 class FarmingExpertAI:
+    # Request fields each intent's advice depends on; everything else stays out of the cache key
+    INTENT_CACHE_FIELDS = {
+        'weather_location': ('location',),
+        'weather_general': (),
+        'location_soil': ('location',),
+        'planting': ('crop', 'season', 'location'),
+        'fertilizer': ('crop',),
+        'irrigation': ('crop',),
+        'pest': ('crop',),
+        'harvest': ('crop',),
+        'timing': ('crop',),
+        'crop_overview': ('crop',),
+        'soil': (),
+        'market': (),
+        'seasonal': ('season',),
+        'sustainable': (),
+        'technology': (),
+        'general': ()
+    }
+    
+    # Knowledge sections read through the current snapshot, which reloads swap atomically
+    crop_database = SnapshotSection()
+    soil_knowledge = SnapshotSection()
+    pest_management = SnapshotSection()
+    fertilizer_guide = SnapshotSection()
+    irrigation_systems = SnapshotSection()
+    seasonal_calendar = SnapshotSection()
+    market_insights = SnapshotSection()
+    location_data = SnapshotSection()
+    location_aliases = SnapshotSection()
+    
     def __init__(self):
-        self.crop_database = self._initialize_crop_database()
-        self.soil_knowledge = self._initialize_soil_knowledge()
-        self.pest_management = self._initialize_pest_management()
-        self.fertilizer_guide = self._initialize_fertilizer_guide()
-        self.irrigation_systems = self._initialize_irrigation_systems()
-        self.seasonal_calendar = self._initialize_seasonal_calendar()
-        self.market_insights = self._initialize_market_insights()
-        self.location_data = self._initialize_location_data()
+        self.knowledge_path = os.getenv('KNOWLEDGE_BUNDLE', DEFAULT_KNOWLEDGE_BUNDLE)
+        self.knowledge = self._load_knowledge(self.knowledge_path)
+        self._reload_lock = threading.Lock()   # one reload at a time
+        self._swap_lock = threading.Lock()     # swap + invalidation vs. caching new advice
+        self.intent_router = self._initialize_intent_router()
+        # Queries no keyword routes are matched against the knowledge records instead
+        self.retrieval_min_score = max(0.0, float(os.getenv('RETRIEVAL_MIN_SCORE', '0.1')))
         self.weather_api_key = os.getenv('WEATHER_API_KEY', 'demo_key')  # Add your API key
-        
+        self.advice_cache = AdviceCache(
+            max_entries=int(os.getenv('ADVICE_CACHE_SIZE', '1024')),
+            default_ttl=float(os.getenv('ADVICE_CACHE_TTL', '3600'))
+        )
+        # Advice rendered from a weather snapshot must not outlive that snapshot
+        self.weather_ttl = float(os.getenv('WEATHER_CACHE_TTL', '600'))
+        self.synthetic_weather = SyntheticWeather()
+        self.weather_service = self._initialize_weather_service()
+        
+    @property
+    def location_index(self):
+        return self.knowledge.index('location_index')
+    
+    @property
+    def semantic_index(self):
+        return self.knowledge.index('semantic_index')
+    
+    @property
+    def suitability(self):
+        return self.knowledge.index('suitability')
+    
+    @property
+    def knowledge_bundle(self):
+        return self.knowledge.bundle
+    
+    @property
+    def knowledge_version(self):
+        return self.knowledge.version
+    
+    def _load_knowledge(self, path):
+        """Snapshot of the compiled bundle, or of the built-in dicts when there is none"""
+        if path and os.path.exists(path):
+            try:
+                return self._open_knowledge(path)
+            except KnowledgeBundleError as e:
+                print(f"⚠️ {e}; using built-in knowledge")
+        return self._build_snapshot(self.build_inline_knowledge())
+    
+    def _open_knowledge(self, path):
+        bundle = KnowledgeBundle(path)
+        return self._build_snapshot({name: bundle.section(name) for name in SECTION_DEPTHS}, bundle)
+    
+    def _build_snapshot(self, sections, bundle=None):
+        # Each walks whole sections, so they are built on first use rather than at startup
+        return KnowledgeSnapshot(sections, bundle, {
+            'location_index': lambda s: LocationIndex.build(s['location_data'], s['location_aliases']),
+            'semantic_index': SemanticIndex.build,
+            'suitability': lambda s: SuitabilityEngine.build(s['crop_database'], s['location_data'])
+        })
+    
+    def reload_knowledge(self, path=None):
+        """Swap in a new snapshot of the knowledge bundle, dropping only advice built from changed records"""
+        with self._reload_lock:
+            # Built off to the side; requests keep using the current snapshot meanwhile
+            snapshot = self._open_knowledge(path or self.knowledge_path)
+            previous = self.knowledge
+            if snapshot.version == previous.version:
+                return {'reloaded': False, 'version': previous.version, 'invalidated': 0}
+            
+            changed = snapshot.changed_records(previous)
+            # Resolved locations may change with any location record; the indexes are not built to compare
+            if changed is not None and changed.keys() & {'location_data', 'location_aliases'}:
+                changed[LOCATION_INDEX_DEP] = {''}
+            
+            with self._swap_lock:
+                self.knowledge = snapshot
+                if changed is None:
+                    # No digests to compare against (built-in dicts): everything may differ
+                    invalidated = self.advice_cache.invalidate(lambda key: True)
+                else:
+                    invalidated = self.advice_cache.invalidate_dependents(
+                        lambda deps: depends_on_changes(deps, changed)
+                    )
+            
+            return {
+                'reloaded': True,
+                'version': snapshot.version,
+                'previous_version': previous.version,
+                'changed_records': None if changed is None else sum(len(paths) for paths in changed.values()),
+                'invalidated': invalidated
+            }
+    
+    def watch_knowledge(self, interval):
+        """Reload whenever the bundle file is replaced, polling every interval seconds (0 disables)"""
+        if interval <= 0:
+            return None
+        return BundleWatcher(self.knowledge_path, self._reload_from_watch, interval).start()
+    
+    def _reload_from_watch(self):
+        result = self.reload_knowledge()
+        if result['reloaded']:
+            print(f"🔄 Knowledge reloaded: {result['previous_version']} -> {result['version']}, "
+                  f"{result['invalidated']} cached answers dropped")
+
+    def build_inline_knowledge(self):
+        """Built-in knowledge dicts, keyed by section name (the knowledge compiler's default source)"""
+        return {
+            'crop_database': self._initialize_crop_database(),
+            'soil_knowledge': self._initialize_soil_knowledge(),
+            'pest_management': self._initialize_pest_management(),
+            'fertilizer_guide': self._initialize_fertilizer_guide(),
+            'irrigation_systems': self._initialize_irrigation_systems(),
+            'seasonal_calendar': self._initialize_seasonal_calendar(),
+            'market_insights': self._initialize_market_insights(),
+            'location_data': self._initialize_location_data(),
+            'location_aliases': self._initialize_location_aliases()
+        }
+
     def _initialize_crop_database(self):
         """Comprehensive crop database with detailed information"""
         return {
@@ -376,95 +542,108 @@ class FarmingExpertAI:
             }
         }
     
+    def _initialize_weather_service(self):
+        """Weather provider selected by WEATHER_PROVIDER, wrapped with caching and a circuit breaker"""
+        if os.getenv('WEATHER_PROVIDER', 'mock').lower() == 'openweathermap':
+            provider = OpenWeatherMapProvider(
+                self.weather_api_key,
+                base_url=os.getenv('WEATHER_API_URL'),
+                connect_timeout=float(os.getenv('WEATHER_CONNECT_TIMEOUT', '2')),
+                read_timeout=float(os.getenv('WEATHER_READ_TIMEOUT', '3'))
+            )
+        else:
+            provider = MockWeatherProvider(self)
+        
+        breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('WEATHER_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('WEATHER_BREAKER_RESET', '30'))
+        )
+        return WeatherService(provider, self._get_fallback_weather_data, ttl=self.weather_ttl, breaker=breaker,
+                              max_locations=int(os.getenv('WEATHER_CACHE_SIZE', '1024')))
+    
+    def _initialize_location_aliases(self):
+        """Alternate names that resolve to a region in location_data"""
+        return {
+            'cities': {
+                'mumbai': 'maharashtra',
+                'bombay': 'maharashtra',
+                'pune': 'maharashtra',
+                'nagpur': 'maharashtra',
+                'nashik': 'maharashtra',
+                'chennai': 'tamil_nadu',
+                'madras': 'tamil_nadu',
+                'coimbatore': 'tamil_nadu',
+                'madurai': 'tamil_nadu',
+                'kolkata': 'west_bengal',
+                'calcutta': 'west_bengal',
+                'jaipur': 'rajasthan',
+                'jodhpur': 'rajasthan',
+                'chandigarh': 'punjab',
+                'ludhiana': 'punjab',
+                'amritsar': 'punjab',
+                'kochi': 'kerala',
+                'cochin': 'kerala',
+                'thiruvananthapuram': 'kerala',
+                'trivandrum': 'kerala',
+                'des moines': 'iowa',
+                'fresno': 'california',
+                'sacramento': 'california'
+            },
+            'short_names': {
+                'bengal': 'west_bengal'
+            },
+            'abbreviations': {
+                'pb': 'punjab',
+                'mh': 'maharashtra',
+                'kl': 'kerala',
+                'rj': 'rajasthan',
+                'wb': 'west_bengal',
+                'tn': 'tamil_nadu',
+                'ca': 'california',
+                'ia': 'iowa'
+            }
+        }
+    
+    def resolve_location(self, location):
+        """Canonical location key (e.g. 'india/maharashtra') or None when unknown"""
+        match = self._match_location(location)
+        return match.key if match else None
+    
+    def _match_location(self, location):
+        record_dependency(LOCATION_INDEX_DEP)
+        return self.location_index.resolve(location)
+    
     def get_weather_data(self, location):
         """Get real weather data for a location"""
+        started = time.perf_counter()
         try:
-            # Try to get coordinates for the location
-            if ',' in location:
-                city, state = location.split(',')
-                city = city.strip()
-                state = state.strip()
-            else:
-                city = location.strip()
-                state = None
-            
-            # Mock weather data with realistic values based on location
-            weather_data = self._get_mock_weather_data(city, state)
-            
-            # In production, you would use a real weather API like:
-            # OpenWeatherMap: https://openweathermap.org/api
-            # WeatherAPI: https://www.weatherapi.com/
-            
-            return weather_data
+            # Cached per location; concurrent lookups share one upstream call
+            return self.weather_service.get(location)
             
         except Exception as e:
+            ERRORS.labels('weather', type(e).__name__).inc()
             # Return fallback weather data
             return self._get_fallback_weather_data(location)
+        finally:
+            WEATHER_LOOKUP.observe(time.perf_counter() - started)
     
-    def _get_mock_weather_data(self, city, state=None):
-        """Generate realistic mock weather data based on location"""
-        # Mock data based on typical weather patterns
-        location_weather = {
-            'delhi': {'temp': 35, 'humidity': 65, 'rainfall': 2.5},
-            'mumbai': {'temp': 30, 'humidity': 80, 'rainfall': 15.0},
-            'bangalore': {'temp': 25, 'humidity': 70, 'rainfall': 5.0},
-            'chennai': {'temp': 32, 'humidity': 75, 'rainfall': 3.0},
-            'kolkata': {'temp': 28, 'humidity': 85, 'rainfall': 8.0},
-            'hyderabad': {'temp': 33, 'humidity': 60, 'rainfall': 1.5},
-            'pune': {'temp': 29, 'humidity': 65, 'rainfall': 4.0},
-            'jaipur': {'temp': 38, 'humidity': 45, 'rainfall': 0.5},
-            'lucknow': {'temp': 36, 'humidity': 70, 'rainfall': 2.0},
-            'chandigarh': {'temp': 32, 'humidity': 55, 'rainfall': 1.0}
-        }
-        
-        city_lower = city.lower()
-        base_data = location_weather.get(city_lower, {'temp': 28, 'humidity': 65, 'rainfall': 3.0})
-        
-        return {
-            'location': f"{city}, {state}" if state else city,
-            'temperature': base_data['temp'],
-            'humidity': base_data['humidity'],
-            'rainfall': base_data['rainfall'],
-            'wind_speed': random.uniform(5, 15),
-            'pressure': random.uniform(1010, 1020),
-            'weather_condition': self._get_weather_condition(base_data['temp'], base_data['rainfall']),
-            'forecast': [
-                {
-                    'day': 'Today',
-                    'temp': base_data['temp'],
-                    'humidity': base_data['humidity'],
-                    'rain': base_data['rainfall'],
-                    'condition': self._get_weather_condition(base_data['temp'], base_data['rainfall'])
-                },
-                {
-                    'day': 'Tomorrow',
-                    'temp': base_data['temp'] + random.uniform(-2, 2),
-                    'humidity': base_data['humidity'] + random.uniform(-5, 5),
-                    'rain': base_data['rainfall'] + random.uniform(-1, 3),
-                    'condition': 'partly_cloudy'
-                },
-                {
-                    'day': 'Day 3',
-                    'temp': base_data['temp'] + random.uniform(-3, 3),
-                    'humidity': base_data['humidity'] + random.uniform(-10, 10),
-                    'rain': base_data['rainfall'] + random.uniform(-2, 5),
-                    'condition': 'cloudy'
-                }
-            ]
-        }
+    def _get_mock_weather_data(self, city, state=None, day=None):
+        """Synthetic weather seeded by (canonical location, date): the same request gets the same payload all day"""
+        label = f"{city}, {state}" if state else city
+        city_key = ' '.join(city.lower().split())
+        # Weather is not knowledge, so this lookup is not recorded as an advice dependency
+        match = self.location_index.resolve(label)
+        return self.synthetic_weather.snapshot(
+            f"{city_key}|{match.key}" if match else city_key,
+            CITY_CLIMATE.get(city_key, DEFAULT_CLIMATE),
+            label,
+            day=day or datetime.now().date(),
+            monsoon=match is not None and match.country == 'india'
+        )
     
     def _get_weather_condition(self, temp, rainfall):
         """Determine weather condition based on temperature and rainfall"""
-        if rainfall > 10:
-            return 'rainy'
-        elif rainfall > 5:
-            return 'cloudy'
-        elif temp > 35:
-            return 'hot'
-        elif temp < 15:
-            return 'cold'
-        else:
-            return 'clear'
+        return weather_condition(temp, rainfall)
     
     def _get_fallback_weather_data(self, location):
         """Fallback weather data when API fails"""
@@ -483,36 +662,47 @@ class FarmingExpertAI:
             ]
         }
     
+    def get_crop_suitability(self, location, use_weather=True, soil_ph=None, top=None, ctx=None):
+        """Every crop ranked by how well it suits location's climate and soil"""
+        match = self._match_location(location)
+        engine = self.suitability
+        if not use_weather and not match:
+            # An unknown place has no climate normals to score
+            return {'location_key': None, 'basis': 'climate', 'ranking': None}
+        if not use_weather and soil_ph is None:
+            # Climate normals only: the ranking was computed with the snapshot
+            return {'location_key': match.key, 'basis': 'climate', 'ranking': engine.region_ranking(match.key, top)}
+        
+        region_data = self.location_data[match.country]['states'][match.region] if match else {}
+        weather = (ctx or AdviceContext(self)).weather(location) if use_weather else None
+        profile = region_profile(region_data, weather, soil_ph)
+        return {
+            'location_key': match.key if match else None,
+            'basis': 'weather' if use_weather else 'climate',
+            'profile': profile._asdict(),
+            'ranking': engine.rank(profile, top)
+        }
+    
     def get_location_soil_recommendations(self, location):
         """Get soil recommendations for a specific location"""
         try:
-            location_lower = location.lower()
-            
-            # Check Indian states
-            if 'india' in self.location_data:
-                for state, data in self.location_data['india']['states'].items():
-                    if state in location_lower or location_lower in state:
-                        return {
-                            'location': location,
-                            'climate_zone': data['climate_zone'],
-                            'dominant_soil': data['dominant_soil'],
-                            'soil_types': data['soil_types'],
-                            'soil_recommendations': data['soil_recommendations'],
-                            'major_crops': data['major_crops'],
-                            'rainfall_info': data['rainfall']
-                        }
-            
-            # Check US states
-            if 'usa' in self.location_data:
-                for state, data in self.location_data['usa']['states'].items():
-                    if state in location_lower or location_lower in state:
-                        return {
-                            'location': location,
-                            'climate_zone': data['climate_zone'],
-                            'dominant_soil': data['dominant_soil'],
-                            'soil_recommendations': data['soil_recommendations'],
-                            'major_crops': data['major_crops']
-                        }
+            match = self._match_location(location)
+            if match:
+                data = self.location_data[match.country]['states'][match.region]
+                recommendations = {
+                    'location': location,
+                    'location_key': match.key,
+                    'climate_zone': data['climate_zone'],
+                    'dominant_soil': data['dominant_soil'],
+                    'soil_recommendations': data['soil_recommendations'],
+                    'major_crops': data['major_crops']
+                }
+                # Not every region records soil types and rainfall
+                if 'soil_types' in data:
+                    recommendations['soil_types'] = data['soil_types']
+                if 'rainfall' in data:
+                    recommendations['rainfall_info'] = data['rainfall']
+                return recommendations
             
             # Return general recommendations
             return self._get_general_soil_recommendations(location)
@@ -536,513 +726,532 @@ class FarmingExpertAI:
             'general_advice': 'Soil testing recommended for specific recommendations'
         }
     
-    def get_expert_advice(self, query, crop=None, location=None, season=None):
-        """Generate expert farming advice based on query"""
-        query_lower = query.lower()
-        
-        # Weather-related queries
-        if 'weather' in query_lower or 'temperature' in query_lower or 'rain' in query_lower or 'climate' in query_lower:
-            if location:
-                return self._get_weather_advice_for_location(location, crop, query_lower)
-            else:
-                return self._get_weather_general_advice()
-        
-        # Soil and location-specific queries
-        if 'soil' in query_lower and location:
-            return self._get_location_soil_advice(location, query_lower)
-        
-        # Crop-specific advice
+    def _initialize_intent_router(self):
+        """Weighted keyword table for query routing, compiled once into a single matcher"""
+        weather_keywords = {'weather': 3, 'temperature': 2, 'rain': 2, 'climate': 2}
+        router = IntentRouter()
+        # Registration order breaks ties between equally scored intents
+        router.add_intent('weather_location', weather_keywords, requires=('location',))
+        router.add_intent('weather_general', weather_keywords)
+        router.add_intent('location_soil', {'soil': 2, 'ph': 2, 'nutrient': 1}, requires=('location',))
+        router.add_intent('planting', {'plant': 2, 'transplant': 2, 'sow': 2, 'grow': 1}, requires=('crop',))
+        router.add_intent('fertilizer', {'fertilizer': 3, 'nutrition': 2, 'nutrient': 2}, requires=('crop',))
+        router.add_intent('irrigation', {'irrigation': 3, 'irrigate': 3, 'water': 2}, requires=('crop',))
+        router.add_intent('pest', {'pest': 3, 'disease': 3, 'insect': 3}, requires=('crop',))
+        router.add_intent('harvest', {'harvest': 3, 'yield': 2}, requires=('crop',))
+        router.add_intent('timing', {'time': 1, 'when': 1}, requires=('crop',))
+        router.add_intent('soil', {'soil': 2, 'ph': 2, 'nutrient': 1})
+        router.add_intent('market', {'market': 3, 'price': 3, 'sell': 2})
+        router.add_intent('seasonal', {'season': 2, 'calendar': 2, 'kharif': 2, 'rabi': 2})
+        router.add_intent('sustainable', {'organic': 2, 'sustainable': 2})
+        router.add_intent('technology', {'technology': 2, 'modern': 1, 'equipment': 2})
+        return router.compile()
+    
+    def route_query(self, query, crop=None, location=None, retrieval=True):
+        """Classify a query into an advice intent, returning the scored intents"""
+        context = []
         if crop and crop in self.crop_database:
-            crop_info = self.crop_database[crop]
-            
-            if 'plant' in query_lower or 'sow' in query_lower or 'grow' in query_lower:
-                return self._get_planting_advice(crop_info, crop, season, location)
-            elif 'fertilizer' in query_lower or 'nutrition' in query_lower or 'nutrient' in query_lower:
-                return self._get_fertilizer_advice(crop_info, crop)
-            elif 'irrigation' in query_lower or 'water' in query_lower:
-                return self._get_irrigation_advice(crop_info, crop)
-            elif 'pest' in query_lower or 'disease' in query_lower or 'insect' in query_lower:
-                return self._get_pest_advice(crop_info, crop)
-            elif 'harvest' in query_lower or 'yield' in query_lower:
-                return self._get_harvest_advice(crop_info, crop)
-            elif 'time' in query_lower or 'when' in query_lower:
-                return self._get_timing_advice(crop_info, crop, season)
-            else:
-                # General crop advice
-                return self._get_general_crop_advice(crop_info, crop)
-        
-        # General farming advice based on keywords
-        if 'soil' in query_lower or 'ph' in query_lower or 'nutrient' in query_lower:
-            return self._get_soil_advice(query_lower)
-        elif 'market' in query_lower or 'price' in query_lower or 'sell' in query_lower:
-            return self._get_market_advice()
-        elif 'season' in query_lower or 'calendar' in query_lower or 'kharif' in query_lower or 'rabi' in query_lower:
-            return self._get_seasonal_advice(season)
-        elif 'organic' in query_lower or 'sustainable' in query_lower:
-            return self._get_sustainable_advice()
-        elif 'technology' in query_lower or 'modern' in query_lower or 'equipment' in query_lower:
-            return self._get_technology_advice()
+            context.append('crop')
+        if location:
+            context.append('location')
         
-        return self._get_general_advice()
+        default = 'crop_overview' if 'crop' in context else 'general'
+        route = self.intent_router.route(query, context, default=default)
+        if route.scores or not retrieval:
+            return route
+        return self._route_by_retrieval(query, route, crop, location) or route
+    
+    def _route_by_retrieval(self, query, route, crop, location):
+        """Intent of the closest knowledge record whose context requirements can be met, or None"""
+        hits = self.semantic_index.search(query, k=5, min_score=self.retrieval_min_score)
+        for hit in hits:
+            # Far weaker matches than the best one are about something else
+            if hit.score < RETRIEVAL_MARGIN * hits[0].score:
+                break
+            record = hit.record
+            inferred = {}
+            if record.crop and record.crop != crop:
+                # The crop must come from the request or be named in the query
+                if crop or not self.semantic_index.mentions(query, record.crop):
+                    continue
+                inferred['crop'] = record.crop
+            if record.location and not location:
+                if not self.semantic_index.mentions(query, record.location):
+                    continue
+                # Region records are keyed 'west_bengal'; advice titles and lookups want 'West Bengal'
+                inferred['location'] = display_name(record.location)
+            if record.season:
+                inferred['season'] = record.season
+            
+            context = {'location'} if location or 'location' in inferred else set()
+            if (crop and crop in self.crop_database) or 'crop' in inferred:
+                context.add('crop')
+            requires = {'crop'} if record.intent == 'crop_overview' else self.intent_router.requirements(record.intent)
+            if not requires <= context:
+                continue
+            return route._replace(intent=record.intent, inferred=inferred, retrieval={
+                'section': record.section, 'path': record.path, 'score': round(hit.score, 4)
+            })
+        return None
+    
+    def get_expert_advice(self, query, crop=None, location=None, season=None, route=None, ctx=None):
+        """Generate expert farming advice based on query"""
+        return ''.join(self.iter_expert_advice(query, crop, location, season, route, ctx))
+    
+    def iter_expert_advice(self, query, crop=None, location=None, season=None, route=None, ctx=None):
+        """Expert advice as sections, each yielded as soon as it is rendered; joined they equal get_expert_advice"""
+        if route is None:
+            route = self.route_query(query, crop, location)
+        if route.inferred:
+            crop = route.inferred.get('crop', crop)
+            location = route.inferred.get('location', location)
+            season = season or route.inferred.get('season')
+        
+        cache_key, ttl = self._advice_cache_key(route.intent, crop, location, season)
+        advice = self.advice_cache.get(cache_key)
+        if advice is not None:
+            ADVICE_REQUESTS.labels(route.intent, 'hit').inc()
+            yield fill_location(advice, location)
+            return
+        ADVICE_REQUESTS.labels(route.intent, 'miss').inc()
+        
+        if ctx is None:
+            ctx = AdviceContext(self)
+        snapshot = self.knowledge
+        sections = []
+        deps = set()
+        rendering = self._render_sections(route.intent, query.lower(), crop, location, season, ctx)
+        # Handler time only: a streaming consumer's time between sections is not counted
+        render_seconds = 0.0
+        while True:
+            # Track each step on its own so no tracker stays open while the consumer holds a section
+            started = time.perf_counter()
+            with track_dependencies() as step_deps:
+                section = next(rendering, None)
+            render_seconds += time.perf_counter() - started
+            deps |= step_deps
+            if section is None:
+                break
+            sections.append(section)
+            yield fill_location(section, location)
+        ADVICE_RENDER.labels(route.intent).observe(render_seconds)
+        
+        with self._swap_lock:
+            # Advice rendered from a snapshot that was swapped out mid-render is not cached
+            if self.knowledge is snapshot:
+                self.advice_cache.set(cache_key, ''.join(sections), ttl, deps)
     
-    def _get_weather_advice_for_location(self, location, crop, query):
+    def get_batch_advice(self, items):
+        """Advice for many {query, crop, location, season} items: (results in item order, batch stats)"""
+        results = [None] * len(items)
+        unique = {}   # (query, crop, location, season) -> indices of the items asking it
+        for index, item in enumerate(items):
+            try:
+                unique.setdefault(self._batch_item_fields(item), []).append(index)
+            except ValueError as e:
+                results[index] = {'error': str(e), 'success': False}
+        
+        # Each location's weather and soil are looked up once for all of its queries
+        by_location = {}
+        for fields in unique:
+            location = fields[2]
+            by_location.setdefault(WeatherService.location_key(location) if location else None, []).append(fields)
+        
+        for group in by_location.values():
+            ctx = AdviceContext(self)
+            for fields in group:
+                query, crop, location, season = fields
+                try:
+                    route = self.route_query(query, crop, location)
+                    advice = self.get_expert_advice(query, crop, location, season, route=route, ctx=ctx)
+                    result = {'advice': advice, 'intent': route.intent, 'success': True}
+                except Exception as e:
+                    result = {'error': str(e), 'success': False}
+                for index in unique[fields]:
+                    results[index] = result
+        
+        stats = {'items': len(items), 'unique': len(unique), 'locations': len(by_location)}
+        return results, stats
+    
+    def _batch_item_fields(self, item):
+        """Validated (query, crop, location, season) of one batch item"""
+        if not isinstance(item, dict):
+            raise ValueError('Item must be an object')
+        query = item.get('query')
+        if not query or not isinstance(query, str):
+            raise ValueError('Query is required')
+        fields = [query]
+        for name in ('crop', 'location', 'season'):
+            value = item.get(name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"'{name}' must be a string")
+            fields.append(value or None)
+        return tuple(fields)
+    
+    def _advice_cache_key(self, intent, crop, location, season):
+        """Normalized cache key and TTL for an intent's rendered advice"""
+        # Only fold what the handlers fold: seasons are title-cased when rendered, and locations
+        # are rendered as LOCATION_SLOT, filled with each requester's spelling on the way out
+        fields = {
+            'crop': crop.lower() if crop else None,
+            'season': season.lower() if season else None,
+            'location': WeatherService.location_key(location) if location else None
+        }
+        key_fields = self.INTENT_CACHE_FIELDS.get(intent, ('crop', 'season', 'location'))
+        # Several handlers stamp today's date into the text
+        key = (intent, datetime.now().date()) + tuple(fields[name] for name in key_fields)
+        
+        uses_weather = intent == 'weather_location' or (intent == 'planting' and location)
+        # Deterministic weather only changes with the date, which is already part of the key
+        ttl = self.weather_ttl if uses_weather and not self.weather_service.provider.deterministic else None
+        return key, ttl
+    
+    def _render_advice(self, intent, query_lower, crop, location, season, ctx):
+        """Dispatch a routed intent to its advice builder"""
+        return fill_location(''.join(self._render_sections(intent, query_lower, crop, location, season, ctx)), location)
+    
+    def _render_sections(self, intent, query_lower, crop, location, season, ctx):
+        """Advice for a routed intent as a generator of sections, in reading order"""
+        crop_info = self.crop_database.get(crop) if crop else None
+        
+        # Builders that do lookups yield section by section; the rest produce one section
+        if intent == 'weather_location':
+            yield from self._weather_advice_sections(location, crop, query_lower, ctx)
+        elif intent == 'location_soil':
+            yield from self._location_soil_sections(location, query_lower, ctx)
+        elif intent == 'planting':
+            yield from self._planting_advice_sections(crop_info, crop, season, location, ctx)
+        elif intent == 'weather_general':
+            yield self._get_weather_general_advice()
+        elif intent == 'fertilizer':
+            yield self._get_fertilizer_advice(crop_info, crop)
+        elif intent == 'irrigation':
+            yield self._get_irrigation_advice(crop_info, crop)
+        elif intent == 'pest':
+            yield self._get_pest_advice(crop_info, crop)
+        elif intent == 'harvest':
+            yield self._get_harvest_advice(crop_info, crop)
+        elif intent == 'timing':
+            yield self._get_timing_advice(crop_info, crop, season)
+        elif intent == 'crop_overview':
+            yield self._get_general_crop_advice(crop_info, crop)
+        elif intent == 'soil':
+            yield self._get_soil_advice(query_lower)
+        elif intent == 'market':
+            yield self._get_market_advice()
+        elif intent == 'seasonal':
+            yield self._get_seasonal_advice(season)
+        elif intent == 'sustainable':
+            yield self._get_sustainable_advice()
+        elif intent == 'technology':
+            yield self._get_technology_advice()
+        else:
+            yield self._get_general_advice()
+    
+    def _get_weather_advice_for_location(self, location, crop, query, ctx=None):
         """Generate weather advice for specific location"""
-        weather_data = self.get_weather_data(location)
-        soil_data = self.get_location_soil_recommendations(location)
-        
-        advice = f"🌤️ **Weather & Farming Advice for {weather_data['location']}**\n\n"
+        return fill_location(''.join(self._weather_advice_sections(location, crop, query, ctx)), location)
+    
+    def _weather_advice_sections(self, location, crop, query, ctx=None):
+        """Weather advice as sections: current conditions, recommendations, soil, forecast"""
+        if ctx is None:
+            ctx = AdviceContext(self)
+        weather_data = ctx.weather(location)
+        soil_data = ctx.soil(location)
         
         # Current weather conditions
-        advice += f"**Current Weather Conditions:**\n"
-        advice += f"• Temperature: {weather_data['temperature']}°C\n"
-        advice += f"• Humidity: {weather_data['humidity']}%\n"
-        advice += f"• Rainfall: {weather_data['rainfall']}mm\n"
-        advice += f"• Wind Speed: {weather_data['wind_speed']:.1f} km/h\n"
-        advice += f"• Condition: {weather_data['weather_condition'].replace('_', ' ').title()}\n\n"
-        
-        # Weather-based farming advice
         temp = weather_data['temperature']
         humidity = weather_data['humidity']
         rainfall = weather_data['rainfall']
+        yield templates.WEATHER_CURRENT.render(
+            location=LOCATION_SLOT, temperature=temp, humidity=humidity, rainfall=rainfall,
+            wind_speed=weather_data['wind_speed'], condition=display_name(weather_data['weather_condition'])
+        )
         
-        advice += f"**Weather-Based Farming Recommendations:**\n"
-        
+        # Weather-based farming advice
+        parts = []
         if temp > 35:
-            advice += f"🔥 **High Temperature Alert ({temp}°C):**\n"
-            advice += f"   • Increase irrigation frequency\n"
-            advice += f"   • Provide shade protection for sensitive crops\n"
-            advice += f"   • Avoid field work during peak hours (11 AM - 3 PM)\n"
-            advice += f"   • Consider heat-tolerant crop varieties\n\n"
+            parts.append(templates.HIGH_TEMPERATURE_ALERT.render(temperature=temp))
         elif temp < 15:
-            advice += f"❄️ **Low Temperature Alert ({temp}°C):**\n"
-            advice += f"   • Protect crops from frost damage\n"
-            advice += f"   • Use mulching to retain soil warmth\n"
-            advice += f"   • Delay planting of warm-season crops\n\n"
+            parts.append(templates.LOW_TEMPERATURE_ALERT.render(temperature=temp))
         
         if humidity > 80:
-            advice += f"💧 **High Humidity ({humidity}%):**\n"
-            advice += f"   • Monitor for fungal diseases\n"
-            advice += f"   • Ensure proper air circulation\n"
-            advice += f"   • Apply preventive fungicides if needed\n\n"
+            parts.append(templates.HIGH_HUMIDITY_ALERT.render(humidity=humidity))
         elif humidity < 40:
-            advice += f"🌵 **Low Humidity ({humidity}%):**\n"
-            advice += f"   • Increase irrigation frequency\n"
-            advice += f"   • Use drip irrigation to maintain moisture\n"
-            advice += f"   • Apply mulch to reduce evaporation\n\n"
+            parts.append(templates.LOW_HUMIDITY_ALERT.render(humidity=humidity))
         
         if rainfall > 10:
-            advice += f"🌧️ **Heavy Rainfall ({rainfall}mm):**\n"
-            advice += f"   • Ensure proper field drainage\n"
-            advice += f"   • Delay fertilizer application\n"
-            advice += f"   • Monitor for waterlogging\n\n"
+            parts.append(templates.HEAVY_RAINFALL_ALERT.render(rainfall=rainfall))
         elif rainfall < 1:
-            advice += f"☀️ **Dry Conditions ({rainfall}mm):**\n"
-            advice += f"   • Plan irrigation schedule\n"
-            advice += f"   • Consider drought-resistant varieties\n"
-            advice += f"   • Implement water conservation techniques\n\n"
+            parts.append(templates.DRY_CONDITIONS_ALERT.render(rainfall=rainfall))
+        if parts:
+            yield ''.join(parts)
         
         # Soil recommendations for the location
         if soil_data:
-            advice += f"**Soil & Crop Recommendations for {soil_data['location']}:**\n"
-            advice += f"• Climate Zone: {soil_data['climate_zone'].replace('_', ' ').title()}\n"
-            advice += f"• Dominant Soil: {soil_data['dominant_soil'].replace('_', ' ').title()}\n"
+            parts = [templates.WEATHER_SOIL_SUMMARY.render(
+                location=LOCATION_SLOT, climate_zone=display_name(soil_data['climate_zone'])
+            )]
+            if 'dominant_soil' in soil_data:
+                parts.append(templates.DOMINANT_SOIL.render(soil=display_name(soil_data['dominant_soil'])))
             
             if 'major_crops' in soil_data:
-                advice += f"• Recommended Crops: {', '.join(soil_data['major_crops'])}\n"
+                parts.append(templates.RECOMMENDED_CROPS.render(crops=', '.join(soil_data['major_crops'])))
             
             if 'soil_recommendations' in soil_data:
-                advice += f"\n**Soil-Specific Crop Recommendations:**\n"
-                for soil_type, crops in soil_data['soil_recommendations'].items():
-                    advice += f"• **{soil_type.replace('_', ' ').title()}:** {', '.join(crops)}\n"
+                parts.append(templates.SOIL_CROPS_HEADING)
+                self._append_soil_crops(parts, soil_data['soil_recommendations'])
+            yield ''.join(parts)
         
         # 3-day forecast
         if 'forecast' in weather_data:
-            advice += f"\n**3-Day Weather Forecast:**\n"
+            parts = [templates.FORECAST_HEADING]
             for day_data in weather_data['forecast']:
-                advice += f"• **{day_data['day']}:** {day_data['temp']}°C, {day_data['humidity']}% humidity, {day_data['rain']}mm rain\n"
-        
-        return advice
+                parts.append(templates.FORECAST_DAY.render(
+                    day=day_data['day'], temp=day_data['temp'], humidity=day_data['humidity'], rain=day_data['rain']
+                ))
+            yield ''.join(parts)
+    
+    def _append_soil_crops(self, parts, soil_recommendations):
+        """One bullet per soil type with the crops it suits"""
+        for soil_type, crops in soil_recommendations.items():
+            parts.append(templates.BOLD_BULLET.render(label=display_name(soil_type), text=', '.join(crops)))
     
-    def _get_location_soil_advice(self, location, query):
+    def _get_location_soil_advice(self, location, query, ctx=None):
         """Generate soil advice for specific location"""
-        soil_data = self.get_location_soil_recommendations(location)
-        
-        advice = f"🌱 **Soil Analysis & Recommendations for {location}**\n\n"
+        return fill_location(''.join(self._location_soil_sections(location, query, ctx)), location)
+    
+    def _location_soil_sections(self, location, query, ctx=None):
+        """Location soil advice as sections: title, soil profile, management tips"""
+        if ctx is None:
+            ctx = AdviceContext(self)
+        yield templates.LOCATION_SOIL_TITLE.render(location=LOCATION_SLOT)
         
+        soil_data = ctx.soil(location)
         if soil_data:
-            advice += f"**Location Information:**\n"
-            advice += f"• Climate Zone: {soil_data['climate_zone'].replace('_', ' ').title()}\n"
-            advice += f"• Dominant Soil Type: {soil_data['dominant_soil'].replace('_', ' ').title()}\n"
+            parts = [templates.LOCATION_INFORMATION.render(climate_zone=display_name(soil_data['climate_zone']))]
+            if 'dominant_soil' in soil_data:
+                parts.append(templates.DOMINANT_SOIL_TYPE.render(soil=display_name(soil_data['dominant_soil'])))
             
             if 'soil_types' in soil_data:
-                advice += f"• Available Soil Types: {', '.join([s.replace('_', ' ').title() for s in soil_data['soil_types']])}\n"
+                soils = ', '.join([display_name(s) for s in soil_data['soil_types']])
+                parts.append(templates.AVAILABLE_SOIL_TYPES.render(soils=soils))
             
             if 'rainfall_info' in soil_data:
-                advice += f"• Average Rainfall: {soil_data['rainfall_info']['average']}mm\n"
-                advice += f"• Monsoon Period: {soil_data['rainfall_info']['monsoon']}\n"
+                parts.append(templates.RAINFALL_INFORMATION.render(
+                    average=soil_data['rainfall_info']['average'], monsoon=soil_data['rainfall_info']['monsoon']
+                ))
             
-            advice += f"\n**Soil-Specific Crop Recommendations:**\n"
-            for soil_type, crops in soil_data['soil_recommendations'].items():
-                advice += f"• **{soil_type.replace('_', ' ').title()}:** {', '.join(crops)}\n"
+            parts.append(templates.SOIL_CROPS_HEADING)
+            self._append_soil_crops(parts, soil_data['soil_recommendations'])
             
             if 'major_crops' in soil_data:
-                advice += f"\n**Major Crops in {location}:** {', '.join(soil_data['major_crops'])}\n"
-        
-        advice += f"\n**General Soil Management Tips:**\n"
-        advice += f"• Conduct soil pH testing annually\n"
-        advice += f"• Add organic matter to improve soil structure\n"
-        advice += f"• Practice crop rotation for soil health\n"
-        advice += f"• Use appropriate fertilizers based on soil test results\n"
-        advice += f"• Implement proper drainage systems\n"
+                parts.append(templates.MAJOR_CROPS_IN_LOCATION.render(
+                    location=LOCATION_SLOT, crops=', '.join(soil_data['major_crops'])
+                ))
+            yield ''.join(parts)
         
-        return advice
+        yield templates.SOIL_MANAGEMENT_TIPS
     
-    def _get_planting_advice(self, crop_info, crop, season, location=None):
+    def _get_planting_advice(self, crop_info, crop, season, location=None, ctx=None):
         """Generate planting advice for specific crop"""
-        greetings = [
-            f"🌱 **{crop.title()} Planting Guide**\n\n",
-            f"🚜 **Complete {crop.title()} Planting Manual**\n\n",
-            f"🌾 **Expert {crop.title()} Cultivation Guide**\n\n",
-            f"🌾 **Professional {crop.title()} Planting Instructions**\n\n"
-        ]
-        
-        advice = random.choice(greetings)
+        return fill_location(''.join(self._planting_advice_sections(crop_info, crop, season, location, ctx)), location)
+    
+    def _planting_advice_sections(self, crop_info, crop, season, location=None, ctx=None):
+        """Planting advice as sections; the greeting goes out before any weather lookup"""
+        if ctx is None:
+            ctx = AdviceContext(self)
         
-        # Add current date context
-        current_month = datetime.now().strftime("%B")
-        advice += f"*Generated on {datetime.now().strftime('%B %d, %Y')}*\n\n"
+        # Varies by crop and day, but is stable within a day so the answer stays cacheable
+        yield (choose_variant(templates.PLANTING_GREETINGS, crop, datetime.now().date()).render(crop=title_case(crop))
+               # Add current date context
+               + templates.GENERATED_ON.render(date=datetime.now().strftime('%B %d, %Y')))
         
         # Location-specific information
         if location:
-            weather_data = self.get_weather_data(location)
-            soil_data = self.get_location_soil_recommendations(location)
+            weather_data = ctx.weather(location)
+            soil_data = ctx.soil(location)
             
-            advice += f"**Location-Specific Information for {location}:**\n"
-            advice += f"• Current Temperature: {weather_data['temperature']}°C\n"
-            advice += f"• Current Humidity: {weather_data['humidity']}%\n"
-            advice += f"• Recent Rainfall: {weather_data['rainfall']}mm\n"
+            parts = [templates.LOCATION_CONDITIONS.render(
+                location=LOCATION_SLOT, temperature=weather_data['temperature'],
+                humidity=weather_data['humidity'], rainfall=weather_data['rainfall']
+            )]
             
             if soil_data and 'climate_zone' in soil_data:
-                advice += f"• Climate Zone: {soil_data['climate_zone'].replace('_', ' ').title()}\n"
-                advice += f"• Recommended Soil: {soil_data['dominant_soil'].replace('_', ' ').title()}\n"
+                parts.append(templates.CLIMATE_ZONE.render(climate_zone=display_name(soil_data['climate_zone'])))
+                if 'dominant_soil' in soil_data:
+                    parts.append(templates.RECOMMENDED_SOIL.render(soil=display_name(soil_data['dominant_soil'])))
             
-            advice += f"\n"
+            parts.append("\n")
+            yield ''.join(parts)
         
         # Optimal conditions
         conditions = crop_info['optimal_conditions']
-        advice += f"**Optimal Growing Conditions:**\n"
-        advice += f"• Temperature: {conditions['temperature']['optimal']}°C (range: {conditions['temperature']['min']}-{conditions['temperature']['max']}°C)\n"
-        advice += f"• Soil pH: {conditions['soil_ph']['optimal']} (range: {conditions['soil_ph']['min']}-{conditions['soil_ph']['max']})\n"
-        advice += f"• Soil types: {', '.join(conditions['soil_type'])}\n"
-        advice += f"• Rainfall requirement: {conditions['rainfall']['growing_season']}mm during growing season\n\n"
+        temperature = conditions['temperature']
+        soil_ph = conditions['soil_ph']
+        parts = [templates.OPTIMAL_CONDITIONS.render(
+            temperature=temperature['optimal'], temperature_min=temperature['min'], temperature_max=temperature['max'],
+            ph=soil_ph['optimal'], ph_min=soil_ph['min'], ph_max=soil_ph['max'],
+            soil_types=', '.join(conditions['soil_type']), rainfall=conditions['rainfall']['growing_season']
+        )]
         
         # Location suitability check
         if location:
-            weather_data = self.get_weather_data(location)
-            temp_suitable = conditions['temperature']['min'] <= weather_data['temperature'] <= conditions['temperature']['max']
-            
-            advice += f"**Location Suitability Check:**\n"
-            if temp_suitable:
-                advice += f"✅ Current temperature ({weather_data['temperature']}°C) is suitable for {crop}\n"
+            current = ctx.weather(location)['temperature']
+            if temperature['min'] <= current <= temperature['max']:
+                parts.append(templates.TEMPERATURE_SUITABLE.render(temperature=current, crop=crop))
             else:
-                advice += f"⚠️ Current temperature ({weather_data['temperature']}°C) may need adjustment for optimal {crop} growth\n"
-            
-            advice += f"\n"
+                parts.append(templates.TEMPERATURE_UNSUITABLE.render(temperature=current, crop=crop))
         
         # Planting season with context
-        advice += f"**Planting Season:** {', '.join(crop_info['planting_season'])}\n"
-        advice += f"**Harvest Time:** {crop_info['harvest_time']}\n\n"
+        parts.append(templates.SEASON_AND_HARVEST.render(
+            seasons=', '.join(crop_info['planting_season']), harvest_time=crop_info['harvest_time']
+        ))
+        yield ''.join(parts)
         
         # Season-specific advice
+        parts = []
         if season:
-            advice += f"**{season.title()} Season Specific Tips:**\n"
-            if season.lower() == 'kharif':
-                advice += f"• Plant after monsoon onset\n"
-                advice += f"• Ensure good drainage during heavy rains\n"
-            elif season.lower() == 'rabi':
-                advice += f"• Plant in winter months\n"
-                advice += f"• Protect from frost damage\n"
-            advice += f"\n"
+            parts.append(templates.SEASON_TIPS_HEADING.render(season=title_case(season)))
+            parts.append(templates.SEASON_TIPS.get(season.lower(), ''))
+            parts.append("\n")
         
         # Field preparation
-        advice += f"**Field Preparation Steps:**\n"
-        advice += f"• Deep plowing (20-25 cm) during summer\n"
-        advice += f"• Add farmyard manure (10-15 tons/hectare)\n"
-        advice += f"• Level the field using land leveler\n"
-        advice += f"• Prepare seedbed with fine tilth\n"
-        advice += f"• Ensure proper drainage channels\n\n"
-        
-        return advice
+        parts.append(templates.FIELD_PREPARATION)
+        yield ''.join(parts)
     
     def _get_fertilizer_advice(self, crop_info, crop):
         """Generate fertilizer advice for specific crop"""
-        advice_types = [
-            f"🌿 **{crop.title()} Fertilizer Management**\n\n",
-            f"🧪 **Nutrient Management for {crop.title()}**\n\n",
-            f"💚 **Complete {crop.title()} Nutrition Guide**\n\n",
-            f"🔬 **Scientific {crop.title()} Fertilization Plan**\n\n"
+        parts = [
+            choose_variant(templates.FERTILIZER_GREETINGS, crop, datetime.now().date()).render(crop=title_case(crop)),
+            templates.UPDATED_AS_OF.render(month=datetime.now().strftime('%B %Y'))
         ]
         
-        advice = random.choice(advice_types)
-        advice += f"*Updated recommendations as of {datetime.now().strftime('%B %Y')}*\n\n"
-        
         fertilizer = crop_info['fertilizer_schedule']
-        advice += f"**Recommended Fertilizer Schedule:**\n"
-        
-        if 'nitrogen' in fertilizer:
-            advice += f"• **Nitrogen (N):** {fertilizer['nitrogen']}\n"
-        if 'phosphorus' in fertilizer:
-            advice += f"• **Phosphorus (P):** {fertilizer['phosphorus']}\n"
-        if 'potassium' in fertilizer:
-            advice += f"• **Potassium (K):** {fertilizer['potassium']}\n\n"
+        for nutrient, line in templates.NUTRIENT_LINES:
+            if nutrient in fertilizer:
+                parts.append(line.render(dose=fertilizer[nutrient]))
         
-        # Enhanced application tips
-        advice += f"**Application Guidelines:**\n"
-        advice += f"• Apply basal dose 2-3 days before sowing\n"
-        advice += f"• Split nitrogen application for better efficiency\n"
-        advice += f"• Apply phosphorus as single basal dose\n"
-        advice += f"• Monitor plant response and adjust accordingly\n"
-        advice += f"• Conduct soil test before application\n\n"
-        
-        # Organic alternatives
-        advice += f"**Organic Alternatives:**\n"
-        advice += f"• Compost: 5-10 tons/hectare\n"
-        advice += f"• Vermicompost: 2-3 tons/hectare\n"
-        advice += f"• Biofertilizers: As per manufacturer's recommendation\n"
-        advice += f"• Green manure: Incorporate before flowering\n\n"
-        
-        return advice
+        # Application tips and organic alternatives
+        parts.append(templates.FERTILIZER_GUIDELINES)
+        return ''.join(parts)
     
     def _get_irrigation_advice(self, crop_info, crop):
         """Generate irrigation advice for specific crop"""
-        advice = f"💧 **{crop.title()} Water Management**\n\n"
-        
-        water_mgmt = crop_info['water_management']
-        advice += f"**Irrigation Schedule:**\n"
-        
-        for stage, requirement in water_mgmt.items():
-            advice += f"• **{stage.replace('_', ' ').title()}:** {requirement}\n"
-        
-        advice += f"\n**General Water Management:**\n"
-        advice += f"• Monitor soil moisture regularly\n"
-        advice += f"• Avoid over-irrigation to prevent diseases\n"
-        advice += f"• Use mulching to conserve moisture\n"
-        advice += f"• Consider drip irrigation for water efficiency\n\n"
-        
-        return advice
+        parts = [templates.IRRIGATION_TITLE.render(crop=title_case(crop))]
+        self._append_stage_bullets(parts, crop_info['water_management'])
+        parts.append(templates.WATER_MANAGEMENT_TIPS)
+        return ''.join(parts)
+    
+    def _append_stage_bullets(self, parts, stages):
+        """One bullet per growth stage, e.g. '• **Tillering:** ...'"""
+        for stage, text in stages.items():
+            parts.append(templates.BOLD_BULLET.render(label=display_name(stage), text=text))
     
     def _get_pest_advice(self, crop_info, crop):
         """Generate pest management advice"""
-        advice = f"🐛 **{crop.title()} Pest & Disease Management**\n\n"
-        
-        advice += f"**Common Diseases:** {', '.join(crop_info['common_diseases'])}\n"
-        advice += f"**Common Pests:** {', '.join(crop_info['common_pests'])}\n\n"
-        
-        advice += f"**Integrated Pest Management:**\n"
-        advice += f"• Regular field monitoring\n"
-        advice += f"• Use resistant varieties when available\n"
-        advice += f"• Practice crop rotation\n"
-        advice += f"• Biological control methods\n"
-        advice += f"• Targeted chemical control when necessary\n\n"
-        
-        return advice
+        return templates.PEST_ADVICE.render(
+            crop=title_case(crop),
+            diseases=', '.join(crop_info['common_diseases']),
+            pests=', '.join(crop_info['common_pests'])
+        )
     
     def _get_harvest_advice(self, crop_info, crop):
         """Generate harvest advice"""
-        advice = f"🌾 **{crop.title()} Harvesting Guide**\n\n"
-        
-        advice += f"**Harvest Time:** {crop_info['harvest_time']}\n"
-        advice += f"**Expected Yield:** {crop_info['yield_potential']['average']}-{crop_info['yield_potential']['high']} {crop_info['yield_potential']['unit']}\n\n"
-        
-        advice += f"**Harvesting Tips:**\n"
-        advice += f"• Harvest at proper maturity\n"
-        advice += f"• Choose appropriate weather conditions\n"
-        advice += f"• Use proper harvesting equipment\n"
-        advice += f"• Handle produce carefully to avoid damage\n"
-        advice += f"• Plan for immediate processing/storage\n\n"
-        
-        return advice
+        yield_potential = crop_info['yield_potential']
+        return templates.HARVEST_ADVICE.render(
+            crop=title_case(crop), harvest_time=crop_info['harvest_time'],
+            average=yield_potential['average'], high=yield_potential['high'], unit=yield_potential['unit']
+        )
     
     def _get_soil_advice(self, query):
         """Generate soil management advice"""
-        advice = f"🌱 **Soil Management Guide**\n\n"
-        
-        advice += f"**Soil Testing Importance:**\n"
-        advice += f"• Test soil pH and nutrient levels\n"
-        advice += f"• Adjust pH using lime or sulfur\n"
-        advice += f"• Add organic matter regularly\n"
-        advice += f"• Monitor salinity levels\n\n"
-        
-        advice += f"**Soil Health Improvement:**\n"
-        advice += f"• Use cover crops\n"
-        advice += f"• Practice crop rotation\n"
-        advice += f"• Minimize tillage\n"
-        advice += f"• Add compost and organic matter\n\n"
-        
-        return advice
+        return templates.SOIL_ADVICE
     
     def _get_market_advice(self):
         """Generate market and economic advice"""
-        advice = f"📈 **Market Intelligence & Economics**\n\n"
-        
-        advice += f"**Price Factors:**\n"
-        advice += f"• Supply and demand dynamics\n"
-        advice += f"• Weather conditions\n"
-        advice += f"• Government policies\n"
-        advice += f"• Global market trends\n\n"
-        
-        advice += f"**Value Addition Strategies:**\n"
-        advice += f"• Direct marketing to consumers\n"
-        advice += f"• Processing and packaging\n"
-        advice += f"• Contract farming\n"
-        advice += f"• Organic certification\n\n"
-        
-        return advice
+        return templates.MARKET_ADVICE
     
     def _get_seasonal_advice(self, season):
         """Generate seasonal farming advice"""
-        advice = f"📅 **Seasonal Farming Calendar**\n\n"
+        parts = [templates.SEASONAL_TITLE]
         
         # Fix: Use the correct attribute name
         season_key = f"{season.lower()}_season" if season else None
         if season_key and season_key in self.seasonal_calendar:
             season_info = self.seasonal_calendar[season_key]
-            advice += f"**{season.title()} Season ({season_info['period']})**\n\n"
-            
-            advice += f"**Monthly Activities:**\n"
+            parts.append(templates.SEASON_CALENDAR.render(season=title_case(season), period=season_info['period']))
             for month, activity in season_info['activities'].items():
-                advice += f"• **{month.title()}:** {activity}\n"
-            
-            advice += f"\n**Major Crops:** {', '.join(season_info['major_crops'])}\n\n"
+                parts.append(templates.BOLD_BULLET.render(label=title_case(month), text=activity))
+            parts.append(templates.SEASON_MAJOR_CROPS.render(crops=', '.join(season_info['major_crops'])))
         else:
-            advice += f"**General Seasonal Guidelines:**\n"
-            advice += f"• Plan activities according to monsoon\n"
-            advice += f"• Select appropriate crops for season\n"
-            advice += f"• Prepare for weather challenges\n"
-            advice += f"• Monitor market prices\n\n"
+            parts.append(templates.SEASONAL_GUIDELINES)
         
-        return advice
+        return ''.join(parts)
     
     def _get_general_advice(self):
         """Generate general farming advice"""
-        advice = f"🌾 **General Farming Best Practices**\n\n"
-        
-        advice += f"**Sustainable Farming:**\n"
-        advice += f"• Practice crop rotation\n"
-        advice += f"• Use integrated pest management\n"
-        advice += f"• Conserve water resources\n"
-        advice += f"• Maintain soil health\n\n"
-        
-        advice += f"**Technology Adoption:**\n"
-        advice += f"• Use weather forecasting\n"
-        advice += f"• Adopt precision agriculture\n"
-        advice += f"• Leverage mobile apps\n"
-        advice += f"• Access market information\n\n"
-        
-        return advice
+        return templates.GENERAL_ADVICE
     
     def _get_timing_advice(self, crop_info, crop, season):
         """Generate timing-specific advice for crop"""
-        advice = f"⏰ **{crop.title()} Timing Guide**\n\n"
-        
-        advice += f"**Planting Season:** {', '.join(crop_info['planting_season'])}\n"
-        advice += f"**Harvest Time:** {crop_info['harvest_time']}\n\n"
-        
-        advice += f"**Critical Timing Points:**\n"
+        parts = [
+            templates.TIMING_TITLE.render(crop=title_case(crop)),
+            templates.SEASON_AND_HARVEST.render(
+                seasons=', '.join(crop_info['planting_season']), harvest_time=crop_info['harvest_time']
+            ),
+            templates.CRITICAL_TIMING_HEADING
+        ]
         if 'water_management' in crop_info:
-            for stage, timing in crop_info['water_management'].items():
-                advice += f"• **{stage.replace('_', ' ').title()}:** {timing}\n"
-        
-        advice += f"\n**Growth Duration:** Typically 90-120 days depending on variety\n"
-        advice += f"**Best Planting Window:** Early in the season for optimal yield\n\n"
+            self._append_stage_bullets(parts, crop_info['water_management'])
         
-        return advice
+        parts.append(templates.TIMING_TIPS)
+        return ''.join(parts)
     
     def _get_general_crop_advice(self, crop_info, crop):
         """Generate general advice for specific crop"""
-        advice = f"🌾 **{crop.title()} Cultivation Overview**\n\n"
-        
-        advice += f"**Scientific Name:** {crop_info['scientific_name']}\n"
-        advice += f"**Growth Stages:** {', '.join(crop_info['growth_stages'])}\n\n"
-        
         conditions = crop_info['optimal_conditions']
-        advice += f"**Optimal Growing Conditions:**\n"
-        advice += f"• Temperature: {conditions['temperature']['optimal']}°C\n"
-        advice += f"• Soil pH: {conditions['soil_ph']['optimal']}\n"
-        advice += f"• Rainfall: {conditions['rainfall']['growing_season']}mm\n\n"
-        
-        advice += f"**Expected Yield:** {crop_info['yield_potential']['average']}-{crop_info['yield_potential']['high']} {crop_info['yield_potential']['unit']}\n\n"
-        
-        return advice
+        yield_potential = crop_info['yield_potential']
+        return templates.CROP_OVERVIEW.render(
+            crop=title_case(crop), scientific_name=crop_info['scientific_name'],
+            growth_stages=', '.join(crop_info['growth_stages']),
+            temperature=conditions['temperature']['optimal'], ph=conditions['soil_ph']['optimal'],
+            rainfall=conditions['rainfall']['growing_season'],
+            average=yield_potential['average'], high=yield_potential['high'], unit=yield_potential['unit']
+        )
     
     def _get_weather_general_advice(self):
         """Generate general weather-related farming advice"""
-        advice = f"🌤️ **Weather-Smart Farming**\n\n"
-        
-        advice += f"**Weather Monitoring:**\n"
-        advice += f"• Check daily weather forecasts\n"
-        advice += f"• Monitor rainfall patterns\n"
-        advice += f"• Track temperature extremes\n"
-        advice += f"• Watch for storm warnings\n\n"
-        
-        advice += f"**Weather-Based Actions:**\n"
-        advice += f"• **Hot Weather:** Increase irrigation frequency\n"
-        advice += f"• **Cold Weather:** Protect sensitive crops\n"
-        advice += f"• **Rainy Season:** Ensure proper drainage\n"
-        advice += f"• **Dry Spell:** Implement water conservation\n\n"
-        
-        return advice
+        return templates.WEATHER_GENERAL_ADVICE
     
     def _get_sustainable_advice(self):
         """Generate sustainable farming advice"""
-        advice = f"🌱 **Sustainable Farming Practices**\n\n"
-        
-        advice += f"**Organic Methods:**\n"
-        advice += f"• Use compost and organic fertilizers\n"
-        advice += f"• Practice crop rotation\n"
-        advice += f"• Encourage beneficial insects\n"
-        advice += f"• Avoid synthetic pesticides\n\n"
-        
-        advice += f"**Soil Conservation:**\n"
-        advice += f"• Minimize tillage\n"
-        advice += f"• Use cover crops\n"
-        advice += f"• Implement contour farming\n"
-        advice += f"• Maintain soil organic matter\n\n"
-        
-        advice += f"**Water Conservation:**\n"
-        advice += f"• Use drip irrigation\n"
-        advice += f"• Practice mulching\n"
-        advice += f"• Harvest rainwater\n"
-        advice += f"• Choose drought-resistant varieties\n\n"
-        
-        return advice
+        return templates.SUSTAINABLE_ADVICE
     
     def _get_technology_advice(self):
         """Generate technology-related farming advice"""
-        advice = f"🚀 **Modern Agricultural Technology**\n\n"
-        
-        advice += f"**Precision Agriculture:**\n"
-        advice += f"• Use GPS-guided machinery\n"
-        advice += f"• Implement variable rate application\n"
-        advice += f"• Monitor with drones and satellites\n"
-        advice += f"• Use soil sensors for real-time data\n\n"
-        
-        advice += f"**Digital Tools:**\n"
-        advice += f"• Weather forecasting apps\n"
-        advice += f"• Crop management software\n"
-        advice += f"• Market price tracking\n"
-        advice += f"• Pest identification apps\n\n"
-        
-        advice += f"**Automation:**\n"
-        advice += f"• Automated irrigation systems\n"
-        advice += f"• Greenhouse climate control\n"
-        advice += f"• Robotic harvesting\n"
-        advice += f"• Smart farm monitoring\n\n"
-        
-        return advice
+        return templates.TECHNOLOGY_ADVICE
 
 # Initialize Farming Expert AI
 farming_expert = FarmingExpertAI()
+KNOWLEDGE_WATCH_INTERVAL = float(os.getenv('KNOWLEDGE_WATCH_INTERVAL', '5'))
+knowledge_watcher = farming_expert.watch_knowledge(KNOWLEDGE_WATCH_INTERVAL)
+
+def stop_background_threads():
+    """Stop threads and inference workers that would not survive a fork (called in a pre-fork server's master)"""
+    global knowledge_watcher
+    if knowledge_watcher is not None:
+        knowledge_watcher.stop()
+        knowledge_watcher = None
+    disease_engine.close()
+
+def after_fork():
+    """Per-process setup for a worker forked from a preloaded app"""
+    global knowledge_watcher
+    knowledge_watcher = farming_expert.watch_knowledge(KNOWLEDGE_WATCH_INTERVAL)
+    farming_expert.weather_service.provider.after_fork()
+    # Metrics start from zero (warm-up traffic is not counted), in this worker's file under METRICS_DIR
+    request_metrics.REGISTRY.use_directory(os.getenv(request_metrics.METRICS_DIR_ENV))
 
 # Plant disease classes
 PLANT_CLASSES = [
@@ -1051,6 +1260,94 @@ PLANT_CLASSES = [
     'target_spot', 'mosaic_virus', 'yellow_leaf_curl_virus'
 ]
 
+# Disease model exported by AgriGuru_Training_Colab.ipynb, loaded on first use. torch and
+# PIL are imported with it, so processes that never see an image never pay for them
+DISEASE_MODEL_PATH = os.getenv(
+    'DISEASE_MODEL_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'agri_efficientnet_model.pth')
+)
+disease_engine = LazyInferenceEngine(
+    DISEASE_MODEL_PATH,
+    labels=PLANT_CLASSES,
+    max_batch=int(os.getenv('INFERENCE_MAX_BATCH', '8')),
+    max_wait_ms=float(os.getenv('INFERENCE_MAX_WAIT_MS', '10')),
+    num_threads=int(os.getenv('INFERENCE_THREADS', '0')),
+    variant=os.getenv('INFERENCE_VARIANT', 'float32'),
+    # Forward passes run in this many separate processes; 0 runs them on the request threads
+    workers=int(os.getenv('INFERENCE_WORKERS', '1')),
+    pool_options={
+        'queue_size': int(os.getenv('INFERENCE_QUEUE_SIZE', '16')),
+        'timeout': float(os.getenv('INFERENCE_TIMEOUT', '30'))
+    }
+)
+# PRELOAD_VISION=1 imports the vision stack and loads the model at startup instead. Under serve.py
+# with a shared pool the pool server loads it; a pool started here would load it a second time
+PRELOAD_VISION = os.getenv('PRELOAD_VISION', '0') == '1'
+if PRELOAD_VISION and not (disease_engine.workers and os.getenv(SHARED_POOL_ENV) == '1'):
+    disease_engine.preload()
+
+def _pool_stat(field):
+    """A field of the disease engine's pool stats; None while the model runs in-process or no pool has started"""
+    pool = disease_engine.stats().get('pool')
+    return pool[field] if pool else None
+
+# Pool size and backlog on /metrics, read at scrape time
+for gauge, field in ((request_metrics.INFERENCE_POOL_WORKERS, 'workers'),
+                     (request_metrics.INFERENCE_POOL_WORKERS_ALIVE, 'workers_alive'),
+                     (request_metrics.INFERENCE_QUEUE_DEPTH, 'queue_depth'),
+                     (request_metrics.INFERENCE_QUEUE_CAPACITY, 'queue_capacity'),
+                     (request_metrics.INFERENCE_IN_FLIGHT, 'in_flight')):
+    gauge.set_function(lambda field=field: _pool_stat(field))
+
+# Predictions for repeated photos, keyed by exact bytes and by perceptual hash;
+# IMAGE_CACHE_MB=0 turns it off
+image_cache = ImageResultCache(
+    max_bytes=int(float(os.getenv('IMAGE_CACHE_MB', '32')) * 1024 * 1024),
+    max_distance=int(os.getenv('IMAGE_CACHE_MAX_DISTANCE', '4')),
+    method=os.getenv('IMAGE_CACHE_HASH', 'phash')
+)
+
+# Uploads are checked against these before any pixel is decoded
+MAX_UPLOAD_BYTES = int(float(os.getenv('MAX_UPLOAD_MB', '16')) * 1024 * 1024)
+MAX_IMAGE_PIXELS = int(float(os.getenv('MAX_IMAGE_MEGAPIXELS', '50')) * 1_000_000)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 64 * 1024   # room for the other form fields
+
+# Largest /api/expert-advice/batch request; bulk jobs send several batches
+MAX_BATCH_ITEMS = int(os.getenv('ADVICE_BATCH_MAX_ITEMS', '1000'))
+
+@app.before_request
+def label_route():
+    """URL rule (not path) the request matched, for the HTTP metrics' route label"""
+    if request.url_rule is not None:
+        request.environ[request_metrics.ROUTE_ENVIRON_KEY] = request.url_rule.rule
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f"Upload larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}), 413
+
+def sse_event(event, data):
+    """One Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def event_stream(events):
+    """Stream SSE frames as they are produced; a failure mid-stream ends with an error event"""
+    def guarded():
+        try:
+            yield from events
+        except Exception as e:
+            ERRORS.labels('stream', type(e).__name__).inc()
+            yield sse_event('error', {'error': str(e), 'success': False})
+    
+    # Ask reverse proxies not to buffer, or the early sections lose their head start
+    return Response(guarded(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stream_params():
+    """Streaming endpoints take a JSON body (fetch) or query parameters (EventSource)"""
+    if request.method == 'POST':
+        return request.get_json(silent=True) or {}
+    return request.args
+
 @app.route('/')
 def home():
     return jsonify({
@@ -1058,11 +1355,19 @@ def home():
         'status': 'active',
         'endpoints': [
             '/api/expert-advice',
+            '/api/expert-advice/batch',
+            '/api/expert-advice/stream',
             '/api/analyze-crop',
             '/api/weather-advice',
+            '/api/weather-advice/stream',
             '/api/market-insights',
             '/api/seasonal-calendar',
-            '/api/soil-recommendations'
+            '/api/soil-recommendations',
+            '/api/crop-suitability',
+            '/api/cache-stats',
+            '/api/admin/reload-knowledge',
+            '/api/model-status',
+            '/metrics'
         ],
         'features': [
             'Real-time weather data for any location',
@@ -1086,17 +1391,28 @@ def get_expert_advice():
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        # Get expert advice
-        advice = farming_expert.get_expert_advice(query, crop, location, season)
+        # Route the query once and render the winning intent
+        route = farming_expert.route_query(query, crop, location)
+        advice = farming_expert.get_expert_advice(query, crop, location, season, route=route)
         
         # Add contextual information
         context = {
             'timestamp': datetime.now().isoformat(),
             'query_type': 'expert_advice',
+            'intent': route.intent,
             'crop': crop,
             'location': location,
             'season': season
         }
+        # Fields the query implied but the request left out ('my paddy ...' -> crop 'rice')
+        if route.inferred:
+            context['inferred'] = route.inferred
+        
+        # Scored intents help explain why a query landed where it did
+        if data.get('debug'):
+            context['intent_scores'] = route.scores
+            context['matched_keywords'] = route.keywords
+            context['retrieval'] = route.retrieval
         
         return jsonify({
             'advice': advice,
@@ -1107,28 +1423,157 @@ def get_expert_advice():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/expert-advice/batch', methods=['POST'])
+def get_expert_advice_batch():
+    """Expert advice for many queries in one request"""
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Send {"items": [{"query": ..., "crop": ..., "location": ..., "season": ...}]}'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f"At most {MAX_BATCH_ITEMS} items per batch"}), 413
+        
+        # Failed items carry their own error; the rest of the batch still succeeds
+        results, stats = farming_expert.get_batch_advice(items)
+        return jsonify({
+            'results': results,
+            'batch': stats,
+            'timestamp': datetime.now().isoformat(),
+            'success': True
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/expert-advice/stream', methods=['GET', 'POST'])
+def stream_expert_advice():
+    """Expert advice as Server-Sent Events: context, then one section event per advice section, then done"""
+    data = stream_params()
+    query = data.get('query', '')
+    crop = data.get('crop') or None
+    location = data.get('location') or None
+    season = data.get('season') or None
+    
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    def events():
+        route = farming_expert.route_query(query, crop, location)
+        yield sse_event('context', {
+            'timestamp': datetime.now().isoformat(),
+            'query_type': 'expert_advice',
+            'intent': route.intent,
+            'crop': crop,
+            'location': location,
+            'season': season,
+            'inferred': route.inferred
+        })
+        for section in farming_expert.iter_expert_advice(query, crop, location, season, route=route):
+            yield sse_event('section', {'text': section})
+        yield sse_event('done', {'success': True})
+    
+    return event_stream(events())
+
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Advice and image cache hit/miss/eviction counters"""
+    return jsonify({
+        'advice_cache': farming_expert.advice_cache.stats(),
+        'image_cache': image_cache.stats(),
+        'weather_ttl': farming_expert.weather_ttl,
+        'weather': farming_expert.weather_service.stats(),
+        'knowledge_version': farming_expert.knowledge_version,
+        'success': True
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, advice, weather and inference metrics in the Prometheus text format, summed over workers"""
+    return Response(request_metrics.REGISTRY.exposition(), content_type=request_metrics.CONTENT_TYPE)
+
+@app.route('/api/admin/reload-knowledge', methods=['POST'])
+def reload_knowledge():
+    """Swap in the current knowledge bundle without restarting"""
+    # Disabled without KNOWLEDGE_ADMIN_TOKEN: behind a reverse proxy every caller looks local
+    token = os.getenv('KNOWLEDGE_ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    try:
+        result = farming_expert.reload_knowledge()
+        result['success'] = True
+        return jsonify(result)
+    
+    except KnowledgeBundleError as e:
+        # The current snapshot keeps serving
+        return jsonify({'error': str(e), 'version': farming_expert.knowledge_version}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def decode_image(data):
+    """Uploaded bytes to a model-ready image, timed"""
+    with INFERENCE.labels('decode').time():
+        return disease_engine.decode(data, MAX_IMAGE_PIXELS)
+
+def predict_image(image):
+    """Disease prediction, timed; failures are counted by exception type before they propagate"""
+    try:
+        with INFERENCE.labels('predict').time():
+            return disease_engine.predict(image)
+    except Exception as e:
+        ERRORS.labels('inference', type(e).__name__).inc()
+        raise
+
+def classify_upload(data):
+    """(prediction, image cache outcome) for uploaded image bytes"""
+    result, outcome = _classify_upload(data)
+    IMAGE_CACHE.labels(outcome).inc()
+    return result, outcome
+
+def _classify_upload(data):
+    if not image_cache.enabled:
+        return predict_image(decode_image(data)), 'off'
+    
+    # Byte-identical repeats are answered before decoding, near repeats before inference
+    digest = content_digest(data)
+    result = image_cache.get(digest)
+    if result is not None:
+        return result, 'exact'
+    image = decode_image(data)
+    image_hash = image_cache.image_hash(image)
+    result, _ = image_cache.get_similar(digest, image_hash)
+    if result is not None:
+        return result, 'similar'
+    
+    # Batched with any other uploads arriving at the same time, in an inference worker process
+    result = predict_image(image)
+    image_cache.set(digest, image_hash, result)
+    return result, 'miss'
+
 @app.route('/api/analyze-crop', methods=['POST'])
 def analyze_crop():
     """Analyze crop image for diseases"""
+    # The first image request imports the vision stack
+    from image_preprocessing import ImageRejectedError, read_upload
+    from inference_pool import InferenceBusyError
+    
     try:
         if 'image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
         
         image_file = request.files['image']
         
-        # Process image
-        image = Image.open(image_file.stream).convert('RGB')
+        # Size, format and pixel count are checked before decoding, at reduced JPEG scale
+        data = read_upload(image_file.stream, MAX_UPLOAD_BYTES)
         
-        # Mock disease analysis (replace with actual model)
-        disease_result = {
-            'disease': 'healthy',
-            'confidence': 0.85,
-            'message': 'Mock analysis - replace with actual model'
-        }
+        disease_result, cache_status = classify_upload(data)
         
         # Get expert advice based on disease detection
         crop_type = request.form.get('crop_type', 'general')
-        if disease_result['disease'] != 'healthy':
+        if not disease_result['disease'].startswith('healthy'):
             expert_advice = farming_expert.get_expert_advice(
                 f"How to treat {disease_result['disease']} in {crop_type}?",
                 crop=crop_type
@@ -1143,12 +1588,31 @@ def analyze_crop():
             'disease_analysis': disease_result,
             'expert_advice': expert_advice,
             'crop_type': crop_type,
+            'image_cache': cache_status,
             'success': True
         })
     
+    except RequestEntityTooLarge as e:
+        return request_too_large(e)
+    except ImageRejectedError as e:
+        return jsonify({'error': str(e)}), e.status
+    except InferenceBusyError as e:
+        # Queue full (429) or workers unavailable (503); either way the client should back off
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), e.status, {'Retry-After': str(e.retry_after)}
+    except ModelUnavailableError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/model-status', methods=['GET'])
+def get_model_status():
+    """Disease model load state and batching counters"""
+    return jsonify({
+        'available': disease_engine.available,
+        'inference': disease_engine.stats(),
+        'success': True
+    })
+
 @app.route('/api/weather-advice', methods=['POST'])
 def get_weather_advice():
     """Get weather-based farming advice"""
@@ -1157,12 +1621,13 @@ def get_weather_advice():
         location = data.get('location', 'Delhi')
         crop = data.get('crop', None)
         
-        # Get real weather data and location-specific advice
-        weather_data = farming_expert.get_weather_data(location)
-        soil_data = farming_expert.get_location_soil_recommendations(location)
+        # One lookup per request: the payload and the advice share a snapshot
+        ctx = AdviceContext(farming_expert)
+        weather_data = ctx.weather(location)
+        soil_data = ctx.soil(location)
         
         # Generate comprehensive weather-based advice
-        advice = farming_expert._get_weather_advice_for_location(location, crop, 'weather advice')
+        advice = farming_expert._get_weather_advice_for_location(location, crop, 'weather advice', ctx)
         
         return jsonify({
             'weather_data': weather_data,
@@ -1175,6 +1640,24 @@ def get_weather_advice():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/weather-advice/stream', methods=['GET', 'POST'])
+def stream_weather_advice():
+    """Weather advice as Server-Sent Events; soil data goes out before the weather lookup finishes"""
+    data = stream_params()
+    location = data.get('location') or 'Delhi'
+    crop = data.get('crop') or None
+    
+    def events():
+        yield sse_event('context', {'timestamp': datetime.now().isoformat(), 'location': location, 'crop': crop})
+        ctx = AdviceContext(farming_expert)
+        yield sse_event('soil_data', ctx.soil(location))
+        yield sse_event('weather_data', ctx.weather(location))
+        for section in farming_expert._weather_advice_sections(location, crop, 'weather advice', ctx):
+            yield sse_event('section', {'text': fill_location(section, location)})
+        yield sse_event('done', {'success': True})
+    
+    return event_stream(events())
+
 @app.route('/api/market-insights', methods=['GET'])
 def get_market_insights():
     """Get market insights and price trends"""
@@ -1242,8 +1725,9 @@ def get_soil_recommendations():
         location = request.args.get('location', 'india')
         
         # Get soil recommendations
-        soil_data = farming_expert.get_location_soil_recommendations(location)
-        advice = farming_expert._get_location_soil_advice(location, 'soil recommendations')
+        ctx = AdviceContext(farming_expert)
+        soil_data = ctx.soil(location)
+        advice = farming_expert._get_location_soil_advice(location, 'soil recommendations', ctx)
         
         return jsonify({
             'soil_data': soil_data,
@@ -1255,8 +1739,34 @@ def get_soil_recommendations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/crop-suitability', methods=['GET'])
+def get_crop_suitability():
+    """Crops ranked by how well they suit a location's weather and soil"""
+    try:
+        location = request.args.get('location')
+        if not location:
+            return jsonify({'error': 'Location is required'}), 400
+        basis = request.args.get('basis', 'weather')
+        if basis not in ('weather', 'climate'):
+            return jsonify({'error': "basis must be 'weather' or 'climate'"}), 400
+        top = request.args.get('top', type=int)
+        if top is not None and top < 1:
+            # A negative top would slice crops off the end of the ranking instead
+            return jsonify({'error': 'top must be a positive integer'}), 400
+        soil_ph = request.args.get('soil_ph', type=float)
+        
+        result = farming_expert.get_crop_suitability(location, use_weather=basis == 'weather', soil_ph=soil_ph, top=top)
+        if result['ranking'] is None:
+            return jsonify({'error': f"Unknown location: {location}"}), 404
+        
+        return jsonify(dict(result, location=location, success=True))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     print("🌾 Starting AgriGuru Farming Expert API...")
     print("✅ Farming Expert AI initialized successfully!")
     print("🚀 Server running on http://localhost:5000")
+    print("💡 Development server; use python serve.py in production")
     app.run(debug=True, host='0.0.0.0', port=5000)
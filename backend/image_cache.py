@@ -0,0 +1,200 @@
+# Content-addressed result cache for crop disease images
+"""
+The same leaf photo often arrives more than once: retried uploads on a
+flaky connection, or the same shot re-sent after being recompressed,
+resized or trimmed by a messaging app. Each would otherwise pay a decode and
+a forward pass for a prediction that is already known.
+
+ImageResultCache keys predictions two ways. The SHA-256 of the uploaded
+bytes catches exact repeats before anything is decoded. A 64-bit perceptual
+hash of the decoded image (pHash: the low frequencies of a 32x32 grayscale
+DCT, or the cheaper dHash: brightness gradients of a 9x8 thumbnail) catches
+near repeats within max_distance differing bits. Near lookups use a
+multi-index: the hash is split into max_distance + 1 bands, and any two
+hashes within max_distance bits agree exactly on at least one band, so only
+entries sharing a band are compared. Entries are bounded by an estimate of
+their memory and evicted least recently used first.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+
+HASH_BITS = 64
+# Rough per-entry cost of the index structures, on top of the stored value
+ENTRY_OVERHEAD = 512
+ALIAS_OVERHEAD = 160
+
+
+def content_digest(data):
+    """Exact key: SHA-256 of the uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image):
+    """64-bit difference hash: is each pixel of a 9x8 grayscale thumbnail brighter than its right neighbour"""
+    from PIL import Image
+
+    pixels = list(image.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    rows = [pixels[row * 9:(row + 1) * 9] for row in range(8)]
+    return _bits_to_int(left > right for row in rows for left, right in zip(row, row[1:]))
+
+
+_dct_matrix = None
+
+
+def phash(image):
+    """64-bit perceptual hash: 8x8 lowest DCT frequencies of a 32x32 grayscale thumbnail vs their median"""
+    global _dct_matrix
+    import numpy as np
+    from PIL import Image
+
+    if _dct_matrix is None:
+        n = np.arange(32)
+        _dct_matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / 64)
+    pixels = np.asarray(image.convert('L').resize((32, 32), Image.BILINEAR), dtype=np.float64)
+    low = (_dct_matrix @ pixels @ _dct_matrix.T)[:8, :8].ravel()
+    # The DC term is overall brightness, which would dominate the median
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+HASHERS = {'phash': phash, 'dhash': dhash}
+
+
+class ImageResultCache:
+    """Thread-safe LRU of predictions keyed by exact content digest and perceptual hash"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_distance=4, method='phash'):
+        if method not in HASHERS:
+            raise ValueError(f"Unknown image hash {method!r}; expected one of {', '.join(HASHERS)}")
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.method = method
+        self._hasher = HASHERS[method]
+        # Split the hash into bands so a near lookup only compares entries sharing one
+        band_count = min(max_distance + 1, HASH_BITS)
+        edges = [HASH_BITS * i // band_count for i in range(band_count + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+        self._band_index = [defaultdict(set) for _ in self._bands]
+        self._entries = OrderedDict()  # digest -> [image hash, value, nbytes, alias digests]
+        self._aliases = {}             # digest of a near repeat -> digest of the stored entry
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def image_hash(self, image):
+        """Perceptual hash of a decoded PIL image"""
+        return self._hasher(image)
+
+    def _band_keys(self, image_hash):
+        return [(image_hash >> start) & mask for start, mask in self._bands]
+
+    def get(self, digest):
+        """Cached value for byte-identical content, or None (misses are counted by get_similar)"""
+        with self._lock:
+            key = self._aliases.get(digest, digest)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[1]
+
+    def get_similar(self, digest, image_hash):
+        """(value, distance) of the closest entry within max_distance bits, or (None, None)"""
+        with self._lock:
+            candidates = set()
+            for index, band_key in zip(self._band_index, self._band_keys(image_hash)):
+                candidates.update(index.get(band_key, ()))
+            best, best_distance = None, None
+            for key in candidates:
+                distance = (self._entries[key][0] ^ image_hash).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best_distance):
+                    best, best_distance = key, distance
+            if best is None:
+                self.misses += 1
+                return None, None
+
+            entry = self._entries[best]
+            self._entries.move_to_end(best)
+            self.similar_hits += 1
+            # The next upload of these exact bytes skips the decode too
+            if digest not in self._aliases and digest not in self._entries:
+                self._aliases[digest] = best
+                entry[3].append(digest)
+                entry[2] += ALIAS_OVERHEAD
+                self.bytes += ALIAS_OVERHEAD
+                self._evict()
+            return entry[1], best_distance
+
+    def set(self, digest, image_hash, value):
+        """Store a JSON-serializable value, evicting least recently used entries beyond max_bytes"""
+        nbytes = len(json.dumps(value)) + ENTRY_OVERHEAD
+        if not self.enabled or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if digest in self._entries or digest in self._aliases:
+                return
+            self._entries[digest] = [image_hash, value, nbytes, []]
+            for index, band_key in zip(self._band_index, self._band_keys(image_hash)):
+                index[band_key].add(digest)
+            self.bytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._entries:
+            digest, (image_hash, _, nbytes, aliases) = self._entries.popitem(last=False)
+            self._unindex(digest, image_hash, aliases)
+            self.bytes -= nbytes
+            self.evictions += 1
+
+    def _unindex(self, digest, image_hash, aliases):
+        for index, band_key in zip(self._band_index, self._band_keys(image_hash)):
+            bucket = index[band_key]
+            bucket.discard(digest)
+            if not bucket:
+                del index[band_key]
+        for alias in aliases:
+            del self._aliases[alias]
+
+    def clear(self):
+        """Drop all entries (counters are kept), e.g. after the model changes"""
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            for index in self._band_index:
+                index.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters for sizing the cache and the distance threshold"""
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'aliases': len(self._aliases),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hash': self.method,
+                'max_distance': self.max_distance,
+                'exact_hits': self.exact_hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+                'exact_hit_rate': round(self.exact_hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,94 @@
+# Image preprocessing for crop disease inference
+"""
+Phone uploads are 12+ megapixels; the model looks at 224x224. Decoding the
+full image and then resizing, scaling and normalizing in separate passes
+costs far more than the forward pass needs.
+
+decode_upload checks the byte size, format and pixel count from the header
+before any pixel is decoded, then asks the JPEG decoder for a reduced-scale
+image (1/2, 1/4 or 1/8) that is still at least twice the model input.
+resize_for_model squashes that to the model size as uint8, and Normalizer
+turns uint8 pixels into normalized floats with one table lookup per channel,
+writing straight into a preallocated batch tensor.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'BMP')
+
+
+class ImageRejectedError(ValueError):
+    """Raised for uploads that are too large, not an image, or corrupt"""
+
+    def __init__(self, message, status=400):
+        super(ImageRejectedError, self).__init__(message)
+        self.status = status
+
+
+def read_upload(stream, max_bytes):
+    """Read at most max_bytes from a file-like upload, rejecting anything bigger"""
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ImageRejectedError(f"Image larger than {max_bytes // (1024 * 1024)} MB", status=413)
+    if not data:
+        raise ImageRejectedError("Empty image upload")
+    return data
+
+
+def decode_upload(data, target_size, max_pixels):
+    """Validated RGB image, decoded at the smallest JPEG scale still >= 2x target_size"""
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        raise ImageRejectedError("Upload is not a readable image")
+
+    # Everything below is known from the header alone
+    if image.format not in ALLOWED_FORMATS:
+        raise ImageRejectedError(f"Unsupported image format: {image.format}")
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejectedError(
+            f"Image is {width}x{height}; at most {max_pixels / 1e6:.0f} megapixels are accepted", status=413
+        )
+
+    if image.format == 'JPEG':
+        image.draft('RGB', (2 * target_size, 2 * target_size))
+    try:
+        image.load()
+    except Exception:
+        raise ImageRejectedError("Image data is corrupt or truncated")
+    return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+def resize_for_model(image, size):
+    """(size, size, 3) uint8 array, squashed like the training transform's Resize((size, size))"""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image.resize((size, size), Image.BILINEAR, reducing_gap=2.0))
+
+
+class Normalizer:
+    """Fused ToTensor + Normalize: uint8 HWC pixels -> normalized float32 CHW via per-channel tables"""
+
+    def __init__(self, mean, std):
+        levels = np.arange(256, dtype=np.float32) / 255.0
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+        self.tables = [(levels - mean[c]) / std[c] for c in range(3)]
+
+    def fill(self, pixels, out):
+        """Write normalized (3, H, W) values for one HWC uint8 image into out"""
+        for channel, table in enumerate(self.tables):
+            np.take(table, pixels[:, :, channel], out=out[channel])
+        return out
+
+    def batch(self, images, out=None):
+        """Normalized (N, 3, H, W) array for a list of HWC uint8 images, reusing out when given"""
+        height, width = images[0].shape[:2]
+        if out is None:
+            out = np.empty((len(images), 3, height, width), dtype=np.float32)
+        for index, pixels in enumerate(images):
+            self.fill(pixels, out[index])
+        return out[:len(images)]
@@ -0,0 +1,279 @@
+# Crop Disease Inference Engine
+"""
+Serves predictions from the AgriEfficientNet checkpoint exported by the
+training notebook (agri_efficientnet_model.pth).
+
+The model is loaded once per process on first use. Requests are resized to
+the model input on their own threads and handed to a MicroBatcher, which
+gathers whatever arrives within a short window (up to max_batch images),
+normalizes them into a reused batch buffer and runs them through the network
+as one forward pass under torch.inference_mode().
+
+The float32 checkpoint is the default; a variant exported next to it
+(TorchScript, INT8, ONNX; see model_variants.py) can be served instead.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from image_preprocessing import Normalizer, decode_upload, resize_for_model
+from model_variants import load_variant
+from vision_loader import ModelUnavailableError, artifact_path
+
+DEFAULT_TRANSFORM = {
+    'resize': 224,
+    'mean': [0.485, 0.456, 0.406],
+    'std': [0.229, 0.224, 0.225]
+}
+
+
+class AgriEfficientNet(nn.Module):
+    """EfficientNet backbone with channel attention, as trained in AgriGuru_Training_Colab"""
+
+    def __init__(self, num_classes, model_name='efficientnet-b0', use_attention=True):
+        super(AgriEfficientNet, self).__init__()
+        from efficientnet_pytorch import EfficientNet
+
+        # Weights come from the checkpoint, so no pretrained download
+        self.backbone = EfficientNet.from_name(model_name)
+        num_features = self.backbone._fc.in_features
+        self.backbone._fc = nn.Sequential(
+            nn.Dropout(0.3),
+            nn.Linear(num_features, 256),
+            nn.ReLU(),
+            nn.Dropout(0.2),
+            nn.Linear(256, num_classes)
+        )
+
+        self.use_attention = use_attention
+        if self.use_attention:
+            self.attention = nn.Sequential(
+                nn.AdaptiveAvgPool2d(1),
+                nn.Flatten(),
+                nn.Linear(num_features, num_features // 32),
+                nn.ReLU(),
+                nn.Linear(num_features // 32, num_features),
+                nn.Sigmoid()
+            )
+
+    def forward(self, x):
+        features = self.backbone.extract_features(x)
+        if self.use_attention:
+            features = features * self.attention(features).unsqueeze(-1).unsqueeze(-1)
+        pooled = F.adaptive_avg_pool2d(features, 1).flatten(1)
+        return self.backbone._fc(pooled)
+
+
+class MicroBatcher:
+    """Groups concurrent submissions into batches of up to max_batch items or max_wait_ms"""
+
+    def __init__(self, run_batch, max_batch=8, max_wait_ms=10.0):
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def submit(self, item):
+        """Queue one item; the returned Future resolves to its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        # Threads do not survive fork; each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.run_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch
+        }
+
+
+class InferenceEngine:
+    """Lazily loaded AgriEfficientNet behind a micro-batcher"""
+
+    def __init__(self, model_path, labels=None, max_batch=8, max_wait_ms=10.0, top_k=3, num_threads=0,
+                 variant='float32'):
+        self.model_path = model_path
+        self.variant = variant
+        self.default_labels = list(labels or [])
+        self.top_k = top_k
+        self.num_threads = num_threads
+        self.model = None
+        self.labels = None
+        self.transform = dict(DEFAULT_TRANSFORM)
+        self._load_lock = threading.Lock()
+        self._buffers = threading.local()   # per-thread preallocated batch tensor
+        self.batcher = MicroBatcher(self._run_batch, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+    @property
+    def artifact_path(self):
+        """File that must exist before this engine can load"""
+        return artifact_path(self.model_path, self.variant)
+
+    @property
+    def available(self):
+        return os.path.exists(self.artifact_path)
+
+    def load(self):
+        """Load the checkpoint once; later calls are no-ops"""
+        if self.model is not None:
+            return self
+        with self._load_lock:
+            if self.model is None:
+                self._load()
+        return self
+
+    def _load(self):
+        if not self.available:
+            raise ModelUnavailableError(f"Disease model not found: {self.artifact_path}")
+        try:
+            if self.variant == 'float32':
+                model, metadata, num_classes = self._load_checkpoint()
+            else:
+                model, metadata = load_variant(os.path.dirname(self.model_path), self.variant, self.num_threads)
+                num_classes = len(metadata['labels'])
+        except Exception as e:
+            raise ModelUnavailableError(f"Could not load {self.variant} disease model: {e}")
+
+        # Labels saved with the weights are authoritative; fall back to the app's class list
+        labels = list(metadata.get('labels') or self.default_labels)
+        if len(labels) != num_classes:
+            raise ModelUnavailableError(f"Model predicts {num_classes} classes but {len(labels)} labels are known")
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self.transform.update(metadata.get('transform_config') or {})
+        self.normalizer = Normalizer(self.transform['mean'], self.transform['std'])
+        self.labels = labels
+        self.model = model
+
+    def _load_checkpoint(self):
+        checkpoint = torch.load(self.model_path, map_location='cpu', weights_only=True)
+        state_dict = checkpoint['model_state_dict']
+        config = checkpoint.get('model_config', {})
+        num_classes = state_dict['backbone._fc.4.weight'].shape[0]
+        model = AgriEfficientNet(
+            num_classes,
+            model_name=config.get('model_name', 'efficientnet-b0'),
+            use_attention=any(key.startswith('attention.') for key in state_dict)
+        )
+        model.load_state_dict(state_dict)
+        return model.eval(), checkpoint, num_classes
+
+    @property
+    def input_size(self):
+        return self.load().transform['resize']
+
+    def decode(self, data, max_pixels):
+        """Validated PIL image from uploaded bytes, decoded at reduced scale for the model input"""
+        return decode_upload(data, self.input_size, max_pixels)
+
+    def preprocess(self, image):
+        """PIL image -> (size, size, 3) uint8 pixels; normalization happens in the batch"""
+        return resize_for_model(image, self.input_size)
+
+    def to_batch(self, images):
+        """Normalized (N, 3, size, size) tensor for preprocessed images, in this thread's reused buffer"""
+        size = self.transform['resize']
+        buffer = getattr(self._buffers, 'batch', None)
+        if buffer is None or buffer.shape[0] < len(images):
+            buffer = np.empty((max(len(images), self.batcher.max_batch), 3, size, size), dtype=np.float32)
+            self._buffers.batch = buffer
+        return torch.from_numpy(self.normalizer.batch(images, out=buffer))
+
+    def predict(self, image, timeout=None):
+        """Top-k prediction for one PIL image, batched with concurrent callers"""
+        self.load()
+        return self.batcher.submit(self.preprocess(image)).result(timeout)
+
+    def predict_batch(self, images):
+        """Predictions for a list of PIL images in a single forward pass"""
+        self.load()
+        return self._run_batch([self.preprocess(image) for image in images])
+
+    def predict_pixels(self, images):
+        """Predictions for already preprocessed (size, size, 3) uint8 images in one forward pass"""
+        self.load()
+        return self._run_batch(images)
+
+    def _run_batch(self, images):
+        batch = self.to_batch(images)
+        with torch.inference_mode():
+            probabilities = F.softmax(self.model(batch), dim=1)
+            top_probs, top_indices = torch.topk(probabilities, min(self.top_k, len(self.labels)))
+
+        results = []
+        for probs, indices in zip(top_probs.tolist(), top_indices.tolist()):
+            predictions = [
+                {'condition': self.labels[index], 'confidence': round(prob, 4)}
+                for prob, index in zip(probs, indices)
+            ]
+            results.append({
+                'disease': predictions[0]['condition'],
+                'confidence': predictions[0]['confidence'],
+                'top_predictions': predictions
+            })
+        return results
+
+    def stats(self):
+        return {
+            'model_path': self.model_path,
+            'variant': self.variant,
+            'loaded': self.model is not None,
+            'labels': self.labels,
+            'batching': self.batcher.stats()
+        }
@@ -0,0 +1,589 @@
+# Crop disease inference worker pool
+"""
+A forward pass holds the interpreter for tens of milliseconds per image, so
+running it on a web worker's request threads makes text advice queue behind
+image analysis. InferencePool moves classification into separate worker
+processes, each with its own InferenceEngine; the web process only decodes
+and resizes uploads (PIL releases the GIL while it does).
+
+Pixels travel through shared memory: the web process copies each model-size
+uint8 image into a free slot of a ring of queue_size slots and sends only
+(task id, segment name, slot) through the task queue. A worker gathers
+whatever tasks are waiting (up to max_batch, within max_wait_ms), normalizes
+straight from the slots into its batch buffer, runs one forward pass and
+sends back the small prediction dicts.
+
+The ring bounds the work in flight. When every slot is taken, predict raises
+InferenceBusyError at once (the endpoint answers 429 with Retry-After) rather
+than queueing without limit. A worker that dies is restarted; the images it
+held fail with 503. A task that no worker has picked up within the timeout
+(its worker died between dequeuing and reporting it, or the caller never
+queued it) is failed and its slot freed. Results are matched by task id,
+never by slot, so a late worker cannot answer for a slot's next image.
+
+The pool starts on first use in whichever process uses it. Under serve.py
+the pre-forked web workers share one: start_pool_server runs it in a
+separate server process, and each web worker attaches with a
+SharedPoolClient. The client writes pixels straight into the server's ring
+and only reserves slots and waits for results through the server.
+"""
+import atexit
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory, util
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+from image_preprocessing import decode_upload, resize_for_model
+from vision_loader import ModelUnavailableError, artifact_path
+
+STARTUP_TIMEOUT = 180.0   # seconds for a worker to import torch and load the model
+POLL_INTERVAL = 0.5       # how often the dispatcher checks for dead workers
+
+_serving = None           # the pool, in a process started by start_pool_server
+
+
+class InferenceBusyError(Exception):
+    """Raised when the pool cannot take or finish an image; retry_after is in seconds"""
+
+    def __init__(self, message, status=429, retry_after=1):
+        super(InferenceBusyError, self).__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Raised in the pool server and re-raised in the web worker that called it
+        return type(self), (str(self), self.status, self.retry_after)
+
+
+def _slot_view(segment, slot, size):
+    slot_bytes = size * size * 3
+    return np.ndarray((size, size, 3), dtype=np.uint8, buffer=segment.buf, offset=slot * slot_bytes)
+
+
+def _collect(tasks, max_batch, max_wait):
+    """Block for one task, then take whatever else arrives within max_wait; None means stop"""
+    first = tasks.get()
+    if first is None:
+        return None
+    batch = [first]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch:
+        remaining = deadline - time.monotonic()
+        try:
+            task = tasks.get(timeout=remaining) if remaining > 0 else tasks.get_nowait()
+        except queue.Empty:
+            break
+        if task is None:
+            tasks.put(None)   # leave the stop signal for the next read
+            break
+        batch.append(task)
+    return batch
+
+
+def _worker_main(model_path, options, tasks, results, max_batch, max_wait):
+    """Inference worker process: load the model once, then serve batches until stopped"""
+    from inference_engine import InferenceEngine
+
+    pid = os.getpid()
+    try:
+        engine = InferenceEngine(model_path, **options).load()
+    except Exception as e:
+        results.put(('failed', pid, str(e)))
+        return
+    size = engine.transform['resize']
+    results.put(('ready', pid, size, engine.labels))
+
+    segments = {}
+    while True:
+        batch = _collect(tasks, max_batch, max_wait)
+        if batch is None:
+            break
+        task_ids = [task_id for task_id, _, _ in batch]
+        results.put(('started', pid, task_ids))
+        try:
+            images = []
+            for _, name, slot in batch:
+                if name not in segments:
+                    segments[name] = shared_memory.SharedMemory(name=name)
+                images.append(_slot_view(segments[name], slot, size))
+            predictions = engine.predict_pixels(images)
+            del images
+        except Exception as e:
+            results.put(('error', pid, task_ids, str(e)))
+            continue
+        results.put(('done', pid, list(zip(task_ids, predictions))))
+
+    for segment in segments.values():
+        segment.close()
+
+
+class _Task:
+    __slots__ = ('slot', 'future', 'worker', 'submitted')
+
+    def __init__(self, slot, future):
+        self.slot = slot
+        self.future = future
+        self.worker = None
+        self.submitted = time.monotonic()
+
+
+class InferencePool:
+    """Disease predictions from a pool of worker processes fed through shared memory"""
+
+    def __init__(self, model_path, variant='float32', workers=1, queue_size=16, max_batch=8, max_wait_ms=10.0,
+                 timeout=30.0, **options):
+        self.model_path = model_path
+        self.variant = variant
+        self.size = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self.options = dict(options, variant=variant, max_batch=self.max_batch)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        """Forget pool state (used at start and in a process forked from the pool's owner)"""
+        self._context = None
+        self._processes = {}
+        self._ready_pids = set()
+        self._ready = threading.Event()
+        self._tasks = None
+        self._results = None
+        self._segment = None
+        self._input_size = None
+        self._labels = None
+        self._error = None
+        self._free = []
+        self._pending = {}
+        self._ids = itertools.count()
+        self._closing = False
+        self._dispatcher = None
+        self.counters = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'failed': 0,
+            'reclaimed': 0,
+            'restarts': 0,
+            'batches': 0
+        }
+        self._latency = 0.0   # moving average seconds from submit to result
+
+    @property
+    def available(self):
+        return os.path.exists(artifact_path(self.model_path, self.variant))
+
+    @property
+    def imported(self):
+        """True once this process has started its workers"""
+        return self._pid == os.getpid()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if multiprocessing.current_process().name != 'MainProcess' and not _serving:
+                # Spawned children re-import the main module; they must not start pools of their own
+                raise ModelUnavailableError("Inference pool cannot start inside a child process")
+            if not self.available:
+                raise ModelUnavailableError(f"Disease model not found: {artifact_path(self.model_path, self.variant)}")
+            # A pool inherited through fork belongs to the parent; start a fresh one
+            self._reset()
+            self._context = multiprocessing.get_context('spawn')
+            self._tasks = self._context.Queue()
+            self._results = self._context.Queue()
+            for _ in range(self.size):
+                self._spawn_worker()
+            self._dispatcher = threading.Thread(target=self._dispatch, name='inference-dispatcher', daemon=True)
+            self._dispatcher.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def _spawn_worker(self):
+        process = self._context.Process(
+            target=_worker_main, name='inference-worker', daemon=True,
+            args=(self.model_path, self.options, self._tasks, self._results, self.max_batch, self.max_wait)
+        )
+        process.start()
+        self._processes[process.pid] = process
+
+    def _wait_ready(self):
+        self._ensure_started()
+        if not self._ready.wait(STARTUP_TIMEOUT):
+            raise InferenceBusyError("Inference workers are still starting", status=503, retry_after=5)
+        if self._input_size is None:
+            raise ModelUnavailableError(self._error or "Inference workers failed to start")
+
+    @property
+    def input_size(self):
+        self._wait_ready()
+        return self._input_size
+
+    def preload(self):
+        """Start the workers and wait for the model; True when it loaded"""
+        try:
+            self._wait_ready()
+        except (ModelUnavailableError, InferenceBusyError) as e:
+            print(f"⚠️ {e}")
+            return False
+        return True
+
+    def ring(self):
+        """(shared memory name, input size, labels) for processes that fill slots themselves"""
+        self._wait_ready()
+        return self._segment.name, self._input_size, self._labels
+
+    def check_capacity(self):
+        """Raise InferenceBusyError when no slot is free"""
+        self._wait_ready()
+        if not self._free:
+            self._reject()
+
+    def decode(self, data, max_pixels):
+        """Validated PIL image from uploaded bytes, decoded at reduced scale for the model input"""
+        # Turn work away before spending a decode on it; reserve re-checks when it takes a slot
+        self.check_capacity()
+        return decode_upload(data, self._input_size, max_pixels)
+
+    def retry_after(self):
+        """Seconds until a full ring has likely drained"""
+        per_round = self._latency or 1.0
+        return max(1, math.ceil(per_round * self.queue_size / (self.size * self.max_batch)))
+
+    def _reject(self):
+        with self._lock:
+            self.counters['rejected'] += 1
+        raise InferenceBusyError(f"Inference queue full ({self.queue_size} images in flight)",
+                                 status=429, retry_after=self.retry_after())
+
+    def predict(self, image, timeout=None):
+        """Top-k prediction for one PIL image, computed in a worker process"""
+        size = self.input_size
+        pixels = resize_for_model(image, size)
+        task_id, slot = self.reserve()
+        _slot_view(self._segment, slot, size)[...] = pixels
+        return self.run(task_id, timeout)
+
+    def reserve(self):
+        """(task id, slot) of a free ring slot for the caller to fill before run(task id)"""
+        self._wait_ready()
+        with self._lock:
+            slot = self._free.pop() if self._free else None
+            if slot is not None:
+                task_id = next(self._ids)
+                self._pending[task_id] = _Task(slot, Future())
+                self.counters['submitted'] += 1
+        if slot is None:
+            self._reject()
+        return task_id, slot
+
+    def run(self, task_id, timeout=None):
+        """Queue a reserved task, whose slot now holds its pixels, and wait for the prediction"""
+        with self._lock:
+            task = self._pending.get(task_id)
+        if task is None:
+            raise InferenceBusyError("Inference task expired", status=503, retry_after=self.retry_after())
+        self._tasks.put((task_id, self._segment.name, task.slot))
+        try:
+            return task.future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            # The slot stays taken until the worker answers, so the ring never hands it out twice
+            with self._lock:
+                self.counters['timeouts'] += 1
+            raise InferenceBusyError("Inference timed out", status=503, retry_after=self.retry_after())
+
+    def _dispatch(self):
+        """Route worker messages to waiting requests and replace workers that die"""
+        while not self._closing:
+            try:
+                message = self._results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            if message is not None:
+                self._handle(message)
+            self._check_workers()
+            self._reclaim()
+
+    def _handle(self, message):
+        kind, pid = message[0], message[1]
+        if kind == 'ready':
+            with self._lock:
+                if self._segment is None:
+                    size = message[2]
+                    self._segment = shared_memory.SharedMemory(create=True, size=self.queue_size * size * size * 3)
+                    self._free = list(range(self.queue_size))
+                    self._input_size, self._labels = size, message[3]
+                self._ready_pids.add(pid)
+            self._ready.set()
+        elif kind == 'failed':
+            self._error = message[2]
+            self._processes.pop(pid, None)
+            if not self._processes:
+                self._ready.set()   # nobody left to wait for; callers see the error
+        elif kind == 'started':
+            if pid not in self._processes:
+                # The worker died before this message was read
+                for task_id in message[2]:
+                    self._fail(task_id, InferenceBusyError("Inference worker crashed", status=503, retry_after=5))
+                return
+            with self._lock:
+                for task_id in message[2]:
+                    if task_id in self._pending:
+                        self._pending[task_id].worker = pid
+                self.counters['batches'] += 1
+        elif kind == 'done':
+            now = time.monotonic()
+            for task_id, result in message[2]:
+                task = self._finish(task_id)
+                if task is not None:
+                    self._latency = 0.8 * self._latency + 0.2 * (now - task.submitted) if self._latency else now - task.submitted
+                    task.future.set_result(result)
+        elif kind == 'error':
+            for task_id in message[2]:
+                self._fail(task_id, RuntimeError(message[3]))
+
+    def _finish(self, task_id, outcome='completed'):
+        with self._lock:
+            task = self._pending.pop(task_id, None)
+            if task is not None:
+                self._free.append(task.slot)
+                self.counters[outcome] += 1
+        return task
+
+    def _fail(self, task_id, error):
+        task = self._finish(task_id, 'failed')
+        if task is not None:
+            task.future.set_exception(error)
+
+    def _check_workers(self):
+        for pid, process in list(self._processes.items()):
+            if process.is_alive() or self._closing:
+                continue
+            del self._processes[pid]
+            with self._lock:
+                lost = [task_id for task_id, task in self._pending.items() if task.worker == pid]
+            for task_id in lost:
+                self._fail(task_id, InferenceBusyError("Inference worker crashed", status=503, retry_after=5))
+            # Workers that never loaded the model are not retried; their error is reported instead
+            if pid in self._ready_pids:
+                self._ready_pids.discard(pid)
+                self.counters['restarts'] += 1
+                self._spawn_worker()
+
+    def _reclaim(self):
+        """Fail tasks no worker has reported within the timeout, freeing their slots"""
+        cutoff = time.monotonic() - self.timeout
+        with self._lock:
+            stale = [task_id for task_id, task in self._pending.items()
+                     if task.worker is None and task.submitted < cutoff]
+        for task_id in stale:
+            # Dequeued by a worker that died before saying so, or reserved and never run
+            task = self._finish(task_id, 'reclaimed')
+            if task is not None:
+                task.future.set_exception(InferenceBusyError("Inference timed out", status=503,
+                                                             retry_after=self.retry_after()))
+
+    def close(self):
+        """Stop the workers and release the shared memory (only in the process that started them)"""
+        if self._pid != os.getpid():
+            return
+        self._closing = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in list(self._processes.values()):
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        if self._dispatcher is not None:
+            self._dispatcher.join(POLL_INTERVAL * 2)
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for task in pending:
+            task.future.set_exception(InferenceBusyError("Inference pool shut down", status=503, retry_after=5))
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+        self._pid = None
+        self._reset()
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for task in self._pending.values() if task.worker is not None)
+            in_flight = len(self._pending)
+            counters = dict(self.counters)
+        batches = counters['batches']
+        return {
+            'mode': 'process_pool',
+            'model_path': self.model_path,
+            'variant': self.variant,
+            'imported': self.imported,
+            'loaded': bool(self._ready_pids),
+            'labels': self._labels,
+            'error': self._error,
+            'pool': {
+                'workers': self.size,
+                'workers_alive': sum(1 for process in self._processes.values() if process.is_alive()),
+                'workers_ready': len(self._ready_pids),
+                'queue_capacity': self.queue_size,
+                'queue_depth': in_flight - running,
+                'running': running,
+                'in_flight': in_flight,
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'mean_batch': round((counters['completed'] + counters['failed']) / batches, 2) if batches else 0.0,
+                'mean_latency_ms': round(self._latency * 1000, 1),
+                **counters
+            }
+        }
+
+
+class _PoolManager(BaseManager):
+    pass
+
+
+def _serve_pool(model_path, options):
+    """Pool server initializer: create the pool every attached web worker shares"""
+    global _serving
+    _serving = InferencePool(model_path, **options)
+    # Spawned processes skip atexit; finalizers still run, so the workers stop and the ring is unlinked
+    util.Finalize(_serving, _serving.close, exitpriority=10)
+
+
+def _served_pool():
+    return _serving
+
+
+_PoolManager.register('pool', callable=_served_pool,
+                      exposed=('ring', 'check_capacity', 'reserve', 'run', 'stats', 'close'))
+
+
+def start_pool_server(model_path, **options):
+    """Run an InferencePool in a new server process, stopped when this process exits; returns its manager"""
+    manager = _PoolManager(ctx=multiprocessing.get_context('spawn'))
+    manager.start(_serve_pool, (model_path, options))
+    server, owner = manager._process, os.getpid()
+    # Processes forked from this one would otherwise try to join the server as their own child at exit
+    os.register_at_fork(after_in_child=lambda: multiprocessing.process._children.discard(server))
+    atexit.register(lambda: os.getpid() == owner and stop_pool_server(manager))
+    return manager
+
+
+def stop_pool_server(manager):
+    """Stop the served pool's workers and release its ring, then the server"""
+    if not manager.shutdown.still_active():
+        return   # stopped already
+    try:
+        # The manager only gives its server a second to exit; the pool may need longer to close
+        manager.pool().close()
+    except (EOFError, OSError):
+        pass   # the server is already gone
+    manager.shutdown()
+
+
+class SharedPoolClient:
+    """InferencePool interface backed by a pool server that other processes share"""
+
+    def __init__(self, address, model_path, variant='float32'):
+        self.address = address
+        self.model_path = model_path
+        self.variant = variant
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._segment = None
+        self._input_size = None
+
+    @property
+    def available(self):
+        return os.path.exists(artifact_path(self.model_path, self.variant))
+
+    @property
+    def imported(self):
+        return self._pid == os.getpid()
+
+    def _connect(self):
+        if self._pid == os.getpid() and self._pool is not None:
+            return self._pool
+        with self._lock:
+            if self._pid != os.getpid() or self._pool is None:
+                # Connections and the mapped ring do not survive fork; attach afresh in each process
+                manager = _PoolManager(address=self.address)
+                manager.connect()
+                self._pool, self._segment, self._pid = manager.pool(), None, os.getpid()
+            return self._pool
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self._connect(), method)(*args)
+        except (EOFError, OSError) as e:
+            self._pool = None
+            raise InferenceBusyError(f"Inference pool unreachable: {e}", status=503, retry_after=5)
+
+    def _ring(self):
+        if self._segment is None or self._pid != os.getpid():
+            name, size, _ = self._call('ring')
+            with self._lock:
+                if self._segment is None:
+                    # Forked after the server was spawned, this process shares its resource tracker,
+                    # so attaching does not make this process's exit unlink the ring
+                    self._segment, self._input_size = shared_memory.SharedMemory(name=name), size
+        return self._segment
+
+    @property
+    def input_size(self):
+        self._ring()
+        return self._input_size
+
+    def preload(self):
+        try:
+            self._ring()
+        except (ModelUnavailableError, InferenceBusyError) as e:
+            print(f"⚠️ {e}")
+            return False
+        return True
+
+    def decode(self, data, max_pixels):
+        """Validated PIL image from uploaded bytes, decoded at reduced scale for the model input"""
+        size = self.input_size
+        self._call('check_capacity')
+        return decode_upload(data, size, max_pixels)
+
+    def predict(self, image, timeout=None):
+        """Top-k prediction for one PIL image, computed by the shared pool's workers"""
+        segment = self._ring()
+        pixels = resize_for_model(image, self._input_size)
+        task_id, slot = self._call('reserve')
+        _slot_view(segment, slot, self._input_size)[...] = pixels
+        return self._call('run', task_id, timeout)
+
+    def stats(self):
+        try:
+            stats = self._call('stats')
+        except InferenceBusyError as e:
+            return {'mode': 'shared_pool', 'model_path': self.model_path, 'variant': self.variant,
+                    'imported': self.imported, 'loaded': False, 'labels': None, 'error': str(e)}
+        return dict(stats, mode='shared_pool', imported=self.imported, address=self.address)
+
+    def close(self):
+        """Detach from the pool; the server and its workers keep running for the other processes"""
+        if self._segment is not None and self._pid == os.getpid():
+            self._segment.close()
+        self._pool = self._segment = None
+        self._pid = None
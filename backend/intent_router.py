@@ -0,0 +1,121 @@
+# Keyword Intent Router for the Farming Expert AI
+"""
+Compiles every routing keyword into a single regular expression alternation,
+so a query is classified by one scan in the re engine's C code, and the
+weights of each matched keyword are looked up in a dict.
+"""
+import re
+from collections import namedtuple
+
+# intent: winning intent name, scores: {intent: score}, keywords: matched keywords,
+# inferred: request fields filled in from retrieval ({'crop': 'rice'}), retrieval: the hit used
+RouteResult = namedtuple('RouteResult', ['intent', 'scores', 'keywords', 'inferred', 'retrieval'],
+                         defaults=(None, None))
+
+
+class IntentRouter:
+    """Weighted multi-keyword intent classifier built once at startup"""
+
+    # Keywords shorter than this must match a whole word ('ph' should not fire on 'phone')
+    WHOLE_WORD_MAX_LENGTH = 2
+
+    def __init__(self):
+        self.intents = []            # (name, requires) in priority order
+        self.keyword_weights = {}    # keyword -> [(intent_index, weight), ...]
+        self._pattern = None
+        self._implied = None
+        self._weights = None
+
+    def add_intent(self, name, keywords, requires=()):
+        """Register an intent; earlier intents win ties"""
+        intent_index = len(self.intents)
+        self.intents.append((name, frozenset(requires)))
+        for keyword, weight in keywords.items():
+            self.keyword_weights.setdefault(keyword.lower(), []).append((intent_index, weight))
+        self._weights = None
+        return self
+
+    def requirements(self, name):
+        """Context an intent requires; unregistered intents (defaults) require nothing"""
+        for intent, requires in self.intents:
+            if intent == name:
+                return requires
+        return frozenset()
+
+    def compile(self):
+        """Compile every keyword into one regular expression, its alternation nested as a trie"""
+        trie = {}
+        for keyword in self.keyword_weights:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = keyword
+        # Every keyword starts a word: no letter or digit right before it
+        self._pattern = re.compile(r'(?<![^\W_])' + self._trie_pattern(trie)) if trie else None
+        # A match also counts the shorter keywords it starts with ('transplanting' is 'plant' too)
+        self._implied = {}
+        for keyword in self.keyword_weights:
+            prefixes = [keyword[:end] for end in range(self.WHOLE_WORD_MAX_LENGTH + 1, len(keyword))
+                        if keyword[:end] in self.keyword_weights]
+            if prefixes:
+                self._implied[keyword] = prefixes
+        self._weights = {keyword: tuple(entries) for keyword, entries in self.keyword_weights.items()}
+        return self
+
+    def _trie_pattern(self, node):
+        """Alternation for a trie node; children come first, so the longest keyword wins"""
+        branches = [re.escape(ch) + self._trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+        keyword = node.get('')
+        if keyword is None:
+            return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Short keywords must also end a word ('ph' should not fire on 'phone')
+        end = r'(?![^\W_])' if len(keyword) <= self.WHOLE_WORD_MAX_LENGTH else ''
+        if not branches:
+            return end
+        return '(?:' + '|'.join(branches + [end]) + ')'
+
+    def match(self, text):
+        """Return the set of keywords found at word boundaries in text"""
+        if self._weights is None:
+            self.compile()
+        if self._pattern is None:
+            return set()
+        found = set(self._pattern.findall(text.lower()))
+        if self._implied:
+            for keyword in found.intersection(self._implied):
+                found.update(self._implied[keyword])
+        return found
+
+    def score(self, text, context=()):
+        """Score every eligible intent for text given the satisfied requirements"""
+        matched = self.match(text)
+        if not matched:
+            return {}, matched
+        weights = self._weights
+        totals = {}
+        for keyword in matched:
+            for intent_index, weight in weights[keyword]:
+                totals[intent_index] = totals.get(intent_index, 0) + weight
+
+        intents = self.intents
+        scores = {}
+        for intent_index in sorted(totals):
+            name, requires = intents[intent_index]
+            if not requires or requires.issubset(context):
+                scores[name] = totals[intent_index]
+
+        return scores, matched
+
+    def route(self, text, context=(), default=None):
+        """Pick the highest scoring intent, falling back to default"""
+        scores, matched = self.score(text, context)
+
+        intent = default
+        best = 0
+        # scores preserves registration order, so the first maximum wins ties
+        for name, value in scores.items():
+            if value > best:
+                intent = name
+                best = value
+
+        return RouteResult(intent, scores, sorted(matched))
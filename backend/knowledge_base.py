@@ -0,0 +1,375 @@
+# Compiled Knowledge Base bundle for the Farming Expert AI
+"""
+The knowledge dictionaries (crops, soils, locations, calendars, ...) can be
+compiled into a versioned SQLite bundle. Opening a bundle only reads the list
+of record paths; each record is decoded the first time it is accessed, and
+the file is memory-mapped read-only so worker processes share its pages.
+
+Sections are split into records at a fixed depth, e.g. one record per crop
+('rice') or per region ('india/states/punjab'), and reassembled on access as
+read-only nested mappings that behave like the original dicts.
+
+A KnowledgeSnapshot bundles the sections with everything derived from them,
+so a reload swaps a single reference. The derived indexes are built on first
+use, so opening a snapshot decodes no records. Reads made inside track_dependencies()
+are recorded as (section, path) pairs, which lets callers drop exactly the
+cached results built from records that changed between two snapshots.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+
+FORMAT_VERSION = 1
+
+# How deep each section is split into individually loadable records
+SECTION_DEPTHS = {
+    'crop_database': 1,
+    'soil_knowledge': 2,
+    'pest_management': 2,
+    'fertilizer_guide': 2,
+    'irrigation_systems': 2,
+    'seasonal_calendar': 1,
+    'market_insights': 1,
+    'location_data': 3,
+    'location_aliases': 1
+}
+
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+_tracking = threading.local()
+
+
+class KnowledgeBundleError(Exception):
+    """Raised when a bundle is missing, corrupt or of an unsupported format"""
+
+
+class track_dependencies:
+    """Context manager collecting the (section, path) records read on this thread"""
+
+    def __enter__(self):
+        self._outer = getattr(_tracking, 'deps', None)
+        _tracking.deps = set()
+        return _tracking.deps
+
+    def __exit__(self, *exc_info):
+        deps = _tracking.deps
+        _tracking.deps = self._outer
+        # Nested trackers report to the enclosing one as well
+        if self._outer is not None:
+            self._outer.update(deps)
+        return False
+
+
+def record_dependency(section, path=''):
+    """Note a read of section/path for the active tracker, if any"""
+    deps = getattr(_tracking, 'deps', None)
+    if deps is not None:
+        deps.add((section, path))
+
+
+def record_dependencies(pairs):
+    deps = getattr(_tracking, 'deps', None)
+    if deps is not None:
+        deps.update(pairs)
+
+
+def depends_on_changes(deps, changed):
+    """True when any (section, path) dependency overlaps a changed record path"""
+    for section, path in deps:
+        for changed_path in changed.get(section, ()):
+            if (not path or not changed_path or path == changed_path
+                    or changed_path.startswith(path + '/') or path.startswith(changed_path + '/')):
+                return True
+    return False
+
+
+def _encode(value):
+    # Key order is content: advice text iterates stages and months in order
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def _split_records(value, depth, path=()):
+    """Yield (path, value) pairs, descending into dicts until depth is reached"""
+    if depth == 0 or not isinstance(value, dict) or not value:
+        yield path, value
+        return
+    for key, child in value.items():
+        yield from _split_records(child, depth - 1, path + (str(key),))
+
+
+def compile_bundle(sections, output_path, source='inline'):
+    """Write sections ({name: dict}) to a new bundle file, returning its metadata"""
+    tmp_path = f"{output_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        db.execute(
+            'CREATE TABLE records (section TEXT NOT NULL, path TEXT NOT NULL, position INTEGER NOT NULL, '
+            'digest TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (section, path)) WITHOUT ROWID'
+        )
+
+        content_hash = hashlib.sha256()
+        record_count = 0
+        for name in sorted(sections):
+            depth = SECTION_DEPTHS.get(name, 1)
+            rows = []
+            for position, (path, value) in enumerate(_split_records(sections[name], depth)):
+                encoded = _encode(value)
+                digest = hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+                key = '/'.join(path)
+                content_hash.update(f"{name}:{key}:{digest}\n".encode('utf-8'))
+                rows.append((name, key, position, digest, encoded))
+            db.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?)', rows)
+            record_count += len(rows)
+
+        meta = {
+            'format_version': str(FORMAT_VERSION),
+            'content_version': content_hash.hexdigest()[:16],
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'sections': ','.join(sorted(sections)),
+            'records': str(record_count)
+        }
+        db.executemany('INSERT INTO meta VALUES (?, ?)', meta.items())
+        db.execute(f'PRAGMA user_version = {FORMAT_VERSION}')
+        db.commit()
+        db.execute('VACUUM')
+    finally:
+        db.close()
+
+    # Readers never observe a half-written bundle
+    os.replace(tmp_path, output_path)
+    return meta
+
+
+class KnowledgeBundle:
+    """Read-only, memory-mapped view of a compiled knowledge bundle"""
+
+    def __init__(self, path, mmap_size=DEFAULT_MMAP_SIZE):
+        self.path = os.path.abspath(path)
+        self.mmap_size = mmap_size
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+        if not os.path.exists(self.path):
+            raise KnowledgeBundleError(f"Knowledge bundle not found: {self.path}")
+        try:
+            db = self._connection()
+            self.meta = dict(db.execute('SELECT key, value FROM meta'))
+            self.digests = {}
+            rows = db.execute('SELECT section, path, digest FROM records ORDER BY section, position')
+            for section, path, digest in rows:
+                self.digests.setdefault(section, {})[path] = digest
+        except sqlite3.DatabaseError as e:
+            raise KnowledgeBundleError(f"Unreadable knowledge bundle {self.path}: {e}")
+
+        if self.meta.get('format_version') != str(FORMAT_VERSION):
+            raise KnowledgeBundleError(
+                f"Unsupported knowledge bundle format {self.meta.get('format_version')} "
+                f"(expected {FORMAT_VERSION})"
+            )
+
+    @property
+    def version(self):
+        return self.meta['content_version']
+
+    def _connection(self):
+        # SQLite handles must not cross a fork; reopen lazily in each process
+        if self._db is None or self._pid != os.getpid():
+            uri = f"file:{self.path}?mode=ro&immutable=1"
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._db.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+            self._pid = os.getpid()
+        return self._db
+
+    def load_record(self, section, path):
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT value FROM records WHERE section = ? AND path = ?', (section, path)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"{section}/{path}")
+        return json.loads(row[0])
+
+    def section(self, name):
+        """Lazy mapping over one section"""
+        if name not in self.digests:
+            raise KnowledgeBundleError(f"Section '{name}' missing from {self.path}")
+        paths = self.digests[name]
+        if '' in paths:
+            # Section stored as a single record (empty or not a dict)
+            return self.load_record(name, '')
+        return LazyRecordMapping(self, name, [p.split('/') for p in paths])
+
+    def sections(self):
+        return {name: self.section(name) for name in self.digests}
+
+
+class LazyRecordMapping(Mapping):
+    """Read-only nested mapping whose leaf records are decoded on first access"""
+
+    def __init__(self, bundle, section, paths, prefix=()):
+        self._bundle = bundle
+        self._section = section
+        self._prefix = prefix
+        self._children = {}
+        for parts in paths:
+            self._children.setdefault(parts[0], []).append(parts[1:])
+        self._loaded = {}
+
+    def _path(self, key=None):
+        parts = self._prefix if key is None else self._prefix + (key,)
+        return '/'.join(parts)
+
+    def __getitem__(self, key):
+        rest = self._children.get(key)
+        # Walking through an inner node is not a dependency; the record read below it is
+        if rest is None or rest == [[]]:
+            record_dependency(self._section, self._path(key))
+        if key in self._loaded:
+            return self._loaded[key]
+        if rest is None:
+            raise KeyError(key)
+        if rest == [[]]:
+            value = self._bundle.load_record(self._section, self._path(key))
+        else:
+            value = LazyRecordMapping(self._bundle, self._section, rest, self._prefix + (key,))
+        self._loaded[key] = value
+        return value
+
+    def __contains__(self, key):
+        record_dependency(self._section, self._path(key))
+        return key in self._children
+
+    def __iter__(self):
+        # Listing keys depends on every record below this node
+        record_dependency(self._section, self._path())
+        return iter(self._children)
+
+    def __len__(self):
+        record_dependency(self._section, self._path())
+        return len(self._children)
+
+    def __repr__(self):
+        return f"<LazyRecordMapping {self._section}/{self._path()} ({len(self._children)} keys)>"
+
+    def materialize(self):
+        """Fully decoded plain dict (loads every record below this node)"""
+        return {
+            key: value.materialize() if isinstance(value, LazyRecordMapping) else value
+            for key, value in self.items()
+        }
+
+
+class KnowledgeSnapshot:
+    """Immutable set of knowledge sections plus the indexes derived from them"""
+
+    def __init__(self, sections, bundle=None, indexes=None):
+        self.sections = sections
+        self.bundle = bundle
+        # {name: build(sections)}; each index is built the first time it is asked for
+        self._builders = dict(indexes or {})
+        self._indexes = {}
+        self._build_lock = threading.Lock()
+        self.version = bundle.version if bundle else 'inline'
+        self.digests = bundle.digests if bundle else None
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+
+    def index(self, name):
+        try:
+            return self._indexes[name]
+        except KeyError:
+            pass
+        with self._build_lock:
+            if name not in self._indexes:
+                # Building reads every record; that is not a dependency of the request that got here first
+                outer = getattr(_tracking, 'deps', None)
+                _tracking.deps = None
+                try:
+                    self._indexes[name] = self._builders[name](self.sections)
+                finally:
+                    _tracking.deps = outer
+            return self._indexes[name]
+
+    def build_indexes(self):
+        """Build every index now (e.g. before forking, so workers share them)"""
+        for name in self._builders:
+            self.index(name)
+
+    def changed_records(self, other):
+        """{section: {path, ...}} of records added, removed or edited since other, or None if unknown"""
+        if self.digests is None or other.digests is None:
+            return None
+        changed = {}
+        for section in set(self.digests) | set(other.digests):
+            ours = self.digests.get(section, {})
+            theirs = other.digests.get(section, {})
+            paths = {path for path in set(ours) | set(theirs) if ours.get(path) != theirs.get(path)}
+            if paths:
+                changed[section] = paths
+        return changed
+
+
+class SnapshotSection:
+    """Class attribute that reads a section from the owner's current snapshot"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.knowledge.sections[self.name]
+
+
+class BundleWatcher:
+    """Polls a bundle path and calls on_change after the file is replaced"""
+
+    def __init__(self, path, on_change, interval=5.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        # The compiler swaps in a new file, so the inode changes on every build
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def check(self):
+        """Fire on_change if the file changed since the last check; True when it did"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            self.on_change()
+        except Exception as e:
+            # Keep serving the current snapshot; the next replacement is retried
+            print(f"⚠️ Knowledge reload failed: {e}")
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='knowledge-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Knowledge bundle compiler
+Builds the versioned knowledge bundle the Farming Expert AI opens at startup.
+
+Usage:
+    python knowledge_compiler.py build                       # from the built-in dicts
+    python knowledge_compiler.py build --source extra.json   # JSON sections override built-ins
+    python knowledge_compiler.py info [--bundle path]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from knowledge_base import KnowledgeBundle, LazyRecordMapping, SECTION_DEPTHS, compile_bundle
+
+
+def _plain(value):
+    return value.materialize() if isinstance(value, LazyRecordMapping) else value
+
+
+def load_sections(source=None):
+    """Built-in knowledge, with whole sections replaced from a JSON source file"""
+    from farming_expert_app import farming_expert
+    sections = farming_expert.build_inline_knowledge()
+    if source:
+        with open(source, encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(SECTION_DEPTHS)
+        if unknown:
+            raise ValueError(f"Unknown knowledge sections in {source}: {', '.join(sorted(unknown))}")
+        sections.update(overrides)
+    return sections
+
+
+def build(source, output):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    sections = load_sections(source)
+
+    start = time.perf_counter()
+    meta = compile_bundle(sections, output, source=os.path.basename(source) if source else 'inline')
+    elapsed = (time.perf_counter() - start) * 1000
+
+    # Round trip: every section must decode back to exactly what was compiled
+    bundle = KnowledgeBundle(output)
+    for name, value in sections.items():
+        if _plain(bundle.section(name)) != value:
+            print(f"❌ Section '{name}' does not round-trip")
+            return 1
+
+    print(f"✅ Compiled {meta['records']} records in {elapsed:.1f} ms -> {output}")
+    print(f"   Version {meta['content_version']} ({os.path.getsize(output) / 1024:.1f} KB)")
+    return 0
+
+
+def info(path):
+    bundle = KnowledgeBundle(path)
+    print(f"📦 {bundle.path}")
+    for key, value in bundle.meta.items():
+        print(f"   {key}: {value}")
+    for name, records in bundle.digests.items():
+        print(f"   {name}: {len(records)} records")
+    return 0
+
+
+def main():
+    from farming_expert_app import DEFAULT_KNOWLEDGE_BUNDLE
+
+    parser = argparse.ArgumentParser(description='Compile the farming knowledge bundle')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_cmd = commands.add_parser('build', help='compile a bundle')
+    build_cmd.add_argument('--source', help='JSON file of {section: data} replacing built-in sections')
+    build_cmd.add_argument('--output', default=os.getenv('KNOWLEDGE_BUNDLE', DEFAULT_KNOWLEDGE_BUNDLE))
+    info_cmd = commands.add_parser('info', help='show bundle metadata')
+    info_cmd.add_argument('--bundle', default=os.getenv('KNOWLEDGE_BUNDLE', DEFAULT_KNOWLEDGE_BUNDLE))
+    args = parser.parse_args()
+
+    print("🌾 AgriGuru Knowledge Compiler")
+    print("=" * 50)
+    if args.command == 'build':
+        return build(args.source, args.output)
+    return info(args.bundle)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# Location Resolver Index for the Farming Expert AI
+"""
+Resolves free-text locations ("Pune, Maharashtra", "pune", "MH", "maharastra")
+to a canonical location key such as 'india/maharashtra'.
+
+Names, aliases and abbreviations go into a hash map for O(1) exact lookups, a
+character trie for prefix completion, and a map of single-character deletions
+for one-typo matches, so resolving stays O(len(location)) however many states
+or districts are loaded.
+"""
+import re
+from collections import namedtuple
+
+# key: canonical 'country/region', country and region: keys into location_data,
+# method: how the match was made (exact, alias, prefix, fuzzy)
+LocationMatch = namedtuple('LocationMatch', ['key', 'country', 'region', 'method'])
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_location(text):
+    """Lowercase, treat '_' and punctuation as spaces, collapse whitespace"""
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+class _TrieNode:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()       # every canonical key reachable below this node
+
+
+class LocationIndex:
+    """Hash map plus trie over location names, aliases and abbreviations"""
+
+    MIN_PREFIX_LENGTH = 3
+    MIN_FUZZY_LENGTH = 5
+    MAX_NGRAM = 3
+
+    def __init__(self):
+        self.names = {}         # normalized name -> (canonical key, method)
+        self.regions = {}       # canonical key -> (country, region)
+        self.root = _TrieNode()
+        self.deletions = {}     # name with one character removed -> canonical keys
+
+    @classmethod
+    def build(cls, location_data, aliases=None):
+        """Index every region in location_data plus city/abbreviation aliases"""
+        index = cls()
+        for country, country_data in location_data.items():
+            for region in country_data.get('states', {}):
+                key = index.add_region(country, region)
+                # Compound names also resolve without spaces: 'westbengal'
+                index.add_name(region.replace('_', ''), key)
+                for district in country_data['states'][region].get('districts', ()):
+                    index.add_name(district, key, method='alias')
+
+        for group in (aliases or {}).values():
+            for alias, target in group.items():
+                key = index.key_for(target)
+                if key is not None:
+                    index.add_name(alias, key, method='alias')
+        return index
+
+    def add_region(self, country, region):
+        key = f"{country}/{region}"
+        self.regions[key] = (country, region)
+        self.add_name(region, key)
+        return key
+
+    def key_for(self, target):
+        """Canonical key for 'country/region' or a bare region name"""
+        if target in self.regions:
+            return target
+        entry = self.names.get(normalize_location(target))
+        return entry[0] if entry else None
+
+    def add_name(self, name, key, method='exact'):
+        name = normalize_location(name)
+        if not name or name in self.names:
+            return
+        self.names[name] = (key, method)
+
+        node = self.root
+        node.keys.add(key)
+        for ch in name:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.keys.add(key)
+
+        if len(name) >= self.MIN_FUZZY_LENGTH - 1:
+            for variant in self._deletion_variants(name):
+                self.deletions.setdefault(variant, set()).add(key)
+
+    def resolve(self, location):
+        """Best LocationMatch for free text, or None when nothing matches unambiguously"""
+        if not location:
+            return None
+        normalized = normalize_location(location)
+        if not normalized:
+            return None
+
+        # Whole string, then each comma-separated part
+        parts = [normalized]
+        if ',' in location:
+            parts += [normalize_location(part) for part in location.split(',')]
+        for part in parts:
+            match = self._exact(part)
+            if match:
+                return match
+
+        # Word n-grams, longest first: 'rice farming in west bengal'
+        tokens = normalized.split()
+        for size in range(min(self.MAX_NGRAM, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                match = self._exact(' '.join(tokens[start:start + size]))
+                if match:
+                    return match
+
+        # Trie: unique prefix completion, then a single typo
+        candidates = parts + [t for t in tokens if t not in parts]
+        for text in candidates:
+            key = self._unique_prefix(text)
+            if key:
+                return self._match(key, 'prefix')
+        for text in candidates:
+            key = self._fuzzy(text)
+            if key:
+                return self._match(key, 'fuzzy')
+        return None
+
+    def _exact(self, name):
+        entry = self.names.get(name)
+        if entry is None:
+            return None
+        return self._match(entry[0], entry[1])
+
+    def _match(self, key, method):
+        country, region = self.regions[key]
+        return LocationMatch(key, country, region, method)
+
+    def _unique_prefix(self, text):
+        if len(text) < self.MIN_PREFIX_LENGTH:
+            return None
+        node = self.root
+        for ch in text:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return next(iter(node.keys)) if len(node.keys) == 1 else None
+
+    def _fuzzy(self, text):
+        """Unique canonical key one insertion, deletion, substitution or swap away from text"""
+        if len(text) < self.MIN_FUZZY_LENGTH:
+            return None
+        # 'punjabi' (as in Punjabi Bagh, Delhi) is another word, not a typo of 'punjab'
+        if self._contains_name(text):
+            return None
+
+        found = set(self.deletions.get(text, ()))           # text is missing a character
+        for variant in self._deletion_variants(text):
+            entry = self.names.get(variant)                  # text has an extra character
+            if entry:
+                found.add(entry[0])
+            found.update(self.deletions.get(variant, ()))   # substituted or swapped character
+            if len(found) > 1:
+                return None
+        return found.pop() if len(found) == 1 else None
+
+    def _contains_name(self, text):
+        """Whether a name long enough to be fuzzy matched occurs inside text"""
+        for start in range(len(text)):
+            node = self.root
+            for end in range(start, len(text)):
+                node = node.children.get(text[end])
+                if node is None:
+                    break
+                if end - start + 2 >= self.MIN_FUZZY_LENGTH and text[start:end + 1] in self.names:
+                    return True
+        return False
+
+    @staticmethod
+    def _deletion_variants(text):
+        return {text[:i] + text[i + 1:] for i in range(len(text))}
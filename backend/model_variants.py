@@ -0,0 +1,152 @@
+# Deployment variants of the crop disease model
+"""
+Besides the float32 checkpoint, the training export can write CPU-oriented
+variants of AgriEfficientNet next to it:
+
+    torchscript    traced and frozen graph, no efficientnet_pytorch needed at runtime
+    int8_dynamic   Linear layers quantized to INT8 at runtime (classifier head)
+    int8_static    FX graph-mode static INT8, calibrated on sample batches
+    onnx           for onnxruntime (optional dependency)
+
+model_variants.json in the export directory lists the files together with the
+labels and transform they were exported with. INFERENCE_VARIANT picks one.
+"""
+import copy
+import inspect
+import json
+import os
+
+import torch
+import torch.nn as nn
+
+from vision_loader import MANIFEST_NAME
+
+CHECKPOINT_NAME = 'agri_efficientnet_model.pth'
+
+VARIANT_FILES = {
+    'float32': (CHECKPOINT_NAME, 'state_dict'),
+    'torchscript': ('agri_efficientnet_traced.pt', 'torchscript'),
+    'int8_dynamic': ('agri_efficientnet_int8_dynamic.pt', 'torchscript'),
+    'int8_static': ('agri_efficientnet_int8_static.pt', 'torchscript'),
+    'onnx': ('agri_efficientnet_model.onnx', 'onnx')
+}
+VARIANTS = tuple(VARIANT_FILES)
+
+
+def _traced(model, example):
+    with torch.no_grad():
+        return torch.jit.freeze(torch.jit.trace(model, example).eval())
+
+
+def _export_one(variant, model, example, path, calibration_batches, quantized_engine):
+    if variant == 'torchscript':
+        torch.jit.save(_traced(model, example), path)
+    elif variant == 'int8_dynamic':
+        quantized = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        torch.jit.save(_traced(quantized, example), path)
+    elif variant == 'int8_static':
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+        if not calibration_batches:
+            raise ValueError('int8_static needs calibration batches')
+        torch.backends.quantized.engine = quantized_engine
+        prepared = prepare_fx(copy.deepcopy(model), get_default_qconfig_mapping(quantized_engine), (example,))
+        with torch.no_grad():
+            for batch in calibration_batches:
+                prepared(batch)
+        torch.jit.save(_traced(convert_fx(prepared), example), path)
+    elif variant == 'onnx':
+        kwargs = {}
+        # Newer torch defaults to the dynamo exporter, which needs onnxscript
+        if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+            kwargs['dynamo'] = False
+        torch.onnx.export(
+            model, example, path, input_names=['input'], output_names=['logits'],
+            dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}}, opset_version=17, **kwargs
+        )
+    else:
+        raise ValueError(f"Unknown model variant '{variant}'")
+
+
+def export_variants(model, output_dir, labels, transform_config, model_config=None,
+                    calibration_batches=(), variants=VARIANTS, quantized_engine='onednn'):
+    """Write the requested variants plus model_variants.json, returning the manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    model = copy.deepcopy(model).cpu().eval()
+    # The memory-efficient swish is a custom autograd function that tracing cannot follow
+    model.backbone.set_swish(memory_efficient=False)
+    size = transform_config['resize']
+    example = torch.randn(1, 3, size, size)
+
+    manifest = {
+        'labels': list(labels),
+        'transform_config': transform_config,
+        'model_config': model_config or {},
+        'variants': {}
+    }
+    for variant in variants:
+        filename, fmt = VARIANT_FILES[variant]
+        path = os.path.join(output_dir, filename)
+        try:
+            if variant == 'float32':
+                torch.save({
+                    'model_state_dict': model.state_dict(),
+                    'model_config': model_config or {},
+                    'labels': list(labels),
+                    'transform_config': transform_config
+                }, path)
+            else:
+                _export_one(variant, model, example, path, calibration_batches, quantized_engine)
+        except Exception as e:
+            print(f"⚠️ Skipping {variant} export: {e}")
+            continue
+
+        entry = {'file': filename, 'format': fmt, 'size_bytes': os.path.getsize(path)}
+        if variant == 'int8_static':
+            entry['quantized_engine'] = quantized_engine
+        manifest['variants'][variant] = entry
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class OnnxRunner:
+    """onnxruntime session that takes and returns torch tensors like the other variants"""
+
+    def __init__(self, path, num_threads=0):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        logits = self.session.run(None, {self.input_name: batch.numpy()})[0]
+        return torch.from_numpy(logits)
+
+
+def read_manifest(model_dir):
+    with open(os.path.join(model_dir, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def load_variant(model_dir, variant, num_threads=0):
+    """(callable model, manifest) for a non-float32 variant listed in model_dir's manifest"""
+    manifest = read_manifest(model_dir)
+    entry = manifest['variants'].get(variant)
+    if entry is None:
+        raise ValueError(f"Variant '{variant}' was not exported (have: {', '.join(manifest['variants'])})")
+
+    path = os.path.join(model_dir, entry['file'])
+    if entry['format'] == 'onnx':
+        return OnnxRunner(path, num_threads), manifest
+    if entry['format'] != 'torchscript':
+        raise ValueError(f"Variant '{variant}' has format {entry['format']}, not a ready-to-run graph")
+    if 'quantized_engine' in entry:
+        # Packed INT8 weights are rebuilt for the engine they were calibrated with
+        torch.backends.quantized.engine = entry['quantized_engine']
+    return torch.jit.load(path, map_location='cpu').eval(), manifest
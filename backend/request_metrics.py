@@ -0,0 +1,611 @@
+# Request metrics in the Prometheus text format
+"""
+Counters, gauges and latency histograms for the API, served on /metrics.
+
+Every value is pre-aggregated where it is recorded: a labelled series owns a
+few float slots (one for a counter or gauge; one per bucket plus a sum for a
+histogram), and recording adds to them under one short per-process lock. No
+samples are kept, so the cost per observation is constant and the scrape
+does the formatting.
+
+With METRICS_DIR set (serve.py sets it for its pre-forked workers), each
+process keeps its slots in an mmap'd <pid>.values file, with the series names
+appended to <pid>.keys, and a scrape on any worker sums the files of every
+process. A scrape that finds the files of a worker that has exited adds its
+counters and histograms to archive.json and removes them, so totals never go
+backwards when gunicorn replaces a worker and a scrape reads one file per live
+worker; the dead worker's gauges (e.g. requests in flight) are dropped. A new
+process whose pid an exited worker had archives that worker's files before
+creating its own (with O_EXCL, so nothing is ever truncated). Without
+METRICS_DIR the slots live in memory and /metrics reports this process only.
+
+Gauges given a function with set_function report its value at scrape time,
+as the scraping process sees it, instead of recorded values.
+"""
+import bisect
+import contextlib
+import json
+import mmap
+import os
+import threading
+import time
+from array import array
+
+METRICS_DIR_ENV = 'METRICS_DIR'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; request handlers, weather lookups and inference all land somewhere in here
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label value for requests that matched no route (404/405), so paths never become labels
+UNMATCHED_ROUTE = '<unmatched>'
+ROUTE_ENVIRON_KEY = 'agriguru.route'
+
+_SLOT = 8   # bytes per float64 value
+
+# Counters and histograms of exited processes, and the lock that scrapes and archiving take turns on
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = 'archive.lock'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextlib.contextmanager
+def _directory_lock(directory):
+    """Exclusive lock on directory's archive across processes"""
+    import fcntl   # only the pre-forked server shares a directory, and it runs on POSIX
+
+    fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)   # releases the lock
+
+
+def _read_process(directory, pid):
+    """[(key, value)] of the slots pid has written to directory"""
+    with open(os.path.join(directory, f"{pid}.keys"), encoding='utf-8') as f:
+        keys = [tuple(json.loads(line)) for line in f if line.endswith('\n')]
+    values = array('d')
+    with open(os.path.join(directory, f"{pid}.values"), 'rb') as f:
+        data = f.read(len(keys) * _SLOT)
+    values.frombytes(data[:len(data) - len(data) % _SLOT])
+    return list(zip(keys, values))
+
+
+def _remove_process(directory, pid):
+    for suffix in ('.keys', '.values'):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, f"{pid}{suffix}"))
+
+
+class _MemoryValues:
+    """A process's slots in a growable array"""
+
+    def __init__(self):
+        self.values = array('d')
+
+    def allocate(self, key):
+        self.values.append(0.0)
+
+    def close(self):
+        pass
+
+
+class _FileValues:
+    """A process's slots in an mmap'd file that other processes read at scrape time"""
+
+    def __init__(self, directory, pid, capacity=1024):
+        self.directory = directory
+        self.pid = pid
+        self.values_path = os.path.join(directory, f"{pid}.values")
+        # O_EXCL: another process's files are archived first, never truncated
+        flags = os.O_RDWR | os.O_CREAT | os.O_EXCL
+        self._file = os.fdopen(os.open(self.values_path, flags, 0o644), 'w+b')
+        self._keys = os.fdopen(os.open(os.path.join(directory, f"{pid}.keys"), flags, 0o644), 'w',
+                               encoding='utf-8')
+        self._file.truncate(capacity * _SLOT)
+        self._map = mmap.mmap(self._file.fileno(), capacity * _SLOT)
+        self.values = memoryview(self._map).cast('d')
+        self._used = 0
+
+    def allocate(self, key):
+        if self._used == len(self.values):
+            # Called with the registry lock held, so nobody is writing through the old view
+            capacity = 2 * len(self.values)
+            self.values.release()
+            self._file.truncate(capacity * _SLOT)
+            self._map.resize(capacity * _SLOT)
+            self.values = memoryview(self._map).cast('d')
+        self._used += 1
+        # The slot is zero until written; a reader that sees the key first reads 0
+        self._keys.write(json.dumps(key) + '\n')
+        self._keys.flush()
+
+    def close(self):
+        self.values.release()
+        self._map.close()
+        self._file.close()
+        self._keys.close()
+
+    def remove(self):
+        """Delete this process's files (its values are being dropped, not archived)"""
+        _remove_process(self.directory, self.pid)
+
+
+class _Series:
+    """One label combination of a metric; knows where its slots start in the registry's store"""
+
+    __slots__ = ('registry', 'slot', 'buckets')
+
+    def __init__(self, registry, slot, buckets=None):
+        self.registry = registry
+        self.slot = slot
+        self.buckets = buckets
+
+    # lock.acquire()/release() rather than a with block: half the cost on the hot path
+    def inc(self, amount=1.0):
+        registry = self.registry
+        registry.lock.acquire()
+        try:
+            registry.store.values[self.slot] += amount
+        finally:
+            registry.lock.release()
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        registry = self.registry
+        registry.lock.acquire()
+        try:
+            registry.store.values[self.slot] = value
+        finally:
+            registry.lock.release()
+
+    def observe(self, value):
+        """Histogram: one bucket count and the sum (bucket i is at slot + i, the sum after the buckets)"""
+        index = bisect.bisect_left(self.buckets, value)
+        registry = self.registry
+        registry.lock.acquire()
+        try:
+            values = registry.store.values
+            values[self.slot + index] += 1
+            values[self.slot + len(self.buckets) + 1] += value
+        finally:
+            registry.lock.release()
+
+    def time(self):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('series', 'start')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.start)
+
+
+class Metric:
+    """A named counter, gauge or histogram with fixed label names"""
+
+    def __init__(self, registry, kind, name, documentation, labelnames=(), buckets=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) if buckets is not None else None
+        self.function = None
+        self._series = {}
+
+    def labels(self, *values):
+        """Series for these label values (positional, in labelnames order); create it on first use"""
+        series = self._series.get(values)
+        if series is None:
+            series = self.registry._create_series(self, values)
+        return series
+
+    # Unlabelled metrics record directly
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def set_function(self, function):
+        """Unlabelled gauge: report function() at scrape time instead (None leaves the gauge out)"""
+        if self.kind != 'gauge' or self.labelnames:
+            raise ValueError(f"{self.name} is not an unlabelled gauge")
+        self.function = function
+
+    def _keys(self, values):
+        """Store keys of a series' slots: [name, label string, part]"""
+        labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+        if self.kind != 'histogram':
+            return [[self.name, labels, '']]
+        bounds = [_format_value(bound) for bound in self.buckets] + ['+Inf']
+        return [[self.name, labels, bound] for bound in bounds] + [[self.name, labels, 'sum']]
+
+
+class MetricsRegistry:
+    """The process's metrics and the slots their values live in"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.directory = None
+        self.store = _MemoryValues()
+        self._keys = []   # every allocated slot's key, in slot order
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Metric(self, 'counter', name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Metric(self, 'gauge', name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Metric(self, 'histogram', name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _create_series(self, metric, values):
+        if len(values) != len(metric.labelnames):
+            raise ValueError(f"{metric.name} takes labels {metric.labelnames}, got {values}")
+        values = tuple(str(value) for value in values)
+        with self.lock:
+            series = metric._series.get(values)
+            if series is None:
+                slot = len(self._keys)
+                for key in metric._keys(values):
+                    self._keys.append(key)
+                    self.store.allocate(key)
+                series = _Series(self, slot, metric.buckets)
+                metric._series[values] = series
+        return series
+
+    def use_directory(self, directory):
+        """Keep this process's values in directory from now on, starting from zero (call after fork)"""
+        pid = os.getpid()
+        with self.lock:
+            self.store.close()
+            if isinstance(self.store, _FileValues) and self.store.pid == pid:
+                self.store.remove()
+            self.directory = directory
+            if directory:
+                with _directory_lock(directory):
+                    # Files under this pid belong to an exited process that had it before us
+                    if any(os.path.exists(os.path.join(directory, f"{pid}{suffix}"))
+                           for suffix in ('.keys', '.values')):
+                        self._archive([pid])
+                    self.store = _FileValues(directory, pid)
+            else:
+                self.store = _MemoryValues()
+            # Same keys in the same order, so every series keeps its slot numbers
+            for key in self._keys:
+                self.store.allocate(key)
+
+    def reset(self):
+        """Zero every value (e.g. to drop warm-up traffic)"""
+        self.use_directory(self.directory)
+
+    def _collect(self):
+        """{(name, labels, part): value} summed over every process that shares the directory"""
+        totals = {}
+        if self.directory is None:
+            with self.lock:
+                snapshot = list(zip(map(tuple, self._keys), self.store.values.tolist()))
+            for key, value in snapshot:
+                totals[key] = value
+            return totals
+
+        with _directory_lock(self.directory):
+            pids = [int(filename[:-len('.keys')]) for filename in os.listdir(self.directory)
+                    if filename.endswith('.keys')]
+            dead = [pid for pid in pids if pid != os.getpid() and not _pid_alive(pid)]
+            if dead:
+                self._archive(dead)
+            totals = self._read_archive()
+            for pid in pids:
+                if pid in dead:
+                    continue
+                try:
+                    slots = _read_process(self.directory, pid)
+                except (OSError, ValueError):
+                    continue
+                for key, value in slots:
+                    if key[0] in self.metrics:
+                        totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def _read_archive(self):
+        try:
+            with open(os.path.join(self.directory, ARCHIVE_FILE), encoding='utf-8') as f:
+                return {(name, labels, part): value for name, labels, part, value in json.load(f)}
+        except FileNotFoundError:
+            return {}
+
+    def _archive(self, pids):
+        """Fold the counters and histograms of exited processes into the archive and remove their files.
+
+        Called with the directory lock held.
+        """
+        totals = self._read_archive()
+        for pid in pids:
+            try:
+                slots = _read_process(self.directory, pid)
+            except (OSError, ValueError):
+                slots = []
+            for key, value in slots:
+                metric = self.metrics.get(key[0])
+                if metric is not None and metric.kind != 'gauge':
+                    totals[key] = totals.get(key, 0.0) + value
+        path = os.path.join(self.directory, ARCHIVE_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump([[*key, value] for key, value in totals.items()], f)
+        os.replace(path + '.tmp', path)
+        for pid in pids:
+            _remove_process(self.directory, pid)
+
+    def exposition(self):
+        """Every metric in the Prometheus text exposition format"""
+        by_series = {}
+        for (name, labels, part), value in self._collect().items():
+            by_series.setdefault(name, {}).setdefault(labels, {})[part] = value
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if metric.function is not None:
+                try:
+                    value = metric.function()
+                except Exception as e:
+                    ERRORS.labels('metrics', type(e).__name__).inc()
+                    continue
+                if value is not None:
+                    lines.append(f"{name} {_format_value(value)}")
+                continue
+            for labels, parts in sorted(by_series.get(name, {}).items()):
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{{{labels}}} {_format_value(parts[''])}" if labels
+                                 else f"{name} {_format_value(parts[''])}")
+                    continue
+                prefix = labels + ',' if labels else ''
+                cumulative = 0.0
+                for bound in [_format_value(bound) for bound in metric.buckets] + ['+Inf']:
+                    cumulative += parts.get(bound, 0.0)
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {_format_value(cumulative)}')
+                suffix = f"{{{labels}}}" if labels else ''
+                lines.append(f"{name}_sum{suffix} {_format_value(parts.get('sum', 0.0))}")
+                lines.append(f"{name}_count{suffix} {_format_value(cumulative)}")
+        return '\n'.join(lines) + '\n'
+
+
+def clear_directory(directory):
+    """Remove the files a previous server run left in directory"""
+    os.makedirs(directory, exist_ok=True)
+    for filename in os.listdir(directory):
+        if filename.endswith(('.keys', '.values')) or filename.startswith(ARCHIVE_FILE) or filename == LOCK_FILE:
+            os.remove(os.path.join(directory, filename))
+
+
+REGISTRY = MetricsRegistry()
+
+# Its _count is the number of requests per route and status
+HTTP_LATENCY = REGISTRY.histogram(
+    'agriguru_http_request_duration_seconds', 'Time from request to the last response byte',
+    ('method', 'route', 'status'))
+HTTP_REQUEST_BYTES = REGISTRY.counter(
+    'agriguru_http_request_bytes_total', 'Request body bytes received', ('method', 'route'))
+HTTP_RESPONSE_BYTES = REGISTRY.counter(
+    'agriguru_http_response_bytes_total', 'Response body bytes sent', ('method', 'route'))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'agriguru_http_requests_in_flight', 'Requests being handled, response streaming included')
+ADVICE_REQUESTS = REGISTRY.counter(
+    'agriguru_advice_requests_total', 'Advice requests by routed intent and advice cache outcome',
+    ('intent', 'cache'))
+ADVICE_RENDER = REGISTRY.histogram(
+    'agriguru_advice_render_seconds', 'Time spent in an intent handler rendering advice (cache misses)',
+    ('intent',))
+WEATHER_LOOKUP = REGISTRY.histogram(
+    'agriguru_weather_lookup_seconds', 'Weather lookups, cache hits and fallbacks included')
+WEATHER_UPSTREAM = REGISTRY.histogram(
+    'agriguru_weather_upstream_seconds', 'Weather provider fetches by outcome', ('provider', 'outcome'))
+INFERENCE = REGISTRY.histogram(
+    'agriguru_inference_seconds', 'Disease model work per image by stage', ('stage',))
+IMAGE_CACHE = REGISTRY.counter(
+    'agriguru_image_cache_total', 'Analyzed images by image cache outcome', ('outcome',))
+ERRORS = REGISTRY.counter(
+    'agriguru_errors_total', 'Failures by component and exception type', ('source', 'error'))
+# Read from the disease engine's worker pool at scrape time (set_function), so under serve.py
+# every worker reports the one shared pool rather than a sum
+INFERENCE_POOL_WORKERS = REGISTRY.gauge(
+    'agriguru_inference_pool_workers', 'Inference worker processes the pool runs')
+INFERENCE_POOL_WORKERS_ALIVE = REGISTRY.gauge(
+    'agriguru_inference_pool_workers_alive', 'Inference worker processes currently alive')
+INFERENCE_QUEUE_DEPTH = REGISTRY.gauge(
+    'agriguru_inference_queue_depth', 'Images waiting for an inference worker')
+INFERENCE_QUEUE_CAPACITY = REGISTRY.gauge(
+    'agriguru_inference_queue_capacity', 'Images the pool holds in flight before answering 503')
+INFERENCE_IN_FLIGHT = REGISTRY.gauge(
+    'agriguru_inference_in_flight', 'Images queued or being run by the pool')
+
+
+class _MeteredStream:
+    """Response iterable of a response without Content-Length; counts its bytes and records it when closed"""
+
+    __slots__ = ('recorder', 'environ', 'status', 'start', 'body', 'sent')
+
+    def __init__(self, recorder, environ, status, start, body):
+        self.recorder = recorder
+        self.environ = environ
+        self.status = status
+        self.start = start
+        self.body = body
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self.body:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.recorder._record(self.environ, self.status, time.perf_counter() - self.start, self.sent)
+
+
+class _HttpRecorder:
+    """Records finished requests into the HTTP metrics.
+
+    The route label is the matched URL rule, which the app stores in
+    environ[ROUTE_ENVIRON_KEY]. The slots of each (method, route, status)
+    are looked up once, and a finished request is recorded under a single
+    acquisition of the registry lock.
+    """
+
+    def __init__(self):
+        self._in_flight = HTTP_IN_FLIGHT.labels().slot
+        self._buckets = HTTP_LATENCY.buckets
+        self._slots = {}   # (method, route, status) -> slots of latency, latency sum, request/response bytes
+
+    def _request_slots(self, key):
+        method, route, status = key
+        latency = HTTP_LATENCY.labels(method, route, status).slot
+        slots = self._slots[key] = (
+            latency,
+            latency + len(self._buckets) + 1,
+            HTTP_REQUEST_BYTES.labels(method, route).slot,
+            HTTP_RESPONSE_BYTES.labels(method, route).slot
+        )
+        return slots
+
+    def _started(self):
+        lock = REGISTRY.lock
+        lock.acquire()
+        try:
+            REGISTRY.store.values[self._in_flight] += 1
+        finally:
+            lock.release()
+
+    def _record(self, environ, status, seconds, sent):
+        key = (environ.get('REQUEST_METHOD', ''), environ.get(ROUTE_ENVIRON_KEY, UNMATCHED_ROUTE), status)
+        latency, latency_sum, received, responded = self._slots.get(key) or self._request_slots(key)
+        length = environ.get('CONTENT_LENGTH')
+        length = int(length) if length and length.isdigit() else 0
+        bucket = latency + bisect.bisect_left(self._buckets, seconds)
+        lock = REGISTRY.lock
+        lock.acquire()
+        try:
+            values = REGISTRY.store.values
+            values[self._in_flight] -= 1
+            values[bucket] += 1
+            values[latency_sum] += seconds
+            values[received] += length
+            values[responded] += sent
+        finally:
+            lock.release()
+
+
+class MetricsMiddleware(_HttpRecorder):
+    """WSGI middleware recording latency, bytes, status and in-flight requests per route.
+
+    A response with Content-Length has been rendered by the time the app
+    returns it, so it is recorded then and handed to the server untouched;
+    only streamed (SSE) responses are wrapped, counted chunk by chunk and
+    timed to their last event.
+    """
+
+    def __init__(self, wsgi_app):
+        super().__init__()
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        started = []
+
+        def metered_start_response(status, headers, exc_info=None):
+            started[:] = status, headers
+            return start_response(status, headers, exc_info)
+
+        self._started()
+        try:
+            body = self.wsgi_app(environ, metered_start_response)
+        except Exception as e:
+            ERRORS.labels('http', type(e).__name__).inc()
+            self._record(environ, '500', time.perf_counter() - start, 0)
+            raise
+        if not started:
+            # A generator app calls start_response with its first chunk
+            return _MeteredStream(self, environ, '200', start, body)
+        status, headers = started
+        for name, value in headers:
+            if len(name) == 14 and name.lower() == 'content-length':
+                self._record(environ, status[:3], time.perf_counter() - start, int(value))
+                return body
+        return _MeteredStream(self, environ, status[:3], start, body)
+
+
+class GunicornRequestMetrics(_HttpRecorder):
+    """gunicorn pre_request/post_request hooks recording what MetricsMiddleware records.
+
+    gunicorn already parses the response status and counts the body bytes it
+    writes, and calls both hooks for every request, so under serve.py the app
+    runs unwrapped. Latency runs until the last byte has been written.
+    """
+
+    def pre_request(self, worker, req):
+        req.metrics_start = time.perf_counter()
+        self._started()
+
+    def post_request(self, worker, req, environ, resp):
+        seconds = time.perf_counter() - req.metrics_start
+        if resp is None or not resp.status:
+            # The request failed before the app answered
+            self._record(environ or {}, '500', seconds, 0)
+        else:
+            self._record(environ, resp.status[:3], seconds, resp.sent)
@@ -0,0 +1,217 @@
+# Semantic Retrieval Index for the Farming Expert AI
+"""
+Keyword routing only understands the words it was given: "my paddy leaves
+have brown spots" mentions neither a pest nor a disease, and 'paddy' is not
+a crop key. SemanticIndex embeds every knowledge record (one per crop
+aspect, pest category, season, region, ...) as a hashed TF-IDF vector of its
+words and character trigrams, after folding regional crop names into the
+canonical ones, and answers a query with the records whose vectors have the
+highest dot product with the query's.
+
+Vectors are L2-normalized, so the dot product is the cosine similarity.
+Hashed features carry a sign, so it ranges over [-1, 1]: unrelated texts
+can score slightly below zero. The matrix is stored feature-major, (dim, records): a query touches only the
+few dozen hashed features it contains, so scoring gathers those rows and
+sums them instead of multiplying the whole matrix. No model download or
+network access is needed, and the index is rebuilt with every knowledge
+snapshot.
+"""
+import re
+import zlib
+from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+
+# section/path: where the record lives in the knowledge bundle; intent: the advice
+# handler that answers questions about it; crop/location/season: context it implies
+KnowledgeRecord = namedtuple('KnowledgeRecord', ['section', 'path', 'text', 'intent', 'crop', 'location', 'season'])
+# score: cosine similarity in [-1, 1]; search() only returns hits above its min_score
+SearchHit = namedtuple('SearchHit', ['score', 'record'])
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# Regional and colloquial names folded into the words the knowledge base uses (after plurals are stripped)
+SYNONYMS = {
+    'paddy': 'rice', 'dhan': 'rice', 'chawal': 'rice',
+    'corn': 'maize', 'makka': 'maize', 'makki': 'maize', 'bhutta': 'maize',
+    'gehun': 'wheat', 'gehu': 'wheat', 'kanak': 'wheat',
+    'kapa': 'cotton', 'narma': 'cotton',
+    'bug': 'insect', 'worm': 'pest', 'caterpillar': 'pest',
+    'fungu': 'disease', 'fungal': 'disease', 'sick': 'disease', 'infected': 'disease',
+    'manure': 'fertilizer', 'urea': 'fertilizer', 'npk': 'fertilizer', 'dap': 'fertilizer',
+    'watering': 'irrigation', 'flooding': 'irrigation', 'drain': 'drainage',
+    'monsoon': 'kharif', 'winter': 'rabi',
+    'mandi': 'market', 'rate': 'price'
+}
+
+STOP_WORDS = frozenset(
+    'a all an and any are at be best better can do does for from get good have has how i in is it me '
+    'much my of on or our should so some the their there this to very well what when which who why will '
+    'with you your'.split()
+)
+
+# Words a farmer would use for each part of a crop record but that the data itself lacks
+CROP_ASPECTS = {
+    'scientific_name': ('crop_overview', 'about overview information botanical name'),
+    'growth_stages': ('crop_overview', 'growth stages crop cycle development'),
+    'optimal_conditions': ('crop_overview', 'conditions requirements climate temperature humidity rainfall soil'),
+    'planting_season': ('planting', 'planting sowing season sow plant seed nursery'),
+    'harvest_time': ('harvest', 'harvest harvesting reap cut maturity ready'),
+    'yield_potential': ('harvest', 'yield production output productivity per hectare'),
+    'common_diseases': ('pest', 'disease diseases symptoms spots lesions blight rot wilt leaves infection'),
+    'common_pests': ('pest', 'pests insects damage infestation eating holes larvae'),
+    'fertilizer_schedule': ('fertilizer', 'fertilizer nutrients dose application nitrogen phosphorus potassium'),
+    'water_management': ('irrigation', 'irrigation water watering schedule drainage standing')
+}
+
+# Intent and extra vocabulary for records of the other sections
+SECTION_INTENTS = {
+    'pest_management': ('pest', 'pest disease control management integrated'),
+    'soil_knowledge': ('soil', 'soil type texture land ground management'),
+    'fertilizer_guide': ('fertilizer', 'nutrient fertilizer function deficiency'),
+    'irrigation_systems': ('irrigation', 'irrigation method water system'),
+    'seasonal_calendar': ('seasonal', 'season calendar month activities schedule'),
+    'market_insights': ('market', 'market price selling marketing produce buyers'),
+    'location_data': ('location_soil', 'region state climate soil crops grown farming')
+}
+
+
+def flatten_text(value):
+    """Every key and value below a knowledge record as one space-separated string"""
+    if isinstance(value, Mapping):
+        return ' '.join(f"{key} {flatten_text(child)}" for key, child in value.items())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(flatten_text(child) for child in value)
+    return str(value)
+
+
+def knowledge_records(sections):
+    """KnowledgeRecords for the retrievable parts of a knowledge snapshot's sections"""
+    records = []
+    for crop, info in sections.get('crop_database', {}).items():
+        for aspect, value in info.items():
+            intent, gloss = CROP_ASPECTS.get(aspect, ('crop_overview', ''))
+            text = f"{crop} {aspect} {gloss} {flatten_text(value)}"
+            records.append(KnowledgeRecord('crop_database', f"{crop}/{aspect}", text, intent, crop, None, None))
+
+    for section, (intent, gloss) in SECTION_INTENTS.items():
+        value = sections.get(section)
+        if not value:
+            continue
+        # Split like the bundle does: one record per pest category, season, region, ...
+        for path, record in _records_at_depth(value, 3 if section == 'location_data' else
+                                              1 if section in ('seasonal_calendar', 'market_insights') else 2):
+            location = path[-1] if section == 'location_data' else None
+            season = path[0].split('_')[0] if section == 'seasonal_calendar' else None
+            text = f"{' '.join(path)} {gloss} {flatten_text(record)}"
+            records.append(KnowledgeRecord(section, '/'.join(path), text, intent, None, location, season))
+    return records
+
+
+def _records_at_depth(value, depth, path=()):
+    if depth == 0 or not isinstance(value, Mapping):
+        yield path, value
+        return
+    for key, child in value.items():
+        yield from _records_at_depth(child, depth - 1, path + (key,))
+
+
+def tokenize(text):
+    """Lowercased words with plurals stripped, synonyms folded and stop words dropped"""
+    words = []
+    for word in _WORD.findall(text.replace('_', ' ').lower()):
+        # 'leaves' -> 'leave' and 'months' -> 'month' on both sides is enough for matching
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        word = SYNONYMS.get(word, word)
+        if word not in STOP_WORDS:
+            words.append(word)
+    return words
+
+
+class SemanticIndex:
+    """Hashed TF-IDF vectors of knowledge records with top-k cosine search"""
+
+    # Trigrams match inflections ('spots'/'spot', 'leaves'/'leaf') but count less than whole words
+    TRIGRAM_WEIGHT = 0.25
+
+    def __init__(self, records, dim=1024):
+        self.records = list(records)
+        self.dim = dim
+        features = [self._features(record.text) for record in self.records]
+
+        # Document frequency per hashed feature
+        document_frequency = np.zeros(dim, dtype=np.int64)
+        for counts in features:
+            document_frequency[list(counts)] += 1
+        count = len(self.records)
+        self.idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        self.matrix = np.zeros((dim, count), dtype=np.float32)
+        for column, counts in enumerate(features):
+            buckets, values = self._weigh(counts)
+            self.matrix[buckets, column] = values
+
+    @classmethod
+    def build(cls, sections, dim=1024):
+        """Index the retrievable records of a snapshot's sections"""
+        return cls(knowledge_records(sections), dim=dim)
+
+    def _features(self, text):
+        """{bucket: signed term weight} of the hashed words and trigrams of text"""
+        counts = {}
+        for word in tokenize(text):
+            self._add(counts, word, 1.0)
+            if len(word) > 3:
+                padded = f"#{word}#"
+                for start in range(len(padded) - 2):
+                    self._add(counts, padded[start:start + 3], self.TRIGRAM_WEIGHT)
+        return counts
+
+    def _add(self, counts, feature, weight):
+        # crc32 rather than hash(): it must not change between processes
+        digest = zlib.crc32(feature.encode('utf-8'))
+        bucket = digest % self.dim
+        # A sign bit keeps colliding features from only ever adding up
+        counts[bucket] = counts.get(bucket, 0.0) + (weight if digest & 0x80000000 else -weight)
+
+    def _weigh(self, counts):
+        """Unit-length TF-IDF vector as (buckets, values)"""
+        buckets = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        raw = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        # Sublinear term frequency (1 for a single word), keeping the collision sign
+        values = np.sign(raw) * np.log2(1 + np.abs(raw)) * self.idf[buckets]
+        norm = np.linalg.norm(values)
+        return buckets, values / norm if norm else values
+
+    @staticmethod
+    def mentions(query, name):
+        """True when every word of a record's crop or location name appears in query"""
+        words = set(tokenize(query))
+        return all(word in words for word in tokenize(name))
+
+    def scores(self, query):
+        """Cosine similarity of query against every record"""
+        counts = self._features(query)
+        if not counts or not self.records:
+            return np.zeros(len(self.records), dtype=np.float32)
+        buckets, values = self._weigh(counts)
+        return values @ self.matrix[buckets]
+
+    def search(self, query, k=5, min_score=0.0):
+        """Up to k SearchHits, best first, scoring above min_score"""
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [SearchHit(float(scores[i]), self.records[i]) for i in top if scores[i] > min_score]
+
+    def stats(self):
+        return {
+            'records': len(self.records),
+            'dim': self.dim,
+            'bytes': self.matrix.nbytes
+        }
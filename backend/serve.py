@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# Production launcher for the AgriGuru API
+"""
+Runs farming_expert_app under gunicorn's pre-fork server instead of the
+single-process Flask dev server.
+
+The app is imported once in the master: the knowledge base and the indexes
+derived from it, compiled templates and intent matcher (and, with PRELOAD_VISION=1, torch and the
+disease model weights) are built there, every advice handler and JSON route
+is exercised once, and the warmed heap is frozen out of the garbage
+collector so forked workers keep sharing its pages copy-on-write. Each
+worker then restarts the background threads that do not survive fork, drops
+inherited HTTP connections and, with PRELOAD_VISION=1, runs one image
+through the model before accepting traffic. That first forward pass happens
+after the fork, not in the master, because OpenMP thread pools are not
+fork-safe. Without PRELOAD_VISION the model loads on the first image request.
+
+With INFERENCE_WORKERS > 0 the master starts one inference pool in a server
+process before forking, and every worker attaches to it: INFERENCE_WORKERS
+is the number of inference processes in total, not per web worker, and
+PRELOAD_VISION=1 loads the model there only, not in the master as well.
+
+Each worker keeps its request metrics in its own file under METRICS_DIR (a
+fresh temporary directory unless set), so /metrics on any worker reports
+the totals of all of them, those of workers that have exited included. The HTTP metrics are recorded in gunicorn's
+pre_request/post_request hooks rather than by the app's WSGI middleware.
+
+Usage:
+    python serve.py                          # WEB_WORKERS / WEB_THREADS / PORT from the environment
+    python serve.py --workers 4 --threads 8 --port 5000
+
+On platforms without gunicorn (Windows) it falls back to a threaded
+single-process server with the same warm-up.
+"""
+import argparse
+import atexit
+import gc
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from request_metrics import METRICS_DIR_ENV, GunicornRequestMetrics, MetricsMiddleware, clear_directory
+from vision_loader import SHARED_POOL_ENV
+
+# Representative request for warming every handler
+WARMUP_ADVICE = {'query': 'How to plant rice this season?', 'crop': 'rice', 'location': 'Delhi', 'season': 'kharif'}
+WARMUP_REQUESTS = [
+    ('GET', '/', None),
+    ('POST', '/api/expert-advice', WARMUP_ADVICE),
+    ('POST', '/api/expert-advice/batch', {'items': [WARMUP_ADVICE]}),
+    ('POST', '/api/expert-advice/stream', WARMUP_ADVICE),
+    ('POST', '/api/weather-advice', {'location': 'Delhi', 'crop': 'rice'}),
+    ('POST', '/api/weather-advice/stream', {'location': 'Delhi', 'crop': 'rice'}),
+    ('GET', '/api/market-insights?crop=rice', None),
+    ('GET', '/api/seasonal-calendar?season=kharif', None),
+    ('GET', '/api/soil-recommendations?location=Delhi', None),
+    ('GET', '/api/cache-stats', None),
+    ('GET', '/api/model-status', None)
+]
+
+
+def warm_up(app_module):
+    """Render every advice intent and call every JSON route once in this process"""
+    from advice_context import AdviceContext
+
+    expert = app_module.farming_expert
+    ctx = AdviceContext(expert)
+    for intent, _ in expert.intent_router.intents:
+        expert._render_advice(intent, WARMUP_ADVICE['query'].lower(), WARMUP_ADVICE['crop'],
+                              WARMUP_ADVICE['location'], WARMUP_ADVICE['season'], ctx)
+
+    client = app_module.app.test_client()
+    for method, path, body in WARMUP_REQUESTS:
+        response = client.open(path, method=method, json=body)
+        # Reading the body runs the streaming routes' generators, which do all of their work lazily
+        text = response.get_data(as_text=True)
+        if response.status_code >= 500 or text.startswith('event: error') or '\nevent: error\n' in text:
+            raise RuntimeError(f"Warm-up {method} {path} failed: {text[:200]}")
+
+
+def warm_model(app_module):
+    """Push one synthetic photo through decode, batching and the network"""
+    from PIL import Image
+
+    engine = app_module.disease_engine
+    if not app_module.PRELOAD_VISION or not engine.preload():
+        return
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (92, 140, 64)).save(buffer, 'JPEG')
+    engine.predict(engine.decode(buffer.getvalue(), app_module.MAX_IMAGE_PIXELS))
+
+
+def prepare(app_module, warm=True):
+    """Master-side setup: everything built here is shared by the forked workers"""
+    start = time.perf_counter()
+    model_loaded = app_module.disease_engine.stats()['loaded']
+    # Built lazily otherwise; here, once, so every worker shares them
+    app_module.farming_expert.knowledge.build_indexes()
+    if warm:
+        warm_up(app_module)
+    app_module.stop_background_threads()
+    # Keep the collector from touching (and so copying) the preloaded objects in every worker
+    gc.collect()
+    gc.freeze()
+    if model_loaded:
+        model = 'preloaded'
+    elif app_module.PRELOAD_VISION and app_module.disease_engine.workers and os.getenv(SHARED_POOL_ENV) == '1':
+        model = 'loads in the shared pool'
+    else:
+        model = 'loads on first image'
+    print(f"✅ Warmed up in {time.perf_counter() - start:.2f}s (model {model}, warm-up {'done' if warm else 'skipped'})")
+
+
+def share_inference(app_module):
+    """Start the one inference pool all workers attach to; its address, or None for in-process inference"""
+    engine = app_module.disease_engine
+    if not engine.workers:
+        return None
+    return engine.share_pool()
+
+
+def init_worker(app_module, warm=True):
+    """Worker-side setup after fork, before the first request is accepted"""
+    app_module.after_fork()
+    if warm:
+        warm_model(app_module)
+
+
+def share_metrics():
+    """Point every worker at one metrics directory, emptied of an earlier run's files"""
+    directory = os.getenv(METRICS_DIR_ENV)
+    if directory:
+        clear_directory(directory)
+        return directory
+    directory = os.environ[METRICS_DIR_ENV] = tempfile.mkdtemp(prefix='agriguru-metrics-')
+    master = os.getpid()
+    # Workers inherit atexit handlers; only the master removes the directory
+    atexit.register(lambda: os.getpid() == master and shutil.rmtree(directory, ignore_errors=True))
+    return directory
+
+
+def serve_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    # The model then loads once, in the shared pool's server, rather than in the master as well
+    os.environ[SHARED_POOL_ENV] = '1'
+
+    class PreforkServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import farming_expert_app
+            prepare(farming_expert_app, warm=not args.no_warmup)
+            address = share_inference(farming_expert_app)
+            if address:
+                print(f"🧠 {farming_expert_app.disease_engine.workers} inference processes shared by all workers ({address})")
+            app = farming_expert_app.app
+            if isinstance(app.wsgi_app, MetricsMiddleware):
+                # gunicorn's request hooks record the same metrics without wrapping every response
+                app.wsgi_app = app.wsgi_app.wsgi_app
+                recorder = GunicornRequestMetrics()
+                self.cfg.set('pre_request', recorder.pre_request)
+                self.cfg.set('post_request', recorder.post_request)
+            return app
+
+    def post_fork(server, worker):
+        import farming_expert_app
+        init_worker(farming_expert_app, warm=not args.no_warmup)
+
+    PreforkServer({
+        'bind': f"{args.host}:{args.port}",
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': args.timeout,
+        'keepalive': 5,
+        'post_fork': post_fork
+    }).run()
+
+
+def serve_threaded(args):
+    from werkzeug.serving import run_simple
+
+    import farming_expert_app
+    prepare(farming_expert_app, warm=not args.no_warmup)
+    init_worker(farming_expert_app, warm=not args.no_warmup)
+    run_simple(args.host, args.port, farming_expert_app.app, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the AgriGuru API under a pre-fork server')
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', str(os.cpu_count() or 1))))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', '8')))
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('WEB_TIMEOUT', '60')))
+    parser.add_argument('--no-warmup', action='store_true', help='skip the warm-up requests')
+    args = parser.parse_args()
+
+    # One process's torch threads should not oversubscribe the cores the others use. The shared
+    # pool's INFERENCE_WORKERS processes run the model; with 0, every web worker does
+    model_processes = int(os.getenv('INFERENCE_WORKERS', '1')) or args.workers
+    os.environ.setdefault('INFERENCE_THREADS', str(max(1, (os.cpu_count() or 1) // model_processes)))
+
+    print("🌾 AgriGuru Production Server")
+    print("=" * 50)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("⚠️ gunicorn not available; serving from one threaded process")
+        serve_threaded(args)
+        return
+
+    print(f"🚀 {args.workers} workers x {args.threads} threads on http://{args.host}:{args.port}")
+    print(f"📈 Worker metrics in {share_metrics()}, served on /metrics")
+    serve_gunicorn(args)
+
+
+if __name__ == "__main__":
+    main()
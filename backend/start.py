@@ -12,8 +12,8 @@ from pathlib import Path
 
 def check_python_version():
     """Check if Python version is compatible"""
-    if sys.version_info < (3, 7):
-        print("❌ Python 3.7 or higher is required")
+    if sys.version_info < (3, 11):
+        print("❌ Python 3.11 or higher is required")
         print(f"   Current version: {sys.version}")
         return False
     return True
@@ -87,7 +87,7 @@ if __name__ == "__main__":
     
     if not success:
         print("\n🔧 Troubleshooting:")
-        print("1. Make sure Python 3.7+ is installed")
+        print("1. Make sure Python 3.11+ is installed")
         print("2. Install dependencies: pip install -r requirements.txt")
         print("3. Ensure you're in the backend directory")
         print("4. Check if port 5000 is available")
@@ -8,12 +8,16 @@ echo "=================================================="
 # Check if Python is installed
 if ! command -v python3 &> /dev/null; then
     echo "❌ Python 3 is not installed or not in PATH"
-    echo "   Please install Python 3.7 or higher"
+    echo "   Please install Python 3.11 or higher"
     exit 1
 fi
 
 # Check Python version
 python_version=$(python3 -c "import sys; print(f'{sys.version_info.major}.{sys.version_info.minor}')")
+if ! python3 -c "import sys; sys.exit(sys.version_info < (3, 11))"; then
+    echo "❌ Python 3.11 or higher is required (found $python_version)"
+    exit 1
+fi
 echo "✅ Python version: $python_version"
 
 # Check if we're in the right directory
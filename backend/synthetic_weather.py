@@ -0,0 +1,172 @@
+# Deterministic synthetic weather
+"""
+Offline stand-in for a weather API, used by the mock provider, benchmarks
+and load tests.
+
+Every value is a pure function of (canonical location, date): the random
+innovations for a whole year of one location are drawn at once from a
+generator seeded by a hash of (location, year), and a day's weather is
+computed from that day's innovations and the SMOOTHING_DAYS before it. So
+the same request on the same day always gets the same payload, today's
+"Tomorrow" is tomorrow's "Today", and N days of series come out of a few
+vectorized NumPy expressions rather than N calls to random.
+
+The series follow a location's annual-mean climate with a seasonal cycle,
+a monsoon bump for monsoon climates, persistent day-to-day anomalies,
+intermittent rain with gamma-distributed amounts, and humidity and
+pressure that respond to rain.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+
+# Annual-mean conditions of well-known cities; anything else uses DEFAULT_CLIMATE
+CITY_CLIMATE = {
+    'delhi': {'temp': 35, 'humidity': 65, 'rainfall': 2.5},
+    'mumbai': {'temp': 30, 'humidity': 80, 'rainfall': 15.0},
+    'bangalore': {'temp': 25, 'humidity': 70, 'rainfall': 5.0},
+    'chennai': {'temp': 32, 'humidity': 75, 'rainfall': 3.0},
+    'kolkata': {'temp': 28, 'humidity': 85, 'rainfall': 8.0},
+    'hyderabad': {'temp': 33, 'humidity': 60, 'rainfall': 1.5},
+    'pune': {'temp': 29, 'humidity': 65, 'rainfall': 4.0},
+    'jaipur': {'temp': 38, 'humidity': 45, 'rainfall': 0.5},
+    'lucknow': {'temp': 36, 'humidity': 70, 'rainfall': 2.0},
+    'chandigarh': {'temp': 32, 'humidity': 55, 'rainfall': 1.0}
+}
+DEFAULT_CLIMATE = {'temp': 28, 'humidity': 65, 'rainfall': 3.0}
+
+FORECAST_LABELS = ('Today', 'Tomorrow', 'Day 3')
+
+SMOOTHING_DAYS = 10          # how far back a day's anomaly remembers
+PERSISTENCE = 0.7            # day-to-day carry-over of anomalies
+TEMPERATURE_AMPLITUDE = 4.0  # degrees C either side of the annual mean
+WARMEST_DAY = 135            # mid-May, before the monsoon
+MONSOON_PEAK_DAY = 200       # mid-July
+MONSOON_WIDTH = 40.0         # days
+DAYS_PER_YEAR = 365.25
+SEASON_EPOCH = date(2000, 1, 1).toordinal()
+
+
+def weather_condition(temp, rainfall):
+    """Condition label for a temperature and rainfall, as FarmingExpertAI reports it"""
+    if rainfall > 10:
+        return 'rainy'
+    elif rainfall > 5:
+        return 'cloudy'
+    elif temp > 35:
+        return 'hot'
+    elif temp < 15:
+        return 'cold'
+    else:
+        return 'clear'
+
+
+class SyntheticWeather:
+    """Seeded daily weather series; identical inputs always give identical output"""
+
+    def __init__(self, cache_size=256):
+        self.cache_size = cache_size
+        self._innovations = OrderedDict()   # (location key, year) -> (normals, uniforms, gammas)
+        self._lock = threading.Lock()
+        weights = PERSISTENCE ** np.arange(SMOOTHING_DAYS - 1, -1, -1, dtype=np.float64)
+        self._kernel = weights / np.sqrt(np.sum(weights ** 2))   # unit-variance anomalies
+
+    def _year(self, key, year):
+        """Random draws for every day of one location-year, generated once"""
+        with self._lock:
+            cached = self._innovations.get((key, year))
+            if cached is not None:
+                self._innovations.move_to_end((key, year))
+                return cached
+
+        digest = hashlib.blake2b(f"{key}|{year}".encode('utf-8'), digest_size=8).digest()
+        rng = np.random.default_rng(int.from_bytes(digest, 'little'))
+        days = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+        draws = (rng.standard_normal((4, days)), rng.random(days), rng.gamma(0.8, 1 / 0.8, days))
+        for array in draws:
+            array.flags.writeable = False
+
+        with self._lock:
+            self._innovations[(key, year)] = draws
+            while len(self._innovations) > self.cache_size:
+                self._innovations.popitem(last=False)
+        return draws
+
+    def _draws(self, key, first, days):
+        """Innovations for `days` consecutive days starting at date `first`, across year boundaries"""
+        parts = []
+        day, remaining = first, days
+        while remaining > 0:
+            normals, uniforms, gammas = self._year(key, day.year)
+            offset = day.timetuple().tm_yday - 1
+            take = min(remaining, uniforms.shape[0] - offset)
+            parts.append((normals[:, offset:offset + take], uniforms[offset:offset + take],
+                          gammas[offset:offset + take]))
+            day += timedelta(days=take)
+            remaining -= take
+        return (np.concatenate([p[0] for p in parts], axis=1),
+                np.concatenate([p[1] for p in parts]),
+                np.concatenate([p[2] for p in parts]))
+
+    def series(self, key, climate, start, days, monsoon=False):
+        """Daily weather for `days` days from `start`: dict of arrays temp, humidity, rain, wind_speed, pressure"""
+        first = start - timedelta(days=SMOOTHING_DAYS - 1)
+        normals, uniforms, gammas = self._draws(key, first, days + SMOOTHING_DAYS - 1)
+        uniforms, gammas = uniforms[SMOOTHING_DAYS - 1:], gammas[SMOOTHING_DAYS - 1:]
+        # Persistent anomalies: each day is a decaying sum of the last SMOOTHING_DAYS innovations
+        anomalies = np.lib.stride_tricks.sliding_window_view(normals, SMOOTHING_DAYS, axis=1) @ self._kernel
+
+        # Seasonal position from the absolute date, so it does not depend on where the series starts
+        elapsed = start.toordinal() - SEASON_EPOCH + np.arange(days)
+        day_of_year = elapsed % DAYS_PER_YEAR
+        season = np.cos(2 * np.pi * (day_of_year - WARMEST_DAY) / DAYS_PER_YEAR)
+        if monsoon:
+            # Dry winters, wet monsoon months
+            monsoon_curve = np.exp(-((day_of_year - MONSOON_PEAK_DAY) / MONSOON_WIDTH) ** 2)
+            wetness = 0.3 + 2.7 * monsoon_curve
+        else:
+            monsoon_curve = np.zeros(days)
+            wetness = np.ones(days)
+
+        mean_rain = climate['rainfall'] * wetness
+        wet_chance = np.clip(min(0.15 + 0.03 * climate['rainfall'], 0.5) * wetness, 0.03, 0.9)
+        wet = uniforms < wet_chance
+        rain = np.where(wet, gammas * mean_rain / wet_chance, 0.0)
+
+        temp = climate['temp'] + TEMPERATURE_AMPLITUDE * season - 3 * monsoon_curve + 1.8 * anomalies[0]
+        humidity = np.clip(climate['humidity'] + 12 * (wetness - 1) / 2.7 + 6 * anomalies[1] + 8 * wet, 10, 100)
+        return {
+            'temp': np.round(temp, 1),
+            'humidity': np.round(humidity).astype(np.int64),
+            'rain': np.round(rain, 1),
+            'wind_speed': np.round(10 * np.exp(0.3 * anomalies[2]), 1),
+            'pressure': np.round(1013 + 3 * anomalies[3] - 2 * wet, 1)
+        }
+
+    def snapshot(self, key, climate, label, day=None, monsoon=False, forecast_days=len(FORECAST_LABELS)):
+        """Current conditions plus a daily forecast, in the weather-provider format"""
+        values = self.series(key, climate, day or date.today(), forecast_days, monsoon)
+        temp, humidity, rain = values['temp'].tolist(), values['humidity'].tolist(), values['rain'].tolist()
+        labels = FORECAST_LABELS + tuple(f"Day {i + 1}" for i in range(len(FORECAST_LABELS), forecast_days))
+        return {
+            'location': label,
+            'temperature': temp[0],
+            'humidity': humidity[0],
+            'rainfall': rain[0],
+            'wind_speed': float(values['wind_speed'][0]),
+            'pressure': float(values['pressure'][0]),
+            'weather_condition': weather_condition(temp[0], rain[0]),
+            'forecast': [
+                {
+                    'day': labels[i],
+                    'temp': temp[i],
+                    'humidity': humidity[i],
+                    'rain': rain[i],
+                    'condition': weather_condition(temp[i], rain[i])
+                }
+                for i in range(forecast_days)
+            ]
+        }
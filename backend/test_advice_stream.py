@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the Server-Sent Events advice endpoints: event order, framing and the error event
+
+Usage:
+    python -m pytest test_advice_stream.py
+"""
+import json
+import os
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+
+expert = farming_expert_app.farming_expert
+
+
+@pytest.fixture(scope='module')
+def client():
+    return farming_expert_app.app.test_client()
+
+
+def read_events(response):
+    """(event, payload) of every frame in a streamed body, checking each frame's framing"""
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n\n')
+    events = []
+    for frame in body[:-2].split('\n\n'):
+        # One event line and one data line: multi-line section text stays escaped inside the JSON
+        event_line, data_line = frame.split('\n')
+        assert event_line.startswith('event: ') and data_line.startswith('data: ')
+        events.append((event_line[len('event: '):], json.loads(data_line[len('data: '):])))
+    return events
+
+
+def test_expert_stream_is_context_then_sections_then_done(client):
+    request = {'query': 'when should I plant wheat', 'crop': 'wheat', 'location': 'Jaipur', 'season': 'rabi'}
+    events = read_events(client.post('/api/expert-advice/stream', json=request))
+    names = [name for name, _ in events]
+    assert names[0] == 'context' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'section'} and len(names) > 3
+
+    context = events[0][1]
+    assert (context['intent'], context['crop'], context['location'], context['season']) == \
+        ('planting', 'wheat', 'Jaipur', 'rabi')
+    assert events[-1][1] == {'success': True}
+    text = ''.join(payload['text'] for _, payload in events[1:-1])
+    assert '\n' in text
+    assert text == expert.get_expert_advice(request['query'], 'wheat', 'Jaipur', 'rabi')
+
+
+def test_expert_stream_takes_query_parameters(client):
+    events = read_events(client.get('/api/expert-advice/stream?query=weather+today&location=Pune'))
+    assert events[0] == ('context', {**events[0][1], 'intent': 'weather_location', 'location': 'Pune'})
+    assert events[-1][0] == 'done'
+
+
+def test_expert_stream_needs_a_query(client):
+    response = client.post('/api/expert-advice/stream', json={'crop': 'wheat'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Query is required'
+
+
+def test_weather_stream_sends_soil_before_weather(client):
+    events = read_events(client.post('/api/weather-advice/stream', json={'location': 'Nagpur', 'crop': 'cotton'}))
+    names = [name for name, _ in events]
+    assert names[:3] == ['context', 'soil_data', 'weather_data']
+    assert names[-1] == 'done' and set(names[3:-1]) == {'section'}
+    assert events[0][1]['location'] == 'Nagpur'
+    assert 'Nagpur' in ''.join(payload['text'] for _, payload in events[3:-1])
+
+
+def test_failure_mid_stream_ends_with_an_error_event(client, monkeypatch):
+    def failing(*args, **kwargs):
+        yield 'First section\n'
+        raise RuntimeError('handler failed')
+
+    monkeypatch.setattr(expert, 'iter_expert_advice', failing)
+    events = read_events(client.post('/api/expert-advice/stream', json={'query': 'how to grow rice'}))
+    assert [name for name, _ in events] == ['context', 'section', 'error']
+    assert events[1][1] == {'text': 'First section\n'}
+    assert events[2][1] == {'error': 'handler failed', 'success': False}
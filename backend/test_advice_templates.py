@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Golden tests for the advice handlers
+Every handler is rendered with a fixed clock and fixed weather, and compared byte for byte with golden/advice/<case>.txt.
+
+Usage:
+    python -m pytest test_advice_templates.py
+    python test_advice_templates.py --update    # rewrite the golden files
+"""
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+from advice_context import AdviceContext
+from advice_templates import Template
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'advice')
+FROZEN_NOW = datetime(2024, 7, 15, 9, 30)
+
+
+@contextmanager
+def frozen_clock(moment=FROZEN_NOW):
+    """Make the advice handlers see `moment` as datetime.now()"""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+
+    real_datetime = farming_expert_app.datetime
+    farming_expert_app.datetime = FrozenDatetime
+    try:
+        yield
+    finally:
+        farming_expert_app.datetime = real_datetime
+
+
+def _weather(location, temperature, humidity, rainfall, condition):
+    return {
+        'location': location,
+        'temperature': temperature,
+        'humidity': humidity,
+        'rainfall': rainfall,
+        'wind_speed': 11.284,
+        'pressure': 1012.7,
+        'weather_condition': condition,
+        'forecast': [
+            {'day': 'Today', 'temp': temperature, 'humidity': humidity, 'rain': rainfall, 'condition': condition},
+            {'day': 'Tomorrow', 'temp': temperature + 1.3719, 'humidity': humidity - 2.5, 'rain': rainfall + 0.25,
+             'condition': 'partly_cloudy'},
+            {'day': 'Day 3', 'temp': temperature - 2, 'humidity': humidity + 4, 'rain': 0.0, 'condition': 'cloudy'}
+        ]
+    }
+
+
+# One per branch of the weather handler: hot+dry, humid+heavy rain, cold+dry air, mild
+WEATHER = {
+    'Jaipur': _weather('Jaipur, Rajasthan', 38, 45, 0.5, 'hot'),
+    'Mumbai': _weather('Mumbai, Maharashtra', 30, 85, 15.0, 'rainy'),
+    'Shimla': _weather('Shimla', 9.5, 35, 3.0, 'cold'),
+    'Punjab': _weather('Punjab', 24, 60, 2.0, 'clear'),
+    'Iowa': _weather('Iowa', 22, 70, 1.0, 'partly_cloudy')
+}
+
+
+class FixedWeatherContext(AdviceContext):
+    """Real soil lookups, canned weather"""
+
+    def weather(self, location):
+        return WEATHER[location]
+
+
+CROPS = ('rice', 'wheat', 'cotton', 'maize')
+
+# (case name, intent, query, crop, location, season)
+CASES = [
+    ('weather_location_jaipur_wheat', 'weather_location', 'weather', 'wheat', 'Jaipur', None),
+    ('weather_location_mumbai', 'weather_location', 'rain', None, 'Mumbai', None),
+    ('weather_location_shimla', 'weather_location', 'temperature', None, 'Shimla', None),
+    ('weather_location_iowa', 'weather_location', 'climate', 'maize', 'Iowa', None),
+    ('weather_general', 'weather_general', 'weather', None, None, None),
+    ('location_soil_punjab', 'location_soil', 'soil', None, 'Punjab', None),
+    ('location_soil_mumbai', 'location_soil', 'soil', None, 'Mumbai', None),
+    ('location_soil_iowa', 'location_soil', 'soil', None, 'Iowa', None),
+    ('location_soil_atlantis', 'location_soil', 'soil', None, 'Atlantis', None),
+    ('planting_wheat', 'planting', 'plant', 'wheat', None, None),
+    ('planting_rice_kharif_mumbai', 'planting', 'sow', 'rice', 'Mumbai', 'kharif'),
+    ('planting_wheat_rabi_punjab', 'planting', 'sow', 'wheat', 'Punjab', 'Rabi'),
+    ('planting_cotton_zaid_shimla', 'planting', 'grow', 'cotton', 'Shimla', 'zaid'),
+    ('planting_maize_iowa', 'planting', 'plant', 'maize', 'Iowa', None),
+    ('soil', 'soil', 'soil ph', None, None, None),
+    ('market', 'market', 'price', None, None, None),
+    ('seasonal_kharif', 'seasonal', 'season', None, None, 'kharif'),
+    ('seasonal_rabi', 'seasonal', 'season', None, None, 'RABI'),
+    ('seasonal_zaid', 'seasonal', 'season', None, None, 'zaid'),
+    ('seasonal_none', 'seasonal', 'calendar', None, None, None),
+    ('sustainable', 'sustainable', 'organic', None, None, None),
+    ('technology', 'technology', 'technology', None, None, None),
+    ('general', 'general', 'hello', None, None, None)
+]
+for _crop in CROPS:
+    for _intent in ('fertilizer', 'irrigation', 'pest', 'harvest', 'timing', 'crop_overview'):
+        CASES.append((f"{_intent}_{_crop}", _intent, _intent, _crop, None, None))
+
+
+def render(case):
+    """Advice text for one case under the frozen clock"""
+    _, intent, query, crop, location, season = case
+    expert = farming_expert_app.farming_expert
+    with frozen_clock():
+        return expert._render_advice(intent, query, crop, location, season, FixedWeatherContext(expert))
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN_DIR, f"{name}.txt")
+
+
+def check_case(case):
+    with open(golden_path(case[0]), encoding='utf-8', newline='') as f:
+        expected = f.read()
+    assert render(case) == expected, f"{case[0]} differs from its golden file"
+
+
+def test_every_case_has_a_golden_file():
+    names = {case[0] for case in CASES}
+    assert len(names) == len(CASES)
+    on_disk = {name[:-len('.txt')] for name in os.listdir(GOLDEN_DIR)}
+    assert on_disk == names
+
+
+def test_every_intent_is_covered():
+    covered = {case[1] for case in CASES}
+    assert covered == {name for name, _ in farming_expert_app.farming_expert.intent_router.intents} | {'crop_overview', 'general'}
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case[0] for case in CASES])
+def test_golden_output(case):
+    check_case(case)
+
+
+def test_template_matches_str_format():
+    source = "{{literal}} {name!r} {value:.1f}% — {name}\n"
+    template = Template(source)
+    assert template.fields == ['name', 'value']
+    assert template.render(name='it\'s', value=2.345) == source.format(name="it's", value=2.345)
+    with pytest.raises(ValueError):
+        Template("{weather[temp]}")
+
+
+def test_greetings_are_stable_within_a_day():
+    expert = farming_expert_app.farming_expert
+    crop_info = expert.crop_database['wheat']
+    with frozen_clock():
+        first = expert._get_planting_advice(crop_info, 'wheat', None)
+        assert expert._get_planting_advice(crop_info, 'wheat', None) == first
+
+    headings = set()
+    for offset in range(30):
+        with frozen_clock(FROZEN_NOW + timedelta(days=offset)):
+            headings.add(expert._get_planting_advice(crop_info, 'wheat', None).split('\n')[0])
+    assert len(headings) == 4
+
+
+@pytest.mark.parametrize('query, title', [
+    ('soil', 'Soil Analysis & Recommendations for '),
+    ('weather', 'Weather & Farming Advice for ')
+])
+def test_cached_advice_keeps_the_requested_location(query, title):
+    expert = farming_expert_app.farming_expert
+    expert.advice_cache.clear()
+    before = expert.advice_cache.stats()
+    for location in ('Jodhpur', 'JODHPUR', ' jodhpur '):
+        advice = expert.get_expert_advice(query, location=location)
+        assert f"{title}{location}**" in advice
+        assert expert.get_expert_advice(query, location=location) == advice
+    # Every spelling shares one cache entry
+    after = expert.advice_cache.stats()
+    assert (after['misses'] - before['misses'], after['hits'] - before['hits']) == (1, 5)
+
+
+def update():
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for name in os.listdir(GOLDEN_DIR):
+        os.remove(os.path.join(GOLDEN_DIR, name))
+    for case in CASES:
+        with open(golden_path(case[0]), 'w', encoding='utf-8', newline='') as f:
+            f.write(render(case))
+    print(f"✅ Wrote {len(CASES)} golden files to {GOLDEN_DIR}")
+
+
+if __name__ == "__main__":
+    if '--update' in sys.argv:
+        update()
+    else:
+        sys.exit(pytest.main([__file__, '-q']))
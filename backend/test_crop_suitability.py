@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for the /api/crop-suitability endpoint's parameters
+
+Usage:
+    python -m pytest test_crop_suitability.py
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+
+
+@pytest.fixture(scope='module')
+def client():
+    return farming_expert_app.app.test_client()
+
+
+def ranking(client, query):
+    response = client.get(f"/api/crop-suitability?location=Punjab&basis=climate{query}")
+    return response.status_code, response.get_json()
+
+
+def test_top_limits_the_ranking(client):
+    status, full = ranking(client, '')
+    assert status == 200 and len(full['ranking']) > 2
+    status, best = ranking(client, '&top=2')
+    assert status == 200
+    assert best['ranking'] == full['ranking'][:2]
+
+
+@pytest.mark.parametrize('top', ['0', '-1', '-3'])
+def test_top_below_one_is_rejected(client, top):
+    status, body = ranking(client, f"&top={top}")
+    assert status == 400
+    assert 'top' in body['error']
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for batch expert advice: per-location grouping, item order, duplicates and per-item errors
+
+Usage:
+    python -m pytest test_expert.py
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+
+expert = farming_expert_app.farming_expert
+
+ITEMS = [
+    {'query': 'weather today', 'location': 'Jaipur'},
+    {'query': 'what is the weather', 'location': 'Pune'},
+    {'query': 'when should I plant wheat', 'crop': 'wheat', 'location': ' JAIPUR '},
+    {'query': 'soil in my area', 'location': 'jaipur'},
+    {'query': 'how to control aphids', 'crop': 'cotton'}
+]
+
+
+@pytest.fixture(scope='module')
+def client():
+    return farming_expert_app.app.test_client()
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Locations passed to each weather and soil lookup, with the advice cache emptied first"""
+    expert.advice_cache.clear()
+    calls = {'weather': [], 'soil': []}
+    get_weather = expert.get_weather_data
+    get_soil = expert.get_location_soil_recommendations
+    monkeypatch.setattr(expert, 'get_weather_data', lambda location: calls['weather'].append(location) or get_weather(location))
+    monkeypatch.setattr(expert, 'get_location_soil_recommendations',
+                        lambda location: calls['soil'].append(location) or get_soil(location))
+    return calls
+
+
+def post_batch(client, items):
+    response = client.post('/api/expert-advice/batch', json={'items': items})
+    return response.status_code, response.get_json()
+
+
+def test_items_are_grouped_by_normalized_location(lookups):
+    results, stats = expert.get_batch_advice(ITEMS)
+    assert all(result['success'] for result in results)
+    assert stats == {'items': 5, 'unique': 5, 'locations': 3}
+    # Three spellings of Jaipur share one weather and one soil lookup
+    assert sorted(lookups['weather']) == ['Jaipur', 'Pune']
+    assert sorted(lookups['soil']) == ['Jaipur', 'Pune']
+
+
+def test_results_follow_item_order(client):
+    status, body = post_batch(client, ITEMS)
+    assert status == 200 and body['success']
+    results = body['results']
+    assert [result['intent'] for result in results] == [
+        expert.route_query(item['query'], item.get('crop'), item.get('location')).intent for item in ITEMS]
+    assert 'Jaipur' in results[0]['advice'] and 'Pune' in results[1]['advice']
+    # Each item keeps its own spelling of the location
+    assert 'JAIPUR' in results[2]['advice'] and 'jaipur' in results[3]['advice']
+    # Matches asking one at a time
+    for item, result in zip(ITEMS, results):
+        assert result['advice'] == expert.get_expert_advice(item['query'], item.get('crop'), item.get('location'))
+
+
+def test_duplicate_items_are_answered_once(lookups, client):
+    item = {'query': 'weather today', 'location': 'Nagpur'}
+    status, body = post_batch(client, [item, ITEMS[4], dict(item)])
+    assert status == 200
+    assert body['batch'] == {'items': 3, 'unique': 2, 'locations': 2}
+    first, _, third = body['results']
+    assert first['success'] and first == third
+    assert lookups['weather'] == ['Nagpur']
+
+
+def test_bad_item_fails_alone(client, monkeypatch):
+    get_advice = expert.get_expert_advice
+
+    def failing(query, *args, **kwargs):
+        if query == 'explode':
+            raise RuntimeError('handler failed')
+        return get_advice(query, *args, **kwargs)
+
+    monkeypatch.setattr(expert, 'get_expert_advice', failing)
+    items = [ITEMS[0], {'query': ''}, 'not an object', {'query': 'weather', 'crop': 3},
+             {'query': 'explode', 'location': 'Jaipur'}, ITEMS[1]]
+    status, body = post_batch(client, items)
+    assert status == 200 and body['success']
+    results = body['results']
+    assert [result['success'] for result in results] == [True, False, False, False, False, True]
+    assert results[1]['error'] == 'Query is required'
+    assert results[2]['error'] == 'Item must be an object'
+    assert results[3]['error'] == "'crop' must be a string"
+    assert results[4]['error'] == 'handler failed'
+    assert body['batch']['unique'] == 3
+
+
+@pytest.mark.parametrize('payload', [{'items': []}, {'items': 'weather'}, {}, None])
+def test_malformed_batch_is_rejected(client, payload):
+    response = client.post('/api/expert-advice/batch', json=payload)
+    assert response.status_code == 400
+    assert 'items' in response.get_json()['error']
+
+
+def test_oversized_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(farming_expert_app, 'MAX_BATCH_ITEMS', 2)
+    status, body = post_batch(client, ITEMS[:3])
+    assert status == 413
+    assert '2' in body['error']
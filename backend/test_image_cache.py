@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the image result cache: near-repeat lookups, exact-digest aliases and byte-bounded eviction
+
+Usage:
+    python -m pytest test_image_cache.py
+"""
+import io
+import json
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+from image_cache import ENTRY_OVERHEAD, HASH_BITS, ImageResultCache, content_digest
+
+PREDICTION = {'disease': 'leaf spot', 'confidence': 0.91, 'top_k': [['leaf spot', 0.91], ['healthy plant', 0.05]]}
+
+
+def leaf(seed):
+    """Smooth random colour field, about the detail of a leaf close-up"""
+    rng = np.random.default_rng(seed)
+    noise = Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+    return noise.resize((256, 256), Image.BICUBIC).filter(ImageFilter.GaussianBlur(6))
+
+
+def encode(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def spread_bits(count):
+    """A mask of count bits, one per band of a max_distance=count cache"""
+    return sum(1 << (HASH_BITS * i // (count + 1)) for i in range(count))
+
+
+@pytest.mark.parametrize('method', ['phash', 'dhash'])
+def test_recompressed_copy_hits_and_different_image_misses(method):
+    cache = ImageResultCache(max_distance=4, method=method)
+    original = encode(leaf(1))
+    cache.set(content_digest(original), cache.image_hash(Image.open(io.BytesIO(original))), PREDICTION)
+
+    # A messaging app recompressed and shrank it
+    resent = encode(Image.open(io.BytesIO(original)).resize((200, 200)), quality=60)
+    value, distance = cache.get_similar(content_digest(resent), cache.image_hash(Image.open(io.BytesIO(resent))))
+    assert value == PREDICTION
+    assert distance <= 4
+
+    other = encode(leaf(2))
+    assert cache.get_similar(content_digest(other), cache.image_hash(Image.open(io.BytesIO(other)))) == (None, None)
+    stats = cache.stats()
+    assert (stats['similar_hits'], stats['misses']) == (1, 1)
+
+
+def test_hamming_threshold_across_bands():
+    cache = ImageResultCache(max_distance=4)
+    stored = 0x0123456789ABCDEF
+    cache.set('a', stored, PREDICTION)
+    # Differences spread so every band but one is touched: found through the untouched band
+    assert cache.get_similar('b', stored ^ spread_bits(4)) == (PREDICTION, 4)
+    # One bit more in the last band leaves no band in common, and is beyond the threshold anyway
+    assert cache.get_similar('c', stored ^ spread_bits(4) ^ (1 << 63)) == (None, None)
+    # Within the threshold but all in one band: found through the others
+    assert cache.get_similar('d', stored ^ 0b1111) == (PREDICTION, 4)
+
+
+def test_similar_hit_aliases_the_exact_digest():
+    cache = ImageResultCache(max_distance=4)
+    cache.set('original', 0xFF, PREDICTION)
+    assert cache.get('resent') is None
+    assert cache.get_similar('resent', 0xFF ^ 0b11) == (PREDICTION, 2)
+    # The same bytes again skip the decode and the hash
+    assert cache.get('resent') == PREDICTION
+    assert cache.stats()['aliases'] == 1
+    # An alias is never stored as an entry of its own
+    cache.set('resent', 0xFF ^ 0b11, {'disease': 'other'})
+    assert cache.get('resent') == PREDICTION
+
+
+def entry_bytes(value):
+    return len(json.dumps(value)) + ENTRY_OVERHEAD
+
+
+# At least 32 bits apart from each other
+FAR_HASHES = {'a': 0, 'b': (1 << 64) - 1, 'c': (1 << 32) - 1}
+
+
+def test_eviction_is_least_recently_used_under_the_byte_cap():
+    cache = ImageResultCache(max_bytes=2 * entry_bytes(PREDICTION), max_distance=4)
+    cache.set('a', FAR_HASHES['a'], PREDICTION)
+    cache.set('b', FAR_HASHES['b'], PREDICTION)
+    assert cache.get('a') == PREDICTION   # b is now least recently used
+    cache.set('c', FAR_HASHES['c'], PREDICTION)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == PREDICTION and cache.get('c') == PREDICTION
+    stats = cache.stats()
+    assert (stats['size'], stats['evictions']) == (2, 1)
+    assert stats['bytes'] <= stats['max_bytes']
+    # The evicted entry is gone from the band index too
+    assert cache.get_similar('b2', FAR_HASHES['b']) == (None, None)
+
+
+def test_evicting_an_entry_drops_its_aliases():
+    cache = ImageResultCache(max_bytes=2 * entry_bytes(PREDICTION), max_distance=4)
+    cache.set('a', FAR_HASHES['a'], PREDICTION)
+    cache.get_similar('a-resent', 0x3)
+    assert cache.get('a-resent') == PREDICTION
+    # Two entries plus the alias's overhead are over the cap: a goes, and its alias with it
+    cache.set('b', FAR_HASHES['b'], PREDICTION)
+
+    assert cache.get('a') is None
+    assert cache.get('a-resent') is None
+    stats = cache.stats()
+    assert (stats['size'], stats['aliases']) == (1, 0)
+    assert stats['bytes'] == entry_bytes(PREDICTION)
+
+
+def test_oversized_values_and_disabled_cache_store_nothing():
+    cache = ImageResultCache(max_bytes=entry_bytes(PREDICTION) - 1)
+    cache.set('a', 0x1, PREDICTION)
+    assert cache.stats()['size'] == 0
+    disabled = ImageResultCache(max_bytes=0)
+    disabled.set('a', 0x1, PREDICTION)
+    assert not disabled.enabled and disabled.get('a') is None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the inference pool's slot bookkeeping and the shared pool server
+
+Usage:
+    python -m pytest test_inference_pool.py
+"""
+import pickle
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from inference_pool import (InferenceBusyError, InferencePool, SharedPoolClient, _Task, start_pool_server,
+                            stop_pool_server)
+from vision_loader import ModelUnavailableError
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """A pool whose ring is set up by hand; no worker processes are started"""
+    pool = InferencePool(str(tmp_path / 'agri_efficientnet_model.pth'), queue_size=4, timeout=5)
+    pool._free = [3]
+    return pool
+
+
+def add_task(pool, task_id, slot, worker=None, age=0.0):
+    task = pool._pending[task_id] = _Task(slot, Future())
+    task.worker = worker
+    task.submitted -= age
+    return task
+
+
+def test_reclaims_slots_of_tasks_no_worker_reported(pool):
+    # Dequeued by a worker that died before sending 'started': the slot would stay taken forever
+    lost = add_task(pool, 1, slot=0, age=6)
+    running = add_task(pool, 2, slot=1, worker=1234, age=6)
+    queued = add_task(pool, 3, slot=2, age=1)
+
+    pool._reclaim()
+
+    assert sorted(pool._free) == [0, 3]
+    assert set(pool._pending) == {2, 3}
+    assert pool.counters['reclaimed'] == 1
+    with pytest.raises(InferenceBusyError) as error:
+        lost.future.result(0)
+    assert error.value.status == 503
+    assert not running.future.done() and not queued.future.done()
+
+
+def test_late_answer_for_a_reclaimed_task_is_ignored(pool):
+    add_task(pool, 1, slot=0, age=6)
+    pool._reclaim()
+    # The slot has been handed to the next image; its old task's answer must not free it again
+    pool._free.remove(0)
+    next_task = add_task(pool, 2, slot=0)
+
+    pool._handle(('started', 99, [1]))
+    pool._handle(('done', 99, [(1, {'disease': 'healthy'})]))
+
+    assert pool._free == [3]
+    assert not next_task.future.done()
+    assert pool.counters['completed'] == 0
+
+
+def test_reject_counts_under_the_lock(pool):
+    raised = []
+
+    def reject():
+        try:
+            pool._reject()
+        except InferenceBusyError as e:
+            raised.append(e)
+
+    with pool._lock:
+        thread = threading.Thread(target=reject)
+        thread.start()
+        time.sleep(0.05)
+        assert not raised and pool.counters['rejected'] == 0
+    thread.join(5)
+    assert pool.counters['rejected'] == 1
+    assert raised[0].status == 429
+
+
+def test_busy_error_keeps_status_across_processes():
+    error = pickle.loads(pickle.dumps(InferenceBusyError("full", status=503, retry_after=7)))
+    assert (str(error), error.status, error.retry_after) == ("full", 503, 7)
+
+
+def test_shared_pool_server_reports_errors_to_attached_clients(tmp_path):
+    model_path = str(tmp_path / 'agri_efficientnet_model.pth')
+    manager = start_pool_server(model_path, workers=2, queue_size=4)
+    try:
+        client = SharedPoolClient(manager.address, model_path)
+        with pytest.raises(ModelUnavailableError):
+            client.predict(None)
+        stats = client.stats()
+        assert stats['mode'] == 'shared_pool'
+        assert stats['pool']['workers'] == 2 and stats['pool']['queue_capacity'] == 4
+    finally:
+        stop_pool_server(manager)
+
+    with pytest.raises(InferenceBusyError) as error:
+        SharedPoolClient(manager.address, model_path).predict(None)
+    assert error.value.status == 503
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for the keyword intent router, retrieval routing and the app's routing table
+
+Usage:
+    python -m pytest test_intent_router.py
+"""
+import os
+import random
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+from intent_router import IntentRouter
+
+
+def reference_match(router, text):
+    """Every keyword starting a word in text, checked one keyword at a time"""
+    text = text.lower()
+    found = set()
+    for keyword in router.keyword_weights:
+        start = text.find(keyword)
+        while start != -1:
+            end = start + len(keyword)
+            starts_word = start == 0 or not text[start - 1].isalnum()
+            ends_word = end == len(text) or not text[end].isalnum()
+            if starts_word and (ends_word or len(keyword) > router.WHOLE_WORD_MAX_LENGTH):
+                found.add(keyword)
+                break
+            start = text.find(keyword, start + 1)
+    return found
+
+
+@pytest.fixture(scope='module')
+def router():
+    return farming_expert_app.farming_expert.intent_router
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Will it rain tomorrow?', {'rain'}),
+    ('Grain storage and drainage', set()),
+    ('Soil pH for paddy', {'soil', 'ph'}),
+    ('My phone shows alpha readings', set()),
+    ('soil-ph,nutrient', {'soil', 'ph', 'nutrient'}),
+    ('Transplanting seedlings', {'transplant'}),
+    ('Planting and sowing', {'plant', 'sow'}),
+    ('WEATHER', {'weather'}),
+])
+def test_match_word_boundaries(router, text, expected):
+    assert router.match(text) == expected
+
+
+def test_match_agrees_with_reference(router):
+    rng = random.Random(3)
+    words = list(router.keyword_weights) + ['grain', 'phone', 'ing', 'the', 'my', '-', ',', '7', 'sowing']
+    for _ in range(2000):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        text = text.replace(' ', rng.choice([' ', '', '/']), rng.randint(0, 2))
+        assert router.match(text) == reference_match(router, text), text
+
+
+def test_route_prefers_higher_score_then_registration_order():
+    router = IntentRouter()
+    router.add_intent('first', {'alpha': 2})
+    router.add_intent('second', {'alpha': 2, 'beta': 1})
+    router.add_intent('needs_crop', {'alpha': 5}, requires=('crop',))
+    router.compile()
+
+    assert router.route('alpha').intent == 'first'
+    assert router.route('alpha beta').intent == 'second'
+    assert router.route('alpha', ('crop',)).intent == 'needs_crop'
+    assert router.route('gamma', default='general').intent == 'general'
+
+
+def test_keywords_added_after_compile_are_matched():
+    router = IntentRouter().add_intent('first', {'alpha': 1}).compile()
+    router.add_intent('second', {'alphabet': 2})
+    assert router.route('alphabet soup').intent == 'second'
+    assert router.match('alphabet') == {'alpha', 'alphabet'}
+
+
+@pytest.mark.parametrize('query, crop, location, intent', [
+    # Same as the old if/elif ladder
+    ('What is the weather this week?', 'rice', 'Pune', 'weather_location'),
+    ('What is the weather this week?', None, None, 'weather_general'),
+    ('Soil types here', None, 'Punjab', 'location_soil'),
+    ('How to plant rice?', 'rice', None, 'planting'),
+    ('Fertilizer schedule', 'wheat', 'Punjab', 'fertilizer'),
+    ('Irrigation schedule for maize', 'maize', None, 'irrigation'),
+    ('When should I harvest cotton?', 'cotton', None, 'harvest'),
+    ('Tell me about rice', 'rice', None, 'crop_overview'),
+    ('Soil ph testing', None, None, 'soil'),
+    ('Market prices this week', None, None, 'market'),
+    # A location still gets location-specific soil advice for pH and nutrient questions
+    ('What is the soil ph here?', None, 'Punjab', 'location_soil'),
+    ('Which nutrient is missing in this soil?', None, 'Punjab', 'location_soil'),
+    # Intended changes: the strongest topic wins instead of the first rung that matched
+    ('Market prices for rice in my mandi', 'rice', None, 'market'),
+    ('Kharif season activities for wheat', 'wheat', 'Pune', 'seasonal'),
+    ('Organic and sustainable farming practices', 'rice', None, 'sustainable'),
+    ('Modern technology and equipment for small farms', 'maize', None, 'technology'),
+    ('Soil ph and nutrient testing for rice', 'rice', None, 'soil'),
+    # Intended changes: keywords only match from the start of a word
+    ('Grain drying before storage', 'rice', None, 'crop_overview'),
+    ('Is my phone app accurate?', None, None, 'general'),
+])
+def test_app_routing(query, crop, location, intent):
+    route = farming_expert_app.farming_expert.route_query(query, crop, location, retrieval=False)
+    assert route.intent == intent
+
+
+def test_retrieval_infers_a_region_by_its_display_name():
+    expert = farming_expert_app.farming_expert
+    route = expert.route_query('what crops grow in west bengal')
+    assert (route.intent, route.inferred) == ('location_soil', {'location': 'West Bengal'})
+    assert route.retrieval['path'] == 'india/states/west_bengal'
+    assert 'for West Bengal**' in expert.get_expert_advice('what crops grow in west bengal', route=route)
+
+
+def test_retrieval_never_routes_on_a_negative_score():
+    index = farming_expert_app.farming_expert.semantic_index
+    # Signed hashing lets unrelated texts score below zero
+    scores = index.scores('xylophone quartz zebra')
+    assert scores.min() < 0 <= scores.max() <= 1
+    assert all(hit.score > 0 for hit in index.search('xylophone quartz zebra', k=len(index.records)))
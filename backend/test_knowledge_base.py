@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for lazy loading of the compiled knowledge bundle
+
+Usage:
+    python -m pytest test_knowledge_base.py
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+from knowledge_base import KnowledgeBundle, compile_bundle, track_dependencies
+
+
+@pytest.fixture
+def decoded(tmp_path, monkeypatch):
+    """Records decoded from a freshly compiled bundle that KNOWLEDGE_BUNDLE points at"""
+    path = str(tmp_path / 'knowledge.db')
+    compile_bundle(farming_expert_app.farming_expert.build_inline_knowledge(), path)
+    monkeypatch.setenv('KNOWLEDGE_BUNDLE', path)
+    records = []
+    load_record = KnowledgeBundle.load_record
+
+    def counting_load_record(self, section, record_path):
+        records.append((section, record_path))
+        return load_record(self, section, record_path)
+
+    monkeypatch.setattr(KnowledgeBundle, 'load_record', counting_load_record)
+    return records
+
+
+def test_startup_decodes_no_records(decoded):
+    expert = farming_expert_app.FarmingExpertAI()
+    assert expert.knowledge_version != 'inline'
+    assert decoded == []
+
+    assert expert.resolve_location('Pune') == 'india/maharashtra'
+    assert {section for section, _ in decoded} <= {'location_data', 'location_aliases'}
+
+
+def test_index_built_on_first_use_is_not_a_request_dependency(decoded):
+    expert = farming_expert_app.FarmingExpertAI()
+    with track_dependencies() as deps:
+        expert.resolve_location('Pune')
+    assert deps == {(farming_expert_app.LOCATION_INDEX_DEP, '')}
+    assert expert.location_index is expert.location_index
+
+
+def test_reload_endpoint_needs_the_admin_token(monkeypatch):
+    client = farming_expert_app.app.test_client()
+    # Local callers are not trusted: behind a reverse proxy everyone is 127.0.0.1
+    monkeypatch.delenv('KNOWLEDGE_ADMIN_TOKEN', raising=False)
+    assert client.post('/api/admin/reload-knowledge').status_code == 404
+
+    monkeypatch.setenv('KNOWLEDGE_ADMIN_TOKEN', 's3cret')
+    assert client.post('/api/admin/reload-knowledge').status_code == 403
+    assert client.post('/api/admin/reload-knowledge', headers={'X-Admin-Token': 's3cre'}).status_code == 403
+    response = client.post('/api/admin/reload-knowledge', headers={'X-Admin-Token': 's3cret'})
+    assert response.status_code == 200
+    assert response.get_json()['success']
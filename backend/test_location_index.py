@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for resolving free-text locations against the location index
+
+Usage:
+    python -m pytest test_location_index.py
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import farming_expert_app
+from location_index import LocationIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    # Built from the inline data so the result does not depend on a compiled bundle
+    sections = farming_expert_app.farming_expert.build_inline_knowledge()
+    return LocationIndex.build(sections['location_data'], sections['location_aliases'])
+
+
+@pytest.mark.parametrize('location, region, method', [
+    ('Punjab', 'punjab', 'exact'),
+    ('West Bengal', 'west_bengal', 'exact'),
+    ('Bengal', 'west_bengal', 'alias'),
+    ('Kolkata, Bengal', 'west_bengal', 'alias'),
+    ('Pune', 'maharashtra', 'alias'),
+    ('Nashik, MH', 'maharashtra', 'alias'),
+    ('near Amritsar in Punjab', 'punjab', 'alias'),
+    ('farming in Punjab', 'punjab', 'exact'),
+    ('rajas', 'rajasthan', 'prefix'),
+    ('Maharastra', 'maharashtra', 'fuzzy'),
+    ('keral', 'kerala', 'prefix'),
+    ('Kerela', 'kerala', 'fuzzy'),
+    ('Rajastan, India', 'rajasthan', 'fuzzy'),
+])
+def test_resolves(index, location, region, method):
+    match = index.resolve(location)
+    assert match is not None, location
+    assert (match.region, match.method) == (region, method)
+
+
+@pytest.mark.parametrize('location', [
+    # Words that contain a region name are other places, not typos of it
+    'Punjabi Bagh, Delhi',
+    'punjabi',
+    'Keralam Road',
+    # Too short or too far from any name
+    'pa',
+    'Delhi',
+    '',
+    '   ,  ',
+])
+def test_does_not_resolve(index, location):
+    assert index.resolve(location) is None
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared METRICS_DIR: archiving exited workers, pid reuse and scrape-time gauges
+
+Usage:
+    python -m pytest test_request_metrics.py
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('KNOWLEDGE_WATCH_INTERVAL', '0')
+
+import request_metrics
+from request_metrics import ARCHIVE_FILE, MetricsRegistry, clear_directory
+
+# Above any pid_max, so never a live process: stands in for a worker that has exited
+EXITED_PID = 4194304 + 7
+
+
+def build_registry():
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'jobs', ('kind',))
+    registry.histogram('job_seconds', 'job time', buckets=(0.1, 1.0))
+    registry.gauge('busy', 'busy workers')
+    return registry
+
+
+def record(registry, jobs):
+    registry.metrics['busy'].inc()
+    for _ in range(jobs):
+        registry.metrics['jobs_total'].labels('advice').inc()
+        registry.metrics['job_seconds'].observe(0.05)
+
+
+def samples(registry):
+    text = registry.exposition()
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+@pytest.fixture
+def directory(tmp_path):
+    registries = []
+    yield str(tmp_path), registries
+    for registry in registries:
+        registry.use_directory(None)
+    clear_directory(str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def open_registry(directory, monkeypatch, pid=None):
+    path, registries = directory
+    registry = build_registry()
+    with monkeypatch.context() as patch:
+        if pid is not None:
+            patch.setattr(request_metrics.os, 'getpid', lambda: pid)
+        registry.use_directory(path)
+    registries.append(registry)
+    return registry
+
+
+def test_exited_worker_is_archived(directory, monkeypatch):
+    path, _ = directory
+    assert not request_metrics._pid_alive(EXITED_PID)
+    record(open_registry(directory, monkeypatch, pid=EXITED_PID), 3)
+    scraper = open_registry(directory, monkeypatch)
+    record(scraper, 2)
+
+    first = samples(scraper)
+    assert first['jobs_total{kind="advice"}'] == '5'
+    assert first['job_seconds_bucket{le="0.1"}'] == '5'
+    assert first['job_seconds_count'] == '5'
+    assert first['busy'] == '1'   # the exited worker's gauge is dropped
+    # Its files are folded into the archive, so later scrapes read one file per live process
+    assert sorted(os.listdir(path)) == sorted([ARCHIVE_FILE, request_metrics.LOCK_FILE,
+                                               f"{os.getpid()}.keys", f"{os.getpid()}.values"])
+    assert samples(scraper) == first
+
+
+def test_reused_pid_archives_instead_of_truncating(directory, monkeypatch):
+    earlier = open_registry(directory, monkeypatch, pid=EXITED_PID)
+    record(earlier, 4)
+    # A new worker that got the same pid
+    later = open_registry(directory, monkeypatch, pid=EXITED_PID)
+    record(later, 1)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(request_metrics.os, 'getpid', lambda: EXITED_PID)
+        totals = samples(later)
+    assert totals['jobs_total{kind="advice"}'] == '5'
+    assert totals['busy'] == '1'
+
+
+def test_reset_drops_own_values_but_keeps_the_archive(directory, monkeypatch):
+    record(open_registry(directory, monkeypatch, pid=EXITED_PID), 3)
+    registry = open_registry(directory, monkeypatch)
+    record(registry, 2)
+    assert samples(registry)['jobs_total{kind="advice"}'] == '5'
+
+    registry.reset()
+    assert samples(registry)['jobs_total{kind="advice"}'] == '3'
+    record(registry, 1)
+    assert samples(registry)['jobs_total{kind="advice"}'] == '4'
+
+
+def test_function_gauges_are_read_at_scrape_time():
+    registry = MetricsRegistry()
+    depth = registry.gauge('queue_depth', 'waiting')
+    pending = []
+    depth.set_function(lambda: len(pending))
+    assert samples(registry)['queue_depth'] == '0'
+    pending.extend([1, 2])
+    assert samples(registry)['queue_depth'] == '2'
+
+    depth.set_function(lambda: None)
+    assert 'queue_depth' not in samples(registry)
+    depth.set_function(lambda: 1 / 0)
+    assert 'queue_depth' not in samples(registry)
+
+    with pytest.raises(ValueError):
+        registry.counter('jobs_total', 'jobs').set_function(lambda: 1)
+
+
+def test_app_reports_the_inference_pool(monkeypatch):
+    import farming_expert_app
+
+    pool = {'workers': 2, 'workers_alive': 1, 'queue_depth': 3, 'queue_capacity': 16, 'in_flight': 5}
+    monkeypatch.setattr(farming_expert_app.disease_engine, 'stats', lambda: {'mode': 'process_pool', 'pool': pool})
+    text = farming_expert_app.app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'agriguru_inference_pool_workers 2\n' in text
+    assert 'agriguru_inference_pool_workers_alive 1\n' in text
+    assert 'agriguru_inference_queue_depth 3\n' in text
+    assert 'agriguru_inference_queue_capacity 16\n' in text
+    assert 'agriguru_inference_in_flight 5\n' in text
+
+    # No pool (in-process model, or not started yet): the gauges are left out
+    monkeypatch.setattr(farming_expert_app.disease_engine, 'stats', lambda: {'mode': 'in_process'})
+    text = farming_expert_app.app.test_client().get('/metrics').get_data(as_text=True)
+    assert '\nagriguru_inference_queue_depth ' not in text
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for ConfusionMatrixMetrics against a brute-force reference on random logits
+
+Usage:
+    python -m pytest test_training_metrics.py
+"""
+
+import numpy as np
+import pytest
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from training_metrics import ConfusionMatrixMetrics
+
+NUM_CLASSES = 6
+TOPK = (1, 3)
+
+
+def random_batches(seed, batches=5, batch_size=37):
+    """Logits where class 3 is never predicted, class 4 never a target and class 5 neither"""
+    generator = torch.Generator().manual_seed(seed)
+    data = []
+    for _ in range(batches):
+        logits = torch.randn(batch_size, NUM_CLASSES, generator=generator, dtype=torch.float64)
+        logits[:, 3] -= 50
+        logits[:, 5] -= 100
+        targets = torch.randint(0, 4, (batch_size,), generator=generator)
+        data.append((logits, targets))
+    return data
+
+
+def reference(data):
+    """Every metric one sample and one class at a time, zero where a ratio has no denominator"""
+    logits = np.concatenate([batch.numpy() for batch, _ in data])
+    targets = np.concatenate([batch.numpy() for _, batch in data])
+    cm = [[0] * NUM_CLASSES for _ in range(NUM_CLASSES)]
+    top_hits = dict.fromkeys(TOPK, 0)
+    for scores, target in zip(logits, targets):
+        cm[target][int(np.argmax(scores))] += 1
+        ranked = sorted(range(NUM_CLASSES), key=lambda c: -scores[c])
+        for k in TOPK:
+            top_hits[k] += target in ranked[:k]
+
+    precision, recall, f1, present = [], [], [], []
+    for c in range(NUM_CLASSES):
+        tp = cm[c][c]
+        predicted = sum(cm[r][c] for r in range(NUM_CLASSES))
+        support = sum(cm[c])
+        p = tp / predicted if predicted else 0.0
+        r = tp / support if support else 0.0
+        precision.append(p)
+        recall.append(r)
+        f1.append(2 * p * r / (p + r) if p + r else 0.0)
+        if predicted or support:
+            present.append(c)
+    total = len(targets)
+    return {
+        'confusion_matrix': cm,
+        'accuracy': sum(cm[c][c] for c in range(NUM_CLASSES)) / total,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'macro_f1': sum(f1[c] for c in present) / len(present),
+        'macro_precision': sum(precision[c] for c in present) / len(present),
+        'top_k': {k: hits / total for k, hits in top_hits.items()}
+    }
+
+
+def check(report, expected):
+    assert report['confusion_matrix'] == expected['confusion_matrix']
+    for name in ('accuracy', 'macro_f1', 'macro_precision'):
+        assert report[name] == pytest.approx(expected[name]), name
+    for name in ('precision', 'recall', 'f1'):
+        assert report[name] == pytest.approx(expected[name]), name
+    assert report['top_k'] == pytest.approx(expected['top_k'])
+
+
+def accumulate(data):
+    metrics = ConfusionMatrixMetrics(NUM_CLASSES, topk=TOPK)
+    for logits, targets in data:
+        metrics.update(logits, targets)
+    return metrics
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_brute_force_reference(seed):
+    data = random_batches(seed)
+    report = accumulate(data).compute()
+    expected = reference(data)
+    check(report, expected)
+    # The absent classes really are absent, so the zero-division paths ran
+    assert report['support'][4] == report['support'][5] == 0
+    assert [row[3] for row in report['confusion_matrix']] == [0] * NUM_CLASSES
+    assert report['precision'][3] == 0.0 and report['recall'][4] == 0.0
+
+
+def test_merge_of_partial_matrices_equals_one_pass():
+    data = random_batches(3, batches=6)
+    merged = accumulate(data[:2]).merge(accumulate(data[2:]))
+    check(merged.compute(), reference(data))
+
+    with pytest.raises(ValueError):
+        merged.merge(ConfusionMatrixMetrics(NUM_CLASSES, topk=(1,)))
+
+
+def _all_reduce_rank(rank, init_file, world_size, results):
+    dist.init_process_group('gloo', init_method=f"file://{init_file}", rank=rank, world_size=world_size)
+    try:
+        data = random_batches(4, batches=6)
+        # Each rank accumulates its own half
+        metrics = accumulate(data[rank::world_size]).all_reduce()
+        results[rank] = metrics.compute()
+    finally:
+        dist.destroy_process_group()
+
+
+def test_all_reduce_of_partial_matrices_equals_one_pass(tmp_path):
+    world_size = 2
+    with mp.Manager() as manager:
+        results = manager.dict()
+        mp.spawn(_all_reduce_rank, args=(str(tmp_path / 'init'), world_size, results), nprocs=world_size)
+        reports = [results[rank] for rank in range(world_size)]
+    expected = reference(random_batches(4, batches=6))
+    for report in reports:
+        check(report, expected)
+
+
+def test_all_reduce_without_a_process_group_is_a_no_op():
+    data = random_batches(5)
+    metrics = accumulate(data)
+    assert not (dist.is_available() and dist.is_initialized())
+    check(metrics.all_reduce().compute(), reference(data))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Tests for WeatherService caching, single-flight coalescing and the circuit breaker
+
+Usage:
+    python -m pytest test_weather_provider.py
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import weather_provider
+from weather_provider import CircuitBreaker, SingleFlight, WeatherProvider, WeatherProviderError, WeatherService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(weather_provider, 'time', SimpleNamespace(monotonic=clock, perf_counter=time.perf_counter))
+    return clock
+
+
+class CountingProvider(WeatherProvider):
+    """Returns a snapshot per call, or raises while failing is set"""
+
+    name = 'counting'
+
+    def __init__(self):
+        self.calls = []
+        self.failing = False
+        self.release = None   # threading.Event that fetch waits on, when set
+
+    def fetch(self, city, state=None):
+        self.calls.append((city, state))
+        if self.release is not None:
+            self.release.wait(5)
+        if self.failing:
+            raise WeatherProviderError(f"{city} unavailable")
+        return {'location': city, 'call': len(self.calls)}
+
+
+def fallback(location):
+    return {'location': location, 'fallback': True}
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_trial_through_after_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    # A failed trial reopens for a full reset period, a successful one closes
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def _run_concurrently(count, fn):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+class WaitCountingEvent(threading.Event):
+    """Event that counts the threads waiting on it"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = 0
+        self._count_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._count_lock:
+            self.waiting += 1
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    """Every flight started while the test runs"""
+    started = []
+
+    class CountedCall(weather_provider._Call):
+        def __init__(self):
+            super().__init__()
+            self.done = WaitCountingEvent()
+            started.append(self)
+
+    monkeypatch.setattr(weather_provider, '_Call', CountedCall)
+    return started
+
+
+def _wait_for_followers(flights, count):
+    """Until count callers wait on the single flight in progress"""
+    deadline = time.monotonic() + 5
+    while not (flights and flights[0].done.waiting >= count):
+        if time.monotonic() > deadline:
+            raise AssertionError('callers did not join the flight')
+        time.sleep(0.001)
+
+
+def test_single_flight_shares_one_execution(flights):
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return 'snapshot'
+
+    threads, results, errors = _run_concurrently(8, lambda: flight.do('pune', fn))
+    _wait_for_followers(flights, 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert {result for result, _ in results} == {'snapshot'}
+    assert flight._calls == {}
+
+
+def test_single_flight_shares_the_error(flights):
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise WeatherProviderError('down')
+
+    threads, results, errors = _run_concurrently(4, lambda: flight.do('pune', fn))
+    _wait_for_followers(flights, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert len(errors) == 4 and all(isinstance(e, WeatherProviderError) for e in errors)
+    # The next call runs again rather than replaying the failure
+    assert flight.do('pune', lambda: 'ok') == ('ok', False)
+
+
+def test_service_caches_per_normalized_location(clock):
+    provider = CountingProvider()
+    service = WeatherService(provider, fallback, ttl=600)
+
+    first = service.get('Pune, Maharashtra')
+    assert provider.calls == [('Pune', 'Maharashtra')]
+    # One entry for every spelling, each labelled the way it was asked for
+    assert service.get('  pune,   MAHARASHTRA ') == dict(first, location='pune, MAHARASHTRA')
+    assert service.get('Pune, Maharashtra') == first
+    assert service.stats()['cache_hits'] == 2
+
+    clock.now += 600
+    assert service.get('Pune, Maharashtra') != first
+    assert len(provider.calls) == 2
+
+
+def test_service_evicts_least_recently_used_locations(clock):
+    provider = CountingProvider()
+    service = WeatherService(provider, fallback, ttl=600, max_locations=3)
+    for city in ('A', 'B', 'C'):
+        service.get(city)
+    service.get('A')          # most recently used now
+    service.get('D')          # evicts B
+
+    stats = service.stats()
+    assert stats['cached_locations'] == 3
+    assert stats['evictions'] == 1
+    calls = len(provider.calls)
+    service.get('A')
+    service.get('C')
+    assert len(provider.calls) == calls
+    service.get('B')
+    assert len(provider.calls) == calls + 1
+
+
+def test_service_memory_is_bounded_by_distinct_locations(clock):
+    service = WeatherService(CountingProvider(), fallback, ttl=600, max_locations=100)
+    for i in range(5000):
+        service.get(f"village {i}")
+    assert service.stats()['cached_locations'] == 100
+    assert service.stats()['evictions'] == 4900
+
+
+def test_service_without_cache(clock):
+    provider = CountingProvider()
+    service = WeatherService(provider, fallback, ttl=600, max_locations=0)
+    service.get('Pune')
+    service.get('Pune')
+    assert len(provider.calls) == 2
+    assert service.stats()['cached_locations'] == 0
+
+
+def test_service_coalesces_concurrent_lookups(flights):
+    provider = CountingProvider()
+    provider.release = threading.Event()
+    service = WeatherService(provider, fallback, ttl=600)
+
+    threads, results, errors = _run_concurrently(10, lambda: service.get('Nashik'))
+    _wait_for_followers(flights, 9)
+    provider.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(provider.calls) == 1
+    assert all(result == results[0] for result in results)
+    stats = service.stats()
+    assert stats['upstream_calls'] == 1
+    assert stats['coalesced'] == 9
+
+
+def test_service_falls_back_and_stops_calling_a_failing_provider(clock):
+    provider = CountingProvider()
+    provider.failing = True
+    service = WeatherService(provider, fallback, ttl=600, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+
+    for _ in range(5):
+        assert service.get('Pune') == {'location': 'Pune', 'fallback': True}
+    # Two failures open the circuit; the rest never reach the provider
+    assert len(provider.calls) == 2
+    stats = service.stats()
+    assert stats['circuit'] == CircuitBreaker.OPEN
+    assert stats['upstream_failures'] == 2
+    assert stats['fallbacks'] == 5
+    assert stats['cached_locations'] == 0
+
+    # After the cool-down one trial call goes through, and success closes the circuit
+    provider.failing = False
+    clock.now += 30
+    assert service.get('Pune')['call'] == 3
+    assert service.stats()['circuit'] == CircuitBreaker.CLOSED
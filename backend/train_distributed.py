@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# Distributed CPU training launcher for the crop disease model
+"""
+Trains AgriEfficientNet with torch.distributed over the gloo backend, one
+process per rank, instead of the notebook's single process whose only
+scaling lever is the thread count (which stops paying off past a handful of
+cores). Each rank reads its own DistributedSampler shard of
+PlantDiseaseDataset (or of the pre-decoded image cache), and
+DistributedDataParallel all-reduces the gradients during backward. Each rank
+runs cpu_count / local ranks threads. Validation gives each rank every
+world_size-th image, without DistributedSampler's padding, fills a
+ConfusionMatrixMetrics on each rank and all-reduces the counts, so the loss,
+accuracy and macro F1 rank 0 reports count every validation image once.
+
+Rank 0 alone writes checkpoints with save_model, in the notebook's format
+(model_state_dict, optimizer_state_dict, labels, ...) so the backend and the
+export cell load them unchanged. checkpoint_last.pth also carries the
+scheduler, the best validation loss and the RNG state, and --resume
+continues from it: rank 0 reads it and broadcasts it to the other ranks.
+
+Usage:
+    python train_distributed.py --data-dir dataset --nproc-per-node 4
+    python train_distributed.py --cache-dir dataset_cache --nproc-per-node 4      # memmap cache (build it first)
+    python train_distributed.py --data-dir dataset --nproc-per-node 8 \\
+        --nnodes 2 --node-rank 0 --master-addr 10.0.0.1                           # on each box, its own rank
+    torchrun --nproc-per-node 4 train_distributed.py --data-dir dataset          # torchrun sets RANK etc.
+    python train_distributed.py --synthetic 2000 --nproc-per-node 2 --epochs 1   # smoke run, no dataset
+Add --resume to continue from --save-dir/checkpoint_last.pth.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, DistributedSampler
+
+from cpu_training import prepare_model, train_epoch_throughput, validate_epoch_throughput
+from inference_engine import AgriEfficientNet
+from training_data import CachedPlantDiseaseDataset, PlantDiseaseDataset, synthetic_dataset
+from training_metrics import ConfusionMatrixMetrics
+
+# Class labels of the notebook, in training order
+LABELS = [
+    'healthy plant',
+    'bacterial leaf blight',
+    'leaf spot',
+    'brown rust',
+    'yellow rust',
+    'powdery mildew',
+    'nitrogen deficiency',
+    'phosphorus deficiency',
+    'potassium deficiency',
+    'water stress'
+]
+
+LAST_CHECKPOINT = 'checkpoint_last.pth'
+BEST_CHECKPOINT = 'best_model.pth'
+
+
+def save_model(model, optimizer, epoch, loss, path, labels=LABELS, extra=None):
+    """The notebook's save_model, written through a temporary file so a crash never leaves half a checkpoint"""
+    checkpoint = {
+        'epoch': epoch,
+        'model_state_dict': model.state_dict(),
+        'optimizer_state_dict': optimizer.state_dict(),
+        'loss': loss,
+        'model_config': {'model_name': 'efficientnet-b0', 'num_classes': len(labels), 'pretrained': False},
+        'labels': labels
+    }
+    checkpoint.update(extra or {})
+    torch.save(checkpoint, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def load_datasets(args):
+    """(train, val) datasets from the image cache, the image folders or synthetic images"""
+    if args.synthetic:
+        return (synthetic_dataset(args.synthetic, args.image_size, len(LABELS), seed=0),
+                synthetic_dataset(max(args.synthetic // 5, 1), args.image_size, len(LABELS), seed=1))
+    if args.cache_dir:
+        return (CachedPlantDiseaseDataset(os.path.join(args.cache_dir, 'train'), crop=args.image_size, train=True),
+                CachedPlantDiseaseDataset(os.path.join(args.cache_dir, 'val'), crop=args.image_size, train=False))
+    return (PlantDiseaseDataset(args.data_dir, LABELS, 'train', size=args.image_size),
+            PlantDiseaseDataset(args.data_dir, LABELS, 'val', size=args.image_size))
+
+
+def all_reduce_mean(values, counts):
+    """Weighted mean over ranks of per-rank means"""
+    totals = torch.tensor([[value * count, count] for value, count in zip(values, counts)], dtype=torch.float64)
+    dist.all_reduce(totals)
+    return [total / count if count else 0.0 for total, count in totals.tolist()]
+
+
+def run(rank, local_rank, world_size, local_world_size, args):
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    torch.set_num_threads(args.threads or max(1, (os.cpu_count() or 1) // local_world_size))
+    torch.manual_seed(args.seed)
+
+    train_set, val_set = load_datasets(args)
+    train_sampler = DistributedSampler(train_set, num_replicas=world_size, rank=rank, shuffle=True, seed=args.seed)
+    # DistributedSampler pads the last shard with repeats; validation must count each image once
+    val_indices = range(rank, len(val_set), world_size)
+    train_loader = DataLoader(train_set, batch_size=args.batch_size, sampler=train_sampler,
+                              num_workers=args.workers, drop_last=True)
+    val_loader = DataLoader(val_set, batch_size=args.batch_size, sampler=val_indices, num_workers=args.workers)
+
+    # Same seed on every rank, and DDP broadcasts rank 0's weights anyway
+    model = AgriEfficientNet(len(LABELS))
+    if args.init:
+        model.load_state_dict(torch.load(args.init, map_location='cpu', weights_only=True)['model_state_dict'])
+    step_model = DistributedDataParallel(prepare_model(model, channels_last=args.channels_last,
+                                                       batch_size=args.batch_size))
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
+    scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=3,
+                                                           min_lr=1e-6)
+    criterion = nn.CrossEntropyLoss()
+    val_metrics = ConfusionMatrixMetrics(len(LABELS))
+
+    start_epoch, best_val_loss = 0, float('inf')
+    last_path = os.path.join(args.save_dir, LAST_CHECKPOINT)
+    if args.resume:
+        # Only rank 0 writes checkpoints, so only its --save-dir is sure to hold one; every rank
+        # resumes from rank 0's copy, or none does
+        shared = [torch.load(last_path, map_location='cpu', weights_only=False)
+                  if rank == 0 and os.path.exists(last_path) else None]
+        dist.broadcast_object_list(shared, src=0)
+        checkpoint = shared[0]
+    if args.resume and checkpoint is not None:
+        model.load_state_dict(checkpoint['model_state_dict'])
+        optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        scheduler.load_state_dict(checkpoint['scheduler_state_dict'])
+        torch.set_rng_state(checkpoint['rng_state'])
+        start_epoch, best_val_loss = checkpoint['epoch'] + 1, checkpoint['best_val_loss']
+        if rank == 0:
+            print(f"♻️ Resuming after epoch {checkpoint['epoch'] + 1} from {last_path}")
+
+    history = []
+    for epoch in range(start_epoch, args.epochs):
+        # Reshuffles every rank's shard the same way for this epoch
+        train_sampler.set_epoch(epoch)
+        started = time.perf_counter()
+        train_loss, train_acc = train_epoch_throughput(
+            step_model, train_loader, criterion, optimizer, accumulation_steps=args.accumulation,
+            bf16=args.bf16, channels_last=args.channels_last, sync_every=args.sync_every)
+        elapsed = time.perf_counter() - started
+        val_metrics.reset()
+        # Shards differ by up to one image, so ranks validate their local replica (a DDP forward
+        # would wait on the others), all with rank 0's BatchNorm statistics
+        for buffer in model.buffers():
+            dist.broadcast(buffer, 0)
+        val_loss, _ = validate_epoch_throughput(step_model.module, val_loader, criterion, bf16=args.bf16,
+                                                channels_last=args.channels_last, metrics=val_metrics)
+        seen = len(train_loader) * args.batch_size
+        train_loss, train_acc = all_reduce_mean([train_loss, train_acc], [seen, seen])
+        val_loss, = all_reduce_mean([val_loss], [len(val_indices)])
+        val_report = val_metrics.all_reduce().compute()
+        val_acc, val_macro_f1 = val_report['accuracy'], val_report['macro_f1']
+        # The slowest rank sets the pace
+        elapsed_max = torch.tensor([elapsed])
+        dist.all_reduce(elapsed_max, op=dist.ReduceOp.MAX)
+        images_per_sec = seen * world_size / elapsed_max.item()
+        scheduler.step(val_loss)
+
+        history.append({'epoch': epoch + 1, 'train_loss': train_loss, 'train_acc': train_acc,
+                        'val_loss': val_loss, 'val_acc': val_acc, 'val_macro_f1': val_macro_f1,
+                        'seconds': elapsed_max.item(), 'images_per_sec': images_per_sec})
+        if rank == 0:
+            print(f"📍 Epoch {epoch + 1}/{args.epochs}: train loss {train_loss:.4f} acc {train_acc:.4f}, "
+                  f"val loss {val_loss:.4f} acc {val_acc:.4f} macro F1 {val_macro_f1:.4f}, "
+                  f"{images_per_sec:.1f} img/s on {world_size} ranks")
+            if val_loss < best_val_loss:
+                best_val_loss = val_loss
+                save_model(model, optimizer, epoch, val_loss, os.path.join(args.save_dir, BEST_CHECKPOINT))
+            save_model(model, optimizer, epoch, val_loss, last_path, extra={
+                'scheduler_state_dict': scheduler.state_dict(),
+                'best_val_loss': best_val_loss,
+                'rng_state': torch.get_rng_state(),
+                'world_size': world_size
+            })
+        else:
+            best_val_loss = min(best_val_loss, val_loss)
+        # Nobody starts the next epoch (or exits) while rank 0 is still writing
+        dist.barrier()
+
+    # Every rank must hold the same weights; a cheap cross-check of the all-reduce
+    checksum = torch.tensor([sum(float(p.detach().double().sum()) for p in model.parameters())])
+    checksums = [torch.zeros(1, dtype=checksum.dtype) for _ in range(world_size)]
+    dist.all_gather(checksums, checksum)
+    if rank == 0 and args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'world_size': world_size, 'threads_per_rank': torch.get_num_threads(),
+                       'start_epoch': start_epoch, 'history': history,
+                       'parameter_checksums': [float(c) for c in checksums]}, f, indent=2)
+    dist.destroy_process_group()
+
+
+def _spawned(local_rank, args):
+    rank = args.node_rank * args.nproc_per_node + local_rank
+    run(rank, local_rank, args.nnodes * args.nproc_per_node, args.nproc_per_node, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train AgriEfficientNet on CPUs with torch.distributed (gloo)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data-dir', help='dataset root with train/ and val/ image folders')
+    source.add_argument('--cache-dir', help='image cache root with train/ and val/ caches')
+    source.add_argument('--synthetic', type=int, help='train on this many synthetic images instead')
+    parser.add_argument('--save-dir', default='models')
+    parser.add_argument('--resume', action='store_true', help=f'continue from --save-dir/{LAST_CHECKPOINT}')
+    parser.add_argument('--init', help='checkpoint whose model_state_dict to start from')
+    parser.add_argument('--epochs', type=int, default=25)
+    parser.add_argument('--batch-size', type=int, default=32, help='per rank')
+    parser.add_argument('--accumulation', type=int, default=1, help='micro-batches per optimizer step')
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--weight-decay', type=float, default=1e-4)
+    parser.add_argument('--image-size', type=int, default=224)
+    parser.add_argument('--bf16', action='store_true', help='bfloat16 autocast')
+    parser.add_argument('--no-channels-last', dest='channels_last', action='store_false')
+    parser.add_argument('--sync-every', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=0, help='DataLoader workers per rank')
+    parser.add_argument('--threads', type=int, help='threads per rank (default: cores / local ranks)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--nproc-per-node', type=int, default=1)
+    parser.add_argument('--nnodes', type=int, default=1)
+    parser.add_argument('--node-rank', type=int, default=0)
+    parser.add_argument('--master-addr', default='127.0.0.1')
+    parser.add_argument('--master-port', default='29500')
+    parser.add_argument('--report', help='rank 0 writes per-epoch results here as JSON')
+    args = parser.parse_args()
+
+    os.makedirs(args.save_dir, exist_ok=True)
+    if 'RANK' in os.environ and 'WORLD_SIZE' in os.environ:
+        # Started by torchrun (or another launcher that sets the env:// variables)
+        run(int(os.environ['RANK']), int(os.environ.get('LOCAL_RANK', 0)), int(os.environ['WORLD_SIZE']),
+            int(os.environ.get('LOCAL_WORLD_SIZE', 1)), args)
+        return
+    os.environ.setdefault('MASTER_ADDR', args.master_addr)
+    os.environ.setdefault('MASTER_PORT', str(args.master_port))
+    if args.nproc_per_node * args.nnodes == 1:
+        run(0, 0, 1, 1, args)
+    else:
+        mp.spawn(_spawned, args=(args,), nprocs=args.nproc_per_node, join=True)
+
+
+if __name__ == "__main__":
+    main()
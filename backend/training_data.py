@@ -0,0 +1,216 @@
+# Training Data for the Crop Disease Model
+"""
+The notebook's PlantDiseaseDataset opens, fully decodes and resizes every
+JPEG on every epoch, and on CPU that decode is most of the epoch. The image
+cache decodes each image once into a uint8 memory-mapped shard:
+
+    images.u8       N x H x W x 3 raw pixels (H = W = size, 256 by default)
+    labels.npy      N class indices (int64)
+    manifest.json   shape, labels, split and a fingerprint of the source files
+
+CachedPlantDiseaseDataset serves random crops and flips straight out of the
+memmap, so a sample costs a slice and a normalize; the page cache keeps the
+shard in memory and DataLoader workers share it instead of each holding a
+copy. Class counts are one bincount over labels.npy.
+
+PlantDiseaseDataset mirrors the notebook's class (same <data_dir>/<split>/<label>
+layout) without torchvision, for the launcher and benchmarks;
+synthetic_dataset stands in for a dataset in benchmarks and smoke runs.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset, TensorDataset
+
+IMAGE_FILE = 'images.u8'
+LABEL_FILE = 'labels.npy'
+MANIFEST_FILE = 'manifest.json'
+CACHE_VERSION = 1
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+
+def image_files(data_dir, split, labels):
+    """(path, label index) for every image of a split, in a stable order"""
+    files = []
+    for index, label in enumerate(labels):
+        label_dir = os.path.join(data_dir, split, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                files.append((os.path.join(label_dir, name), index))
+    return files
+
+
+def load_image(path, size, reduced=True):
+    """RGB uint8 array of an image file resized to size x size"""
+    with Image.open(path) as image:
+        if reduced:
+            # JPEGs decode at the smallest 1/2..1/8 scale that still covers size
+            image.draft('RGB', (size, size))
+        image = image.convert('RGB')
+        if image.size != (size, size):
+            image = image.resize((size, size), Image.BILINEAR)
+        return np.asarray(image)
+
+
+def normalize(pixels):
+    """Float CHW tensor of an HWC uint8 array, normalized like the notebook's transforms"""
+    # Copies the (possibly read-only, strided) memmap crop into its own buffer
+    tensor = torch.from_numpy(np.array(pixels)).permute(2, 0, 1).float().div_(255)
+    mean = torch.tensor(MEAN).view(3, 1, 1)
+    std = torch.tensor(STD).view(3, 1, 1)
+    return tensor.sub_(mean).div_(std)
+
+
+def _fingerprint(files):
+    """Digest of the source file list with sizes and mtimes, to notice a changed dataset"""
+    digest = hashlib.sha256()
+    for path, index in files:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{index}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def read_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_image_cache(data_dir, cache_dir, labels, split='train', size=256, rebuild=False):
+    """Decode a split once into cache_dir; reuses an existing cache of the same files and size"""
+    files = image_files(data_dir, split, labels)
+    fingerprint = _fingerprint(files)
+    manifest = read_manifest(cache_dir)
+    if (not rebuild and manifest and manifest.get('version') == CACHE_VERSION
+            and manifest.get('fingerprint') == fingerprint and manifest.get('size') == size
+            and manifest.get('labels') == list(labels)):
+        return manifest
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # The manifest is written last, so an interrupted build is never mistaken for a cache
+    if os.path.exists(os.path.join(cache_dir, MANIFEST_FILE)):
+        os.remove(os.path.join(cache_dir, MANIFEST_FILE))
+    shape = (len(files), size, size, 3)
+    images = np.memmap(os.path.join(cache_dir, IMAGE_FILE), dtype=np.uint8, mode='w+',
+                       shape=shape if files else (1, size, size, 3))
+    for row, (path, _) in enumerate(files):
+        images[row] = load_image(path, size)
+    images.flush()
+    del images
+    targets = np.array([index for _, index in files], dtype=np.int64)
+    np.save(os.path.join(cache_dir, LABEL_FILE), targets)
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'split': split,
+        'source': os.path.abspath(data_dir),
+        'labels': list(labels),
+        'count': len(files),
+        'size': size,
+        'shape': list(shape),
+        'dtype': 'uint8',
+        'class_counts': np.bincount(targets, minlength=len(labels)).tolist(),
+        'fingerprint': fingerprint
+    }
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class PlantDiseaseDataset(Dataset):
+    """Images decoded from their files on every access, like the notebook's class"""
+
+    def __init__(self, data_dir, labels, split='train', size=224, reduced_decode=True):
+        files = image_files(data_dir, split, labels)
+        self.image_paths = [path for path, _ in files]
+        self.labels = [index for _, index in files]
+        self.num_classes = len(labels)
+        self.size = size
+        self.reduced_decode = reduced_decode
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, idx):
+        return normalize(load_image(self.image_paths[idx], self.size, self.reduced_decode)), self.labels[idx]
+
+    def class_counts(self):
+        return np.bincount(np.asarray(self.labels, dtype=np.int64), minlength=self.num_classes)
+
+
+class CachedPlantDiseaseDataset(Dataset):
+    """Random crops (train) or center crops (eval) served from a built image cache"""
+
+    def __init__(self, cache_dir, crop=224, train=True, flip=True):
+        self.cache_dir = cache_dir
+        self.manifest = read_manifest(cache_dir)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No image cache in {cache_dir}; run build_image_cache first")
+        if crop > self.manifest['size']:
+            raise ValueError(f"crop {crop} is larger than the cached images ({self.manifest['size']})")
+        self.labels = np.load(os.path.join(cache_dir, LABEL_FILE))
+        self.num_classes = len(self.manifest['labels'])
+        self.crop = crop
+        self.train = train
+        self.flip = flip
+        # Mapped on first access, so each DataLoader worker maps the file itself instead of unpickling pixels
+        self._images = None
+
+    @property
+    def images(self):
+        if self._images is None:
+            self._images = np.memmap(os.path.join(self.cache_dir, IMAGE_FILE), dtype=np.uint8, mode='r',
+                                     shape=tuple(self.manifest['shape']))
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
+    def __len__(self):
+        return self.manifest['count']
+
+    def __getitem__(self, idx):
+        size, crop = self.manifest['size'], self.crop
+        if self.train:
+            # torch's generator is reseeded per DataLoader worker; numpy's global one is not
+            top, left = torch.randint(0, size - crop + 1, (2,)).tolist()
+        else:
+            top = left = (size - crop) // 2
+        pixels = self.images[idx, top:top + crop, left:left + crop]
+        if self.train and self.flip and torch.rand(()) < 0.5:
+            pixels = pixels[:, ::-1]
+        return normalize(pixels), int(self.labels[idx])
+
+    def class_counts(self):
+        return np.bincount(self.labels, minlength=self.num_classes)
+
+
+def synthetic_dataset(count, size, num_classes, seed=0):
+    """Normalized leaf-like images: a class base colour with blotches of a class spot colour, plus noise"""
+    generator = torch.Generator().manual_seed(seed)
+    # The palette is fixed, so differently seeded train and validation sets share their classes
+    palette = torch.rand(num_classes, 2, 3, generator=torch.Generator().manual_seed(1234))
+    labels = torch.arange(count) % num_classes
+    images = palette[labels, 0][:, :, None, None].expand(count, 3, size, size).clone()
+    blotch = max(size // 6, 1)
+    for i in range(count):
+        for _ in range(6):
+            y, x = torch.randint(0, size - blotch + 1, (2,), generator=generator).tolist()
+            images[i, :, y:y + blotch, x:x + blotch] = palette[labels[i], 1][:, None, None]
+    images += torch.randn(images.shape, generator=generator) * 0.15
+    mean = torch.tensor(MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(STD).view(1, 3, 1, 1)
+    return TensorDataset((images - mean) / std, labels)
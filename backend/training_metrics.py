@@ -0,0 +1,115 @@
+# Classification Metrics for the Crop Disease Model
+"""
+The notebook's AgriculturalMetrics.update loops over every class for every
+batch, with masked comparisons and .item() calls, and evaluation collects
+every prediction into Python lists before handing them to sklearn.
+
+ConfusionMatrixMetrics keeps a num_classes x num_classes confusion matrix
+(rows: true class, columns: predicted class) on the model's device and adds
+each batch to it with a single bincount of target * C + prediction, plus a
+histogram of where the target's score ranks (how many classes scored
+higher), from which every top-k accuracy follows. Nothing is read back until
+compute(), which derives accuracy, per-class accuracy, precision, recall,
+F1 and top-k accuracy from the matrix with tensor operations. The same
+object serves training, validation and offline evaluation; merge() adds up
+accumulators in one process and all_reduce() sums them across
+torch.distributed ranks.
+"""
+import torch
+
+
+class ConfusionMatrixMetrics:
+    """Confusion matrix and top-k hits accumulated batch by batch without host syncs"""
+
+    def __init__(self, num_classes, topk=(1, 3), device='cpu'):
+        self.num_classes = num_classes
+        self.topk = tuple(sorted({k for k in topk if 1 <= k <= num_classes}))
+        self.device = torch.device(device)
+        self.reset()
+
+    def reset(self):
+        self.confusion = torch.zeros(self.num_classes * self.num_classes, dtype=torch.int64, device=self.device)
+        # rank_counts[r]: samples whose target was outscored by r classes (the last bin: at least that many).
+        # Top-k needs scores, so batches given as predicted indices only count towards the matrix.
+        self.rank_counts = torch.zeros((self.topk[-1] + 1) if self.topk else 1, dtype=torch.int64,
+                                       device=self.device)
+
+    @torch.no_grad()
+    def update(self, outputs, targets):
+        """Add a batch: outputs are (N, C) scores or (N,) predicted class indices"""
+        targets = targets.reshape(-1).to(self.device, torch.int64)
+        outputs = outputs.detach().to(self.device)
+        if outputs.dim() == 2:
+            predicted = outputs.argmax(1)
+            if self.topk:
+                # Cheaper than topk(); a tie with the target's score counts in its favour
+                rank = (outputs > outputs.gather(1, targets[:, None])).sum(1)
+                self.rank_counts += torch.bincount(rank.clamp(max=self.topk[-1]), minlength=len(self.rank_counts))
+        else:
+            predicted = outputs.reshape(-1)
+        self.confusion += torch.bincount(targets * self.num_classes + predicted.to(torch.int64),
+                                         minlength=self.num_classes * self.num_classes)
+
+    def merge(self, other):
+        """Add another accumulator's counts (e.g. of a separately evaluated shard) to this one"""
+        if other.num_classes != self.num_classes or other.topk != self.topk:
+            raise ValueError('Only accumulators with the same classes and top-k can be merged')
+        self.confusion += other.confusion.to(self.device)
+        self.rank_counts += other.rank_counts.to(self.device)
+        return self
+
+    def all_reduce(self):
+        """Sum the counts of every torch.distributed rank into each rank's copy"""
+        import torch.distributed as dist
+
+        if dist.is_available() and dist.is_initialized():
+            for counts in (self.confusion, self.rank_counts):
+                dist.all_reduce(counts)
+        return self
+
+    def matrix(self):
+        """(C, C) confusion matrix as a CPU tensor; rows are true classes"""
+        return self.confusion.view(self.num_classes, self.num_classes).cpu()
+
+    def compute(self):
+        """Every metric as plain Python numbers and lists"""
+        cm = self.matrix().to(torch.float64)
+        true_positives = cm.diagonal()
+        support = cm.sum(1)
+        predicted = cm.sum(0)
+        total = support.sum()
+        zero = torch.zeros_like(true_positives)
+
+        precision = torch.where(predicted > 0, true_positives / predicted.clamp(min=1), zero)
+        recall = torch.where(support > 0, true_positives / support.clamp(min=1), zero)
+        denominator = precision + recall
+        f1 = torch.where(denominator > 0, 2 * precision * recall / denominator.clamp(min=1e-12), zero)
+        # Macro averages over the classes that occur in the targets or the predictions, like sklearn
+        present = (support > 0) | (predicted > 0)
+        present_count = max(int(present.sum()), 1)
+        rank_counts = self.rank_counts.cpu()
+        seen = int(rank_counts.sum())
+
+        return {
+            'total': int(total),
+            'accuracy': float(true_positives.sum() / total) if total else 0.0,
+            'per_class_accuracy': recall.tolist(),
+            'precision': precision.tolist(),
+            'recall': recall.tolist(),
+            'f1': f1.tolist(),
+            'support': support.to(torch.int64).tolist(),
+            'macro_precision': float(precision[present].sum()) / present_count,
+            'macro_recall': float(recall[present].sum()) / present_count,
+            'macro_f1': float(f1[present].sum()) / present_count,
+            'weighted_f1': float((f1 * support).sum() / total) if total else 0.0,
+            'top_k': {k: (int(rank_counts[:k].sum()) / seen if seen else 0.0) for k in self.topk},
+            'confusion_matrix': cm.to(torch.int64).tolist()
+        }
+
+    # The notebook's AgriculturalMetrics interface
+    def get_accuracy(self):
+        total = int(self.confusion.sum())
+        return int(self.confusion.view(self.num_classes, -1).diagonal().sum()) / total if total else 0
+
+    def get_per_class_accuracy(self):
+        return self.compute()['per_class_accuracy']
@@ -0,0 +1,116 @@
+# Lazily imported crop disease engine
+"""
+The disease model needs torch, PIL and NumPy: seconds of import time and
+hundreds of MB per process that the advice, weather and soil routes never
+touch. LazyInferenceEngine stands in for inference_engine.InferenceEngine
+and imports that stack on first use (or at startup, when configured);
+until then the API can still ask whether a model is present and whether it
+has loaded without importing any of it.
+"""
+import os
+import threading
+
+# Written next to the checkpoint by model_variants.export_variants
+MANIFEST_NAME = 'model_variants.json'
+# Set by serve.py before it imports the app when its workers will share one inference pool
+SHARED_POOL_ENV = 'INFERENCE_SHARED_POOL'
+
+
+class ModelUnavailableError(Exception):
+    """Raised when the disease model checkpoint is missing or cannot be loaded"""
+
+
+def artifact_path(model_path, variant='float32'):
+    """File that must exist before a model_path/variant engine can load"""
+    if variant == 'float32':
+        return model_path
+    return os.path.join(os.path.dirname(model_path), MANIFEST_NAME)
+
+
+class LazyInferenceEngine:
+    """InferenceEngine (or InferencePool) proxy; the vision stack is imported on first attribute access"""
+
+    def __init__(self, model_path, variant='float32', workers=0, pool_options=None, **options):
+        self.model_path = model_path
+        self.variant = variant
+        self.workers = workers   # > 0 runs the model in that many worker processes
+        self.pool_options = pool_options or {}
+        self.options = options
+        self.pool_server = None  # set by share_pool; processes forked afterwards attach to it
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def share_pool(self):
+        """Move the worker pool into a server process that processes forked from this one share"""
+        from inference_pool import start_pool_server
+
+        self.close()
+        self.pool_server = start_pool_server(self.model_path, variant=self.variant, workers=self.workers,
+                                             **self.pool_options, **self.options)
+        self._engine = None
+        return self.pool_server.address
+
+    @property
+    def available(self):
+        return os.path.exists(artifact_path(self.model_path, self.variant))
+
+    @property
+    def imported(self):
+        """True once torch and the engine have been imported in this process"""
+        return self._engine is not None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None and self.pool_server is not None:
+                    from inference_pool import SharedPoolClient
+                    self._engine = SharedPoolClient(self.pool_server.address, self.model_path, self.variant)
+                elif self._engine is None and self.workers:
+                    from inference_pool import InferencePool
+                    self._engine = InferencePool(self.model_path, variant=self.variant, workers=self.workers,
+                                                 **self.pool_options, **self.options)
+                elif self._engine is None:
+                    from inference_engine import InferenceEngine
+                    self._engine = InferenceEngine(self.model_path, variant=self.variant, **self.options)
+        return self._engine
+
+    def preload(self):
+        """Import the vision stack now and load the model if one is present; True when it loaded"""
+        engine = self.engine
+        if self.workers:
+            return engine.preload()
+        if not engine.available:
+            return False
+        try:
+            engine.load()
+        except ModelUnavailableError as e:
+            print(f"⚠️ {e}")
+            return False
+        return True
+
+    def __getattr__(self, name):
+        # Only reached for attributes this proxy does not define itself
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+    def stats(self):
+        if self._engine is None and self.pool_server is None:
+            return {
+                'mode': 'process_pool' if self.workers else 'in_process',
+                'model_path': self.model_path,
+                'variant': self.variant,
+                'loaded': False,
+                'imported': False,
+                'labels': None
+            }
+        if self.workers:
+            # An attached process asks the shared pool, which may have loaded the model already
+            return self.engine.stats()
+        return dict(self._engine.stats(), mode='in_process', imported=True)
+
+    def close(self):
+        """Stop pool workers (or detach from the shared pool); the in-process batcher needs nothing"""
+        if self._engine is not None and self.workers:
+            self._engine.close()
@@ -0,0 +1,335 @@
+# Pluggable Weather Providers for the Farming Expert AI
+"""
+WeatherService sits between FarmingExpertAI and a WeatherProvider:
+
+- snapshots are cached per location for a short TTL, in a bounded LRU
+- concurrent lookups for the same location share one upstream call (single-flight)
+- a circuit breaker stops calling a failing provider and serves fallback data
+- upstream fetch times and failures go to the /metrics histograms and counters
+
+The HTTP provider speaks the OpenWeatherMap 5-day forecast API over a pooled
+keep-alive session with strict timeouts. Point WEATHER_API_URL at
+benchmarks/stub_weather_server.py to exercise it without network access.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from request_metrics import ERRORS, WEATHER_UPSTREAM
+
+
+class WeatherProviderError(Exception):
+    """Raised when a provider cannot produce a weather snapshot"""
+
+
+class WeatherProvider:
+    """Base class: fetch a weather snapshot in the FarmingExpertAI format"""
+
+    name = 'base'
+    deterministic = False   # True when the same location and date always give the same snapshot
+
+    def fetch(self, city, state=None):
+        raise NotImplementedError
+
+    def after_fork(self):
+        """Drop per-process resources inherited from the parent of a forked worker"""
+
+
+class MockWeatherProvider(WeatherProvider):
+    """Offline provider backed by the expert's synthetic weather (see synthetic_weather.py)"""
+
+    name = 'mock'
+    deterministic = True
+
+    def __init__(self, expert):
+        self.expert = expert
+
+    def fetch(self, city, state=None):
+        return self.expert._get_mock_weather_data(city, state)
+
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """HTTP provider for the OpenWeatherMap forecast API"""
+
+    name = 'openweathermap'
+    DEFAULT_URL = 'https://api.openweathermap.org/data/2.5'
+    FORECAST_DAYS = ['Today', 'Tomorrow', 'Day 3']
+    SAMPLES_PER_DAY = 8  # forecast entries are 3 hours apart
+
+    def __init__(self, api_key, base_url=None, connect_timeout=2.0, read_timeout=3.0, pool_size=32):
+        self.api_key = api_key
+        self.base_url = (base_url or self.DEFAULT_URL).rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Imported here so offline (mock) deployments never load the HTTP stack
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # One keep-alive pool shared by every request thread; retries are the
+        # circuit breaker's job, not the adapter's
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def after_fork(self):
+        # Sockets opened by the parent must not be shared; the pool reconnects on demand
+        self.session.close()
+
+    def fetch(self, city, state=None):
+        import requests
+
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': 'metric',
+            'cnt': self.SAMPLES_PER_DAY * len(self.FORECAST_DAYS)
+        }
+        try:
+            response = self.session.get(f"{self.base_url}/forecast", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise WeatherProviderError(f"{self.name} lookup failed for {city}: {e}")
+
+        samples = payload.get('list') or []
+        if not samples:
+            raise WeatherProviderError(f"{self.name} returned no forecast for {city}")
+        return self._to_snapshot(samples, f"{city}, {state}" if state else city)
+
+    def _to_snapshot(self, samples, location):
+        """Convert 3-hourly forecast samples into current conditions plus a daily forecast"""
+        current = samples[0]
+        forecast = []
+        for day_index, day in enumerate(self.FORECAST_DAYS):
+            day_samples = samples[day_index * self.SAMPLES_PER_DAY:(day_index + 1) * self.SAMPLES_PER_DAY]
+            if not day_samples:
+                break
+            forecast.append({
+                'day': day,
+                'temp': round(sum(s['main']['temp'] for s in day_samples) / len(day_samples), 1),
+                'humidity': round(sum(s['main']['humidity'] for s in day_samples) / len(day_samples)),
+                'rain': round(sum(self._rain(s) for s in day_samples), 1),
+                'condition': self._condition(day_samples[len(day_samples) // 2])
+            })
+
+        return {
+            'location': location,
+            'temperature': round(current['main']['temp'], 1),
+            'humidity': current['main']['humidity'],
+            'rainfall': forecast[0]['rain'],
+            'wind_speed': current.get('wind', {}).get('speed', 0.0) * 3.6,  # m/s -> km/h
+            'pressure': current['main'].get('pressure', 1013.25),
+            'weather_condition': self._condition(current),
+            'forecast': forecast
+        }
+
+    @staticmethod
+    def _rain(sample):
+        return sample.get('rain', {}).get('3h', 0.0)
+
+    @staticmethod
+    def _condition(sample):
+        main = (sample.get('weather') or [{}])[0].get('main', '').lower()
+        return {
+            'rain': 'rainy',
+            'drizzle': 'rainy',
+            'thunderstorm': 'rainy',
+            'clouds': 'cloudy',
+            'clear': 'clear'
+        }.get(main, 'partly_cloudy')
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single trial call through after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn once per key at a time; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class WeatherService:
+    """Cached, coalesced and circuit-broken access to a WeatherProvider"""
+
+    def __init__(self, provider, fallback, ttl=600.0, breaker=None, max_locations=1024):
+        self.provider = provider
+        self.fallback = fallback
+        self.ttl = ttl
+        self.max_locations = max_locations
+        self.breaker = breaker or CircuitBreaker()
+        self._flight = SingleFlight()
+        # Keyed by user-supplied location strings, so bounded like AdviceCache. Stored without the
+        # 'location' label: every spelling of a location shares the entry and gets its own label
+        self._snapshots = OrderedDict()  # location key -> (expires_at, unlabelled snapshot)
+        self._lock = threading.Lock()
+        self.counters = {
+            'requests': 0,
+            'cache_hits': 0,
+            'coalesced': 0,
+            'upstream_calls': 0,
+            'upstream_failures': 0,
+            'fallbacks': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def location_key(location):
+        return ' '.join(location.lower().split())
+
+    @staticmethod
+    def split_location(location):
+        """'Pune, Maharashtra' -> ('Pune', 'Maharashtra')"""
+        if ',' in location:
+            city, state = location.split(',', 1)
+            return city.strip(), state.strip()
+        return location.strip(), None
+
+    @classmethod
+    def labelled(cls, snapshot, location):
+        """Copy of snapshot labelled with the caller's spelling, as the providers label it ('Pune, Maharashtra')"""
+        city, state = cls.split_location(location)
+        return dict(snapshot, location=f"{city}, {state}" if state else city)
+
+    def get(self, location):
+        """Weather snapshot for location, labelled with its spelling; never raises for provider failures"""
+        key = self.location_key(location)
+        self._count('requests')
+
+        snapshot = self._cached(key)
+        if snapshot is not None:
+            self._count('cache_hits')
+            return self.labelled(snapshot, location)
+
+        # Followers of a flight get the leader's snapshot, so it is relabelled here too
+        snapshot, shared = self._flight.do(key, lambda: self._load(key, location))
+        if shared:
+            self._count('coalesced')
+        return self.labelled(snapshot, location)
+
+    def _load(self, key, location):
+        # Another flight may have filled the cache between our miss and now
+        snapshot = self._cached(key)
+        if snapshot is not None:
+            return snapshot
+
+        if not self.breaker.allow():
+            self._count('fallbacks')
+            return self.fallback(location)
+
+        self._count('upstream_calls')
+        started = time.perf_counter()
+        try:
+            snapshot = self.provider.fetch(*self.split_location(location))
+        except Exception as e:
+            WEATHER_UPSTREAM.labels(self.provider.name, 'error').observe(time.perf_counter() - started)
+            ERRORS.labels('weather_provider', type(e).__name__).inc()
+            self.breaker.record_failure()
+            self._count('upstream_failures')
+            self._count('fallbacks')
+            return self.fallback(location)
+
+        WEATHER_UPSTREAM.labels(self.provider.name, 'ok').observe(time.perf_counter() - started)
+        self.breaker.record_success()
+        if self.max_locations > 0:
+            with self._lock:
+                self._snapshots[key] = (time.monotonic() + self.ttl,
+                                        {name: value for name, value in snapshot.items() if name != 'location'})
+                self._snapshots.move_to_end(key)
+                while len(self._snapshots) > self.max_locations:
+                    self._snapshots.popitem(last=False)
+                    self.counters['evictions'] += 1
+        return snapshot
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._snapshots.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._snapshots[key]
+                return None
+            self._snapshots.move_to_end(key)
+            return entry[1]
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['cached_locations'] = len(self._snapshots)
+        stats['max_locations'] = self.max_locations
+        stats['provider'] = self.provider.name
+        stats['circuit'] = self.breaker.state
+        stats['ttl'] = self.ttl
+        return stats
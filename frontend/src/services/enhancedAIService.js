@@ -49,6 +49,125 @@ class EnhancedAIService {
     }
   }
 
+  /**
+   * Get expert farming advice section by section as the backend renders it
+   * @param {string} query - The farming question
+   * @param {string} crop - Optional crop type
+   * @param {string} season - Optional season
+   * @param {string} location - Optional location
+   * @param {Function} onSection - Called with (sectionText, adviceSoFar) for each section
+   * @returns {Promise<Object>} - AI response with the complete advice
+   */
+  async streamExpertAdvice(query, crop = null, season = null, location = null, onSection = () => {}) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/expert-advice/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ query, crop, season, location })
+      });
+
+      if (!response.ok) {
+        throw new Error(`Backend responded with status: ${response.status}`);
+      }
+
+      let context = null;
+      let advice = '';
+      for await (const { event, data } of this.readEvents(response)) {
+        if (event === 'context') {
+          context = data;
+        } else if (event === 'section') {
+          advice += data.text;
+          onSection(data.text, advice);
+        } else if (event === 'error') {
+          throw new Error(data.error);
+        }
+      }
+      return {
+        success: true,
+        advice: advice,
+        context: context,
+        timestamp: new Date().toISOString()
+      };
+    } catch (error) {
+      console.error('Enhanced AI Service error:', error);
+      return {
+        success: false,
+        error: error.message,
+        advice: this.getFallbackAdvice(query, crop, season)
+      };
+    }
+  }
+
+  /**
+   * Parse a Server-Sent Events response body
+   * @param {Response} response - fetch response with a text/event-stream body
+   * @returns {AsyncGenerator<Object>} - {event, data} with data parsed as JSON
+   */
+  async *readEvents(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+      let end;
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        let event = 'message';
+        let data = '';
+        for (const line of frame.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        yield { event, data: JSON.parse(data) };
+      }
+      if (done) return;
+    }
+  }
+
+  /**
+   * Get expert advice for many questions in one request
+   * @param {Array<Object>} items - {query, crop, location, season} objects
+   * @returns {Promise<Object>} - results in item order; failed items carry their own error
+   */
+  async getBatchAdvice(items) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/expert-advice/batch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ items: items })
+      });
+
+      if (!response.ok) {
+        throw new Error(`Backend responded with status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      return {
+        success: true,
+        results: data.results,
+        batch: data.batch,
+        timestamp: data.timestamp
+      };
+    } catch (error) {
+      console.error('Enhanced AI Service error:', error);
+
+      return {
+        success: false,
+        error: error.message,
+        results: items.map(item => ({
+          success: false,
+          advice: this.getFallbackAdvice(item.query, item.crop, item.season)
+        }))
+      };
+    }
+  }
+
   /**
    * Analyze crop image for diseases
    * @param {File} imageFile - The image file to analyze